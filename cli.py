@@ -5,7 +5,11 @@ PBT CLI - Command Line Interface for Agentic PromptBase Generator
 Usage:
     python cli.py reverse --image "path/to/image.png"
     python cli.py create --topic "tema" --style "estilo" --platform "midjourney"
+    python cli.py market --url "https://promptbase.com" --url "https://..."
+    python cli.py package published/ --output dist
+    python cli.py audit published/
     python cli.py list
+    python cli.py daemon start   # optional: later commands reuse its warm state
 """
 
 import click
@@ -24,18 +28,11 @@ except ImportError:
 # Add project root to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-import google.generativeai as genai
-from PIL import Image
-
-from src.api_handler import (
-    agent_reverse_engineer_from_image,
-    agent_generate_initial_prompt,
-    agent_analyze_template,
-    agent_extract_variables
-)
-from src.utils import load_config, save_output_to_json
 import re
 
+# Heavy dependencies (google.generativeai, PIL, src.api_handler) are imported
+# inside the commands that use them, so `list`, `audit` and `--help` start fast.
+
 
 def post_process_for_quick_copy(result: dict, model=None, config=None, use_smart=False) -> dict:
     """
@@ -59,6 +56,7 @@ def post_process_for_quick_copy(result: dict, model=None, config=None, use_smart
             # --- SMART MODE (LLM) ---
             if use_smart and model and config:
                 try:
+                    from src.api_handler import agent_extract_variables
                     extracted = agent_extract_variables(model, config, example, variables)
                     if extracted:
                         click.echo(f"  🧠 Smart extracted: {extracted}")
@@ -106,14 +104,48 @@ def post_process_for_quick_copy(result: dict, model=None, config=None, use_smart
     return result
 
 
+def echo_request_stats():
+    """Prints the request policy counters (retries, hedges, deadline misses) for this run."""
+    from src.policy import policy_stats
+
+    counters = policy_stats()["counters"]
+    if counters.get("calls"):
+        click.echo(
+            f"📡 Requests: {counters['calls']} | Retries: {counters.get('retries', 0)} | "
+            f"Hedges: {counters.get('hedges', 0)} ({counters.get('hedge_wins', 0)} won) | "
+            f"Deadline misses: {counters.get('deadline_exceeded', 0)}"
+        )
+
+
+_prompted_api_key = None
+
+
 def get_api_key():
-    """Get API key from environment or prompt user."""
-    key = os.environ.get("GEMINI_API_KEY")
-    if not key:
-        key = click.prompt("Enter your Gemini API Key", hide_input=True)
+    """Get API key from environment or prompt user; keys are also added to the request key pool."""
+    global _prompted_api_key
+    from src.keypool import load_keys, register_key
+
+    keys = load_keys("gemini")
+    if not keys and not _prompted_api_key:
+        _prompted_api_key = click.prompt("Enter your Gemini API Key", hide_input=True)
+    key = keys[0] if keys else _prompted_api_key
+    register_key("gemini", key)
     return key
 
 
+_configured_api_key = None
+
+
+def configure_gemini(api_key):
+    """Configures the Gemini SDK; a no-op when the key is unchanged so warm clients are kept."""
+    global _configured_api_key
+    import google.generativeai as genai
+
+    if api_key != _configured_api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+
+
 @click.group()
 @click.pass_context
 def cli(ctx):
@@ -128,10 +160,15 @@ def cli(ctx):
 @click.option("--output", "-o", default=None, help="Output file path (default: auto-generated)")
 def reverse(image, context, output):
     """Reverse engineer a prompt template from an image."""
+    import google.generativeai as genai
+    from PIL import Image
+    from src.api_handler import agent_reverse_engineer_from_image
+    from src.utils import load_config, save_output_to_json
+
     click.echo(f"🔍 Analyzing image: {image}")
     
     api_key = get_api_key()
-    genai.configure(api_key=api_key)
+    configure_gemini(api_key)
     
     # Load config
     try:
@@ -200,10 +237,14 @@ def reverse(image, context, output):
 @click.option("--output", "-o", default=None, help="Output file path")
 def create(topic, style, platform, content_type, use_case, output):
     """Create a new prompt template from scratch."""
+    import google.generativeai as genai
+    from src.api_handler import agent_generate_initial_prompt
+    from src.utils import load_config, save_output_to_json
+
     click.echo(f"🚀 Creating template for: {topic}")
     
     api_key = get_api_key()
-    genai.configure(api_key=api_key)
+    configure_gemini(api_key)
     
     # Load config
     try:
@@ -252,6 +293,49 @@ def create(topic, style, platform, content_type, use_case, output):
     click.echo("-" * 50)
 
 
+@cli.command()
+@click.option("--url", "-u", "urls", multiple=True, required=True, help="Marketplace page to analyze (repeat for several)")
+@click.option("--workers", default=4, help="Number of pages fetched and analyzed concurrently")
+@click.option("--output", "-o", default=None, help="Output file path (default: auto-generated)")
+def market(urls, workers, output):
+    """Analyze one or more marketplace pages concurrently."""
+    import google.generativeai as genai
+    from src.api_handler import agent_analyze_markets
+    from src.utils import load_config, save_output_to_json
+
+    click.echo(f"🌐 Analyzing {len(urls)} page(s)...")
+    
+    api_key = get_api_key()
+    configure_gemini(api_key)
+    
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("❌ Error: config.yaml or prompts.yaml not found", err=True)
+        return
+    
+    model_name = config.get("default_model", "models/gemini-flash-latest")
+    model = genai.GenerativeModel(model_name)
+    click.echo(f"🤖 Using model: {model_name}")
+    
+    results = agent_analyze_markets(model, config, list(urls), max_workers=workers)
+    
+    for url, analysis in results.items():
+        if "error" in analysis:
+            click.echo(f"  ❌ {url}: {analysis['error']}", err=True)
+        else:
+            click.echo(f"  ✅ {url}: {analysis.get('summary', '')}")
+    echo_request_stats()
+    
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        click.echo(f"✅ Saved to: {output}")
+    else:
+        output_path = save_output_to_json(results, "market_analysis")
+        click.echo(f"✅ Saved to: {output_path}")
+
+
 @cli.command()
 @click.argument("path", type=click.Path(exists=True))
 @click.option("--overwrite", is_flag=True, help="Overwrite the existing file.")
@@ -266,12 +350,15 @@ def enhance(path, overwrite, smart):
     if smart:
         click.echo("🧠 Initializing Smart Mode...")
         try:
+            import google.generativeai as genai
+            from src.utils import load_config
+
             api_key = get_api_key()
             if not api_key:
                 click.echo("❌ Error: Smart mode requires GEMINI_API_KEY set.", err=True)
                 return
             
-            genai.configure(api_key=api_key)
+            configure_gemini(api_key)
             # Load config
             try:
                 config = load_config(["config.yaml", "prompts.yaml"])
@@ -312,11 +399,14 @@ def enhance(path, overwrite, smart):
 @click.argument("json_path", type=click.Path(exists=True))
 @click.option("--count", default=1, help="Number of previews to generate")
 @click.option("--model", default="flux", type=click.Choice(["flux", "sdxl"]), help="Model to use for preview (flux or sdxl)")
-def preview(json_path, count, model):
+@click.option("--tier", default="final", type=click.Choice(["draft", "final"]),
+              help="draft: low resolution/steps for quick checks (never packaged); final: submission images")
+def preview(json_path, count, model, tier):
     """
     Generate preview images for a prompt package using HuggingFace.
     """
     from src.hf_handler import generate_preview_image
+    from src.previews import preview_filename
     
     try:
         with open(json_path, "r", encoding="utf-8") as f:
@@ -338,7 +428,7 @@ def preview(json_path, count, model):
              click.echo("⚠️ No examples found, using raw template (might fail if variables exist)")
              prompts_to_run = [template]
              
-        click.echo(f"🎨 Generating {len(prompts_to_run)} preview(s)...")
+        click.echo(f"🎨 Generating {len(prompts_to_run)} {tier} preview(s)...")
         
         base_name = Path(json_path).stem
         parent_dir = Path(json_path).parent
@@ -347,18 +437,24 @@ def preview(json_path, count, model):
             if isinstance(prompt, dict): # Handle if example is structured (rare but possible)
                 prompt = json.dumps(prompt)
                 
-            output_path = parent_dir / f"{base_name}_preview_{i+1}.png"
+            output_path = parent_dir / preview_filename(base_name, i + 1, tier)
             click.echo(f"  • Generating preview {i+1}...")
             
             # Map choice to full model ID
             model_id = "black-forest-labs/FLUX.1-schnell" if model == "flux" else "stabilityai/stable-diffusion-xl-base-1.0"
             
-            result = generate_preview_image(str(prompt), str(output_path), model=model_id)
+            result = generate_preview_image(str(prompt), str(output_path), model=model_id, tier=tier)
             
             if result.get("success"):
                 click.echo(f"    ✅ Saved to: {output_path}")
             else:
                 click.echo(f"    ❌ Failed: {result.get('error')}")
+        
+        if tier == "final":
+            from src.thumbnails import build_package_sheet
+            sheet = build_package_sheet(json_path, data.get("source_image_path"))
+            if sheet:
+                click.echo(f"🖼️ Contact sheet: {sheet}")
                 
     except Exception as e:
          click.echo(f"❌ Error: {e}", err=True)
@@ -374,6 +470,9 @@ def batch(folder, output, delay, smart):
     Reverse engineer all images in a folder (Batch Mode).
     """
     import time
+    import google.generativeai as genai
+    from src.api_handler import agent_reverse_engineer_from_image
+    from src.utils import load_config
     
     input_path = Path(folder)
     # Output to published/ inside project or sibling, user preference?
@@ -411,7 +510,7 @@ def batch(folder, output, delay, smart):
     if not api_key:
          click.echo("❌ Error: GEMINI_API_KEY required.")
          return
-    genai.configure(api_key=api_key)
+    configure_gemini(api_key)
     config = load_config(["config.yaml", "prompts.yaml"])
     model_name = config.get("default_model", "gemini-2.5-flash-lite")
     model = genai.GenerativeModel(model_name)
@@ -502,11 +601,19 @@ def batch(folder, output, delay, smart):
 @click.option("--output", default=None, help="Output folder for JSONs. Defaults to 'processed/' inside input folder.")
 @click.option("--delay", default=2, help="Delay in seconds between requests to avoid rate limits.")
 @click.option("--smart", is_flag=True, help="Use Smart Mode (LLM) for extraction (slower, costs quota).")
-def batch(folder, output, delay, smart):
+@click.option("--queue", "use_queue", is_flag=True, help="Add one job per image to the durable job queue instead (run with `cli.py worker`).")
+@click.option("--lane", default="batch", type=click.Choice(["interactive", "batch"]), help="Queue lane for --queue.")
+@click.option("--skip-duplicates", is_flag=True, default=None,
+              help="Skip images whose template nearly duplicates a library prompt (default: library_dedup.short_circuit).")
+def batch(folder, output, delay, smart, use_queue, lane, skip_duplicates):
     """
     Reverse engineer all images in a folder (Batch Mode).
     """
     import time
+    import google.generativeai as genai
+    from PIL import Image
+    from src.api_handler import agent_reverse_engineer_from_image
+    from src.utils import load_config
     
     input_path = Path(folder)
     
@@ -525,6 +632,21 @@ def batch(folder, output, delay, smart):
     if not images:
         click.echo(f"⚠️ No images found in {folder}")
         return
+
+    if use_queue:
+        from src.jobqueue import enqueue
+
+        db_path = queue_database()
+        added = 0
+        for img_path in images:
+            target = out_dir / f"reverse_{img_path.stem}.json"
+            if list(out_dir.glob(f"reverse_{img_path.stem}*.json")):
+                continue
+            payload = {"image_path": str(img_path.resolve()), "output_path": str(target.resolve()), "smart": smart, "skip_duplicates": skip_duplicates}
+            if enqueue(db_path, "image", payload, lane=lane, dedupe_key=f"image:{target.resolve()}"):
+                added += 1
+        click.echo(f"📥 Queued {added} of {len(images)} image(s) in the '{lane}' lane ({db_path}). Run `python cli.py worker` to process them.")
+        return
         
     click.echo(f"🏭 Starting Batch Factory: {len(images)} images found.")
     click.echo(f"📂 Output: {out_dir}")
@@ -538,13 +660,16 @@ def batch(folder, output, delay, smart):
         if not api_key:
              click.echo("❌ Error: GEMINI_API_KEY required.")
              return
-        genai.configure(api_key=api_key)
+        configure_gemini(api_key)
         config = load_config(["config.yaml", "prompts.yaml"])
         model_name = config.get("default_model", "gemini-2.5-flash-lite")
         model = genai.GenerativeModel(model_name)
     except Exception as e:
         click.echo(f"❌ Error initializing API: {e}", err=True)
         return
+    from src import library_index
+
+    dedup_settings = library_index.resolve_settings(config, {"short_circuit": skip_duplicates})
     
     success_count = 0
     skip_count = 0
@@ -593,12 +718,21 @@ def batch(folder, output, delay, smart):
                 image_data=image_data
             )
             
+            similar = None if "error" in result else library_index.check(config.get("database_name"), "template", result, dedup_settings)
             if "error" in result:
                 click.echo(f"  ❌ Error: {result['error']}")
                 fail_count += 1
                 with open(report_file, "a", encoding="utf-8") as report:
                     report.write(f"| {img_path.name} | ❌ Failed | - | {result['error']} |\n")
+            elif similar and similar["short_circuit"]:
+                closest = library_index.describe(similar["matches"])
+                click.echo(f"  ⏭️ Near-duplicate of {closest}, skipped")
+                skip_count += 1
+                with open(report_file, "a", encoding="utf-8") as report:
+                    report.write(f"| {img_path.name} | ⏭️ Duplicate | - | Closest: {closest} |\n")
             else:
+                if similar:
+                    click.echo(f"  🔁 Similar library prompts: {library_index.describe(similar['matches'])}")
                 # Post-process
                 result = post_process_for_quick_copy(result, model, config, use_smart=smart)
                 
@@ -614,6 +748,8 @@ def batch(folder, output, delay, smart):
                 note = "Smart Extracted" if smart else "Regex Extracted"
                 if vars_count < 4:
                     note += f" | ⚠️ Low vars: {vars_count}"
+                if similar:
+                    note += f" | Similar: {library_index.describe(similar['matches'][:1])}"
                 
                 with open(report_file, "a", encoding="utf-8") as report:
                     report.write(f"| {img_path.name} | ✅ Success | {json_filename} | {note} |\n")
@@ -629,6 +765,7 @@ def batch(folder, output, delay, smart):
                  
     click.echo("-" * 50)
     click.echo(f"🏭 Batch Complete.\n✅ Success: {success_count}\n⏩ Skipped: {skip_count}\n❌ Failed: {fail_count}")
+    echo_request_stats()
     click.echo(f"📄 Report saved to: {report_file}")
     
     click.echo(f"📄 Report saved to: {report_file}")
@@ -637,154 +774,615 @@ def batch(folder, output, delay, smart):
 @cli.command()
 @click.argument("json_path", type=click.Path(exists=True))
 @click.option("--output", default="dist", help="Output directory for packages")
-def package(json_path, output):
+@click.option("--workers", default=None, type=int, help="Worker processes when packaging a directory (default: CPU count).")
+@click.option("--force", is_flag=True, help="Rebuild packages even if their inputs are unchanged.")
+@click.option("--contact-sheet", is_flag=True, help="Also render one contact sheet for the whole directory.")
+def package(json_path, output, workers, force, contact_sheet):
     """
-    Package a processed JSON into a submission-ready ZIP file.
+    Package a processed JSON (or every JSON in a directory) into submission-ready ZIP files.
     """
+    import time
+    from src.packager import package_file, package_directory
+    
+    if Path(json_path).is_dir():
+        click.echo(f"📦 Packaging all JSONs in {json_path}...")
+        result = package_directory(json_path, output, workers=workers, force=force)
+        for item in result["packaged"]:
+            click.echo(f"  🤐 {item['topic']} -> {item['zip_path']} ({item['previews']} preview(s))")
+        for path, error in result["failed"].items():
+            click.echo(f"  ❌ {Path(path).name}: {error}", err=True)
+        click.echo(
+            f"✅ Packaged {len(result['packaged'])}, skipped {len(result['skipped'])} unchanged, "
+            f"failed {len(result['failed'])}"
+        )
+        if contact_sheet:
+            from src.thumbnails import build_batch_sheet
+            sheet = build_batch_sheet(
+                sorted(str(p) for p in Path(json_path).glob("*.json")),
+                str(Path(output) / f"contact_sheet_{int(time.time())}.jpg"),
+                workers=workers
+            )
+            click.echo(f"🖼️ Batch contact sheet: {sheet}" if sheet else "⚠️ No images found for a batch contact sheet")
+        return
+    
     try:
-        import shutil
-        import zipfile
-        import time
-        
-        json_file = Path(json_path)
-        out_root = Path(output)
-        
-        if not out_root.exists():
-            out_root.mkdir(parents=True)
-            
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-        # Project Name
-        topic = data.get("topic", "Unknown").replace(" ", "_")
-        project_name = f"{topic}_{int(time.time())}"
-        package_dir = out_root / project_name
-        package_dir.mkdir(exist_ok=True)
-        
-        click.echo(f"📦 Packaging {topic}...")
-        
-        # 1. Copy JSON
-        shutil.copy(json_path, package_dir / "data.json")
-        
-        # 2. Copy Source Image (if available in metadata)
-        source_path = data.get("source_image_path")
-        if source_path and Path(source_path).exists():
-             shutil.copy(source_path, package_dir / f"source_image{Path(source_path).suffix}")
-             click.echo("  📸 Included source image")
-        else:
-             click.echo("  ⚠️ Source image not found in metadata or disk")
-
-        # 3. Copy/Generate Preview (Look for sibling files)
-        # Naming convention: {json_stem}_preview_1.png
-        parent_dir = json_file.parent
-        previews = list(parent_dir.glob(f"{json_file.stem}*_preview_*.png"))
-        
-        if previews:
-            preview_dir = package_dir / "previews"
-            preview_dir.mkdir()
-            for p in previews:
-                shutil.copy(p, preview_dir / p.name)
-            click.echo(f"  🎨 Included {len(previews)} preview(s)")
-        else:
-            click.echo("  ⚠️ No previews found to include")
-            
-        # 4. Generate submission.txt (PromptBase Ready)
-        pb_data = data.get("promptbase_ready", {})
-        if not pb_data:
-             # Fallback if enhance wasn't run
-             pb_data = {
-                 "title": data.get("topic"),
-                 "description": data.get("description"),
-                 "template": data.get("template"),
-                 "example_prompts": data.get("examples")
-             }
-        
-        submission_text = f"""
-================================================================
-TITLE
-================================================================
-{pb_data.get('title')}
-
-================================================================
-DESCRIPTION
-================================================================
-{pb_data.get('description')}
-
-================================================================
-PROMPT
-================================================================
-{pb_data.get('template')}
-
-================================================================
-TESTING PROMPTS
-================================================================
-"""
-        examples = pb_data.get("example_prompts", [])
-        for ex in examples:
-            submission_text += f"{ex}\n\n"
-            
-        submission_text += f"""
-================================================================
-INSTRUCTIONS
-================================================================
-{data.get('instructions', 'Copy and paste the prompt...')}
-
-================================================================
-TIPS
-================================================================
-"""
-        for tip in data.get("tips", []):
-             submission_text += f"- {tip}\n"
-             
-        # Add Smart Examples if available
-        qc = data.get("quick_copy_examples", [])
-        if qc:
-             submission_text += "\n================================================================\n"
-             submission_text += "VARIABLE EXAMPLES (For Buyer README)\n"
-             submission_text += "================================================================\n"
-             submission_text += json.dumps(qc, indent=2)
-
-        with open(package_dir / "submission.txt", "w", encoding="utf-8") as f:
-            f.write(submission_text)
+        item = package_file(json_path, output)
+        click.echo(f"📦 Packaging {item['topic']}...")
+        click.echo("  📸 Included source image" if item["source_image"] else "  ⚠️ Source image not found in metadata or disk")
+        click.echo(f"  🎨 Included {item['previews']} preview(s)" if item["previews"] else "  ⚠️ No previews found to include")
+        if item["contact_sheet"]:
+            click.echo("  🖼️ Included contact sheet")
         click.echo("  📝 Generated submission.txt")
-        
-        # 5. Create ZIP
-        zip_path = out_root / f"{project_name}.zip"
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for file in package_dir.rglob("*"):
-                if file.is_file():
-                    zf.write(file, file.relative_to(package_dir.parent))
-                    
-        click.echo(f"  🤐 Zipped to: {zip_path}")
+        click.echo(f"  🤐 Zipped to: {item['zip_path']}")
         click.echo(f"✅ Package Complete!")
         
     except Exception as e:
         click.echo(f"❌ Packaging failed: {e}", err=True)
 
+@cli.command("tune-prescreen")
+@click.option("--compliance-threshold", default=35, help="Workflow score below which a package is refined.")
+def tune_prescreen(compliance_threshold):
+    """
+    Fit the local pre-screen calibration against logged LLM evaluations.
+    """
+    from src.prescreen import resolve_settings, load_decisions, fit_calibration, evaluate_thresholds
+    from src.utils import load_config
+    
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        config = {}
+    settings = resolve_settings(config)
+    
+    records = load_decisions(settings["log_path"])
+    calibration = fit_calibration(records)
+    click.echo(f"📊 {len(records)} logged decisions, {calibration['samples']} with LLM scores")
+    if calibration["mae"] is None:
+        click.echo("⚠️ Not enough LLM-scored packages to fit a calibration yet.")
+        return
+    click.echo(f"📐 Calibration: slope={calibration['slope']} intercept={calibration['intercept']} (MAE {calibration['mae']})")
+    
+    click.echo("\n  pass  fail | LLM calls saved | false pass | false fail")
+    for pass_score in (75, 80, 85, 90):
+        for fail_score in (15, 20, 25, 30):
+            stats = evaluate_thresholds(records, calibration, pass_score, fail_score, compliance_threshold)
+            click.echo(f"  {pass_score:>4}  {fail_score:>4} | {stats['skipped_llm']:>15} | {stats['false_pass']:>10} | {stats['false_fail']:>10}")
+    
+    click.echo("\nTo apply, set in config.yaml:")
+    click.echo(f"prescreen:\n  calibration: {{slope: {calibration['slope']}, intercept: {calibration['intercept']}}}")
+
+
+@cli.command("train-categorizer")
+@click.option("--holdout", default=0.2, help="Fraction of categorized prompts held out to measure accuracy.")
+def train_categorizer(holdout):
+    """
+    Retrain the local category classifier from categorized prompts in the library.
+    """
+    from src.categorizer import train_from_rows, MODEL_PATH, MIN_TRAINING_SAMPLES
+    from src.utils import load_config, get_categorized_prompts
+
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        config = {}
+
+    rows = get_categorized_prompts(config.get("database_name", "prompt_library.db"))
+    if len(rows) < MIN_TRAINING_SAMPLES:
+        click.echo(f"⚠️ Only {len(rows)} categorized prompts in the library (need {MIN_TRAINING_SAMPLES}).")
+        return
+
+    result = train_from_rows(rows, holdout=holdout)
+    click.echo(f"📊 Trained on {result['samples']} prompts across {len(result['label_counts'])} categories:")
+    for label, count in sorted(result["label_counts"].items(), key=lambda x: -x[1]):
+        click.echo(f"  • {label}: {count}")
+
+    click.echo(f"\n🎯 Training accuracy: {result['training_accuracy']:.1%}")
+    if result["holdout_accuracy"] is not None:
+        click.echo(f"🎯 Holdout accuracy: {result['holdout_accuracy']:.1%}")
+
+    result["classifier"].save(MODEL_PATH)
+    click.echo(f"✅ Model saved to {MODEL_PATH}")
+
+
+@cli.command()
+@click.argument("source", type=click.Path(exists=True))
+@click.option("--output", default=None, help="Findings JSONL file. Defaults to logs/audit_<timestamp>.jsonl")
+@click.option("--workers", default=None, type=int, help="Worker processes (default: CPU count).")
+@click.option("--full", is_flag=True, help="Re-audit every package, ignoring the previous run.")
+def audit(source, output, workers, full):
+    """
+    Audit a published/ directory or a prompt database with the local validators (no LLM calls).
+    """
+    import time
+    from src.audit import run_audit
+
+    if not output:
+        output = str(Path(__file__).parent / "logs" / f"audit_{int(time.time())}.jsonl")
+
+    click.echo(f"🔍 Auditing {source}{' (full)' if full else ''}...")
+    summary = run_audit(source, output, workers=workers, incremental=not full)
+
+    click.echo(f"\n📊 {summary['total']} packages: ✅ {summary['passed']} passed, ❌ {summary['failed']} with findings")
+    click.echo(f"🔄 Audited {summary['audited']}, skipped {summary['skipped_unchanged']} unchanged ({summary['elapsed']}s)")
+    for check, count in sorted(summary["by_check"].items(), key=lambda x: -x[1]):
+        click.echo(f"  • {check}: {count}")
+    click.echo(f"📄 Findings saved to: {summary['output']}")
+
+
 @cli.command("list")
-def list_published():
-    """List all published prompts."""
+@click.option("--search", "-s", default="", help="Filter by text in the topic.")
+@click.option("--platform", default="", help="Filter by platform.")
+@click.option("--category", default="", help="Filter by category.")
+@click.option("--min-vars", default=0, help="Only packages with at least this many variables.")
+@click.option("--sort", default="mtime", type=click.Choice(["mtime", "topic", "size", "variables", "platform", "category"]),
+              help="Sort column (default: newest first).")
+@click.option("--asc", is_flag=True, help="Sort ascending.")
+@click.option("--page", default=1, help="Page number.")
+@click.option("--per-page", default=20, help="Packages per page.")
+def list_published(search, platform, category, min_vars, sort, asc, page, per_page):
+    """List published prompts (indexed catalog of published/)."""
+    from src.catalog import scan_directory, query_catalog
+    
     published_dir = Path(__file__).parent / "published"
     
     if not published_dir.exists():
         click.echo("📁 No published directory found")
         return
     
-    files = list(published_dir.glob("*.json"))
-    click.echo(f"\n📚 Found {len(files)} published prompts:\n")
+    scan_directory(str(published_dir))
+    page = max(page, 1)
+    rows, total = query_catalog(
+        str(published_dir), search=search, platform=platform, category=category, min_variables=min_vars,
+        sort=sort, descending=not asc, limit=per_page, offset=(page - 1) * per_page
+    )
+    click.echo(f"\n📚 Found {total} published prompts:\n")
     
-    for f in sorted(files, key=lambda x: x.stat().st_mtime, reverse=True)[:20]:
-        try:
-            with open(f, "r", encoding="utf-8") as fp:
-                data = json.load(fp)
-                topic = data.get("topic", "Unknown")
-                click.echo(f"  • {topic} ({f.name})")
-        except:
-            click.echo(f"  • [Error reading] {f.name}")
+    for row in rows:
+        details = ", ".join(d for d in (row["platform"], row["category"], f"{row['variable_count']} vars") if d)
+        click.echo(f"  • {row['topic']} [{details}] ({row['path']})")
     
-    if len(files) > 20:
-        click.echo(f"\n  ... and {len(files) - 20} more")
+    pages = max((total + per_page - 1) // per_page, 1)
+    if pages > 1:
+        click.echo(f"\n  Page {page} of {pages} (use --page to see more)")
 
 
-if __name__ == "__main__":
+@cli.command()
+@click.option("--host", default="127.0.0.1", help="Interface to bind (default: localhost only).")
+@click.option("--port", default=8765, help="Port to listen on.")
+@click.option("--workers", default=4, help="Jobs run concurrently; the rest wait in the queue.")
+@click.option("--max-queued", default=500, help="Queued jobs before submissions are rejected with 429.")
+def serve(host, port, workers, max_queued):
+    """
+    Serve the workflow, reverse engineering and packaging as a local HTTP API with SSE progress.
+    """
+    from src.service import JobManager, create_server, default_runners
+    from src.utils import load_config
+
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("❌ Error: config.yaml or prompts.yaml not found", err=True)
+        return
+    api_key = get_api_key()
+    configure_gemini(api_key)
+
+    manager = JobManager(default_runners(config, api_key), workers=workers, max_queued=max_queued)
+    server = create_server(manager, host, port)
+    click.echo(f"🌐 Serving on http://{host}:{port} ({workers} workers)")
+    click.echo("   POST /jobs/{workflow,reverse,package} · GET /jobs/<id> · GET /jobs/<id>/events · GET /health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
+    click.echo("👋 Service stopped")
+
+
+@cli.command()
+@click.option("--folder", required=True, type=click.Path(exists=True), help="Input folder containing images.")
+@click.option("--output", default=None, help="Output folder for JSONs and previews. Defaults to 'processed/' inside input folder.")
+@click.option("--dist", default="dist", help="Output directory for packages.")
+@click.option("--previews", default=1, help="Final previews per package (0 to skip the preview stage).")
+@click.option("--model", default="flux", type=click.Choice(["flux", "sdxl"]), help="Model to use for previews.")
+@click.option("--smart", is_flag=True, help="Use Smart Mode (LLM) for quick-copy extraction.")
+@click.option("--gemini-workers", default=2, help="Concurrent items in the Gemini stages (reverse, enhance).")
+@click.option("--hf-workers", default=2, help="Concurrent items in the Hugging Face preview stage.")
+@click.option("--cpu-workers", default=None, type=int, help="Concurrent items in the packaging stage (default: CPU count).")
+@click.option("--queue-size", default=8, help="Items buffered between stages before upstream stages wait.")
+def pipeline(folder, output, dist, previews, model, smart, gemini_workers, hf_workers, cpu_workers, queue_size):
+    """
+    Stream every image in a folder through reverse -> enhance -> preview -> package.
+    Re-running resumes each image from its first unfinished stage.
+    """
+    import google.generativeai as genai
+    from PIL import Image
+    from src.api_handler import agent_reverse_engineer_from_image
+    from src.quality_enhancers import enhance_package
+    from src.packager import package_file, name_suffix
+    from src.pipeline import Pipeline, PipelineState, Stage, state_path_for
+    from src.previews import list_previews, preview_filename
+    from src.profiles import resolve_profile, request_kwargs
+    from src.utils import load_config
+
+    input_path = Path(folder)
+    out_dir = Path(output) if output else input_path / "processed"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    extensions = {".jpg", ".jpeg", ".png", ".webp", ".heic"}
+    images = sorted(f for f in input_path.iterdir() if f.suffix.lower() in extensions)
+    if not images:
+        click.echo(f"⚠️ No images found in {folder}")
+        return
+
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("❌ Error: config.yaml or prompts.yaml not found", err=True)
+        return
+    configure_gemini(get_api_key())
+    model_name = config.get("default_model", "gemini-2.5-flash-lite")
+    gemini_model = genai.GenerativeModel(model_name)
+    enhancer_requests = {
+        name: request_kwargs(resolve_profile(name, config), json_mode=True)
+        for name in ("fix_title", "inject_abstract_examples")
+    }
+    preview_model = "black-forest-labs/FLUX.1-schnell" if model == "flux" else "stabilityai/stable-diffusion-xl-base-1.0"
+
+    def reverse_stage(item):
+        target = out_dir / f"reverse_{Path(item['image_path']).stem}.json"
+        if target.exists():
+            return {"json_path": str(target)}
+        result = agent_reverse_engineer_from_image(
+            model=gemini_model, prompts_config=config, image_data=Image.open(item["image_path"])
+        )
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        result = post_process_for_quick_copy(result, gemini_model, config, use_smart=smart)
+        result["source_image_path"] = str(Path(item["image_path"]).resolve())
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        return {"json_path": str(target)}
+
+    def enhance_stage(item):
+        with open(item["json_path"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data = enhance_package(data, model_name=model_name, requests=enhancer_requests)
+        with open(item["json_path"], "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return {"topic": data.get("topic", "")}
+
+    def preview_stage(item):
+        from src.hf_handler import generate_preview_image
+
+        with open(item["json_path"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        prompts = data.get("examples") or [data.get("template", "")]
+        existing = len(list_previews(item["json_path"]))
+        for i in range(existing, min(previews, len(prompts))):
+            prompt = prompts[i] if isinstance(prompts[i], str) else json.dumps(prompts[i])
+            path = Path(item["json_path"]).parent / preview_filename(Path(item["json_path"]).stem, i + 1)
+            result = generate_preview_image(prompt, str(path), model=preview_model)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "preview generation failed"))
+        return {"previews": len(list_previews(item["json_path"]))}
+
+    def package_stage(item):
+        result = package_file(item["json_path"], dist, name_suffix(item["json_path"]))
+        return {"zip_path": result["zip_path"]}
+
+    stages = [
+        Stage("reverse", reverse_stage, workers=gemini_workers),
+        Stage("enhance", enhance_stage, workers=gemini_workers),
+        Stage("preview", preview_stage, workers=hf_workers) if previews > 0 else None,
+        Stage("package", package_stage, workers=cpu_workers or os.cpu_count() or 1)
+    ]
+    stages = [stage for stage in stages if stage]
+
+    def on_event(stage, item, status, detail):
+        mark = {"done": "✅", "skipped": "⏩", "failed": "❌"}[status]
+        click.echo(f"  {mark} {stage:<8} {item['id']}{f' - {detail}' if detail else ''}")
+
+    click.echo(f"🏭 Pipeline: {len(images)} image(s) -> {' -> '.join(s.name for s in stages)}")
+    click.echo(f"📂 Output: {out_dir} | 📦 Packages: {dist}")
+    runner = Pipeline(stages, PipelineState(state_path_for(str(out_dir))), queue_size=queue_size, on_event=on_event)
+    summary = runner.run({"id": img.name, "image_path": str(img)} for img in images)
+
+    click.echo("-" * 50)
+    click.echo(f"✅ Completed: {len(summary['completed'])} | ❌ Failed: {len(summary['failed'])} | ⏱️ {summary['elapsed_seconds']}s")
+    for name, metrics in summary["stages"].items():
+        rate = f"{metrics['items_per_minute']}/min" if metrics["items_per_minute"] is not None else "-"
+        click.echo(
+            f"  • {name:<8} x{metrics['workers']}: {metrics['processed']} done, {metrics['skipped']} resumed, "
+            f"{metrics['failed']} failed | {rate} | busy {metrics['busy_seconds']}s, "
+            f"waiting on next stage {metrics['blocked_seconds']}s, max queue {metrics['max_queue']}"
+        )
+    for item_id, failure in summary["failed"].items():
+        click.echo(f"  ❌ {item_id} at {failure['stage']}: {failure['error']}", err=True)
+    echo_request_stats()
+
+
+@cli.command()
+@click.option("--theme", default=None, help="Generate concepts for this theme and build a package for each.")
+@click.option("--topics", "topics_csv", default=None, type=click.Path(exists=True),
+              help="CSV of topics (columns: topic, style, use_case, content_type, platform).")
+@click.option("--platform", default="Midjourney", help="Target platform for items that do not set one.")
+@click.option("--content-type", default="Image", type=click.Choice(["Image", "Text", "Video"]), help="Default content type.")
+@click.option("--concurrency", default=None, type=int, help="Workflows in flight (default: fanout.max_concurrency).")
+@click.option("--budget", default=None, type=int, help="Stop starting items after this many model requests (default: fanout.max_requests).")
+@click.option("--batch-size", default=None, type=int,
+              help="Initial packages generated per request (default: fanout.initial_batch_size; 1 = one request per item).")
+@click.option("--skip-duplicates", is_flag=True, default=None,
+              help="Skip topics that nearly duplicate a library prompt (default: library_dedup.short_circuit).")
+@click.option("--no-save", is_flag=True, help="Do not save finished packages to the prompt library.")
+def fanout(theme, topics_csv, platform, content_type, concurrency, budget, batch_size, skip_duplicates, no_save):
+    """
+    Build packages for many concepts at once (from --theme or a --topics CSV).
+    """
+    import google.generativeai as genai
+    from src.fanout import fan_out, resolve_settings, concepts_to_inputs, read_topics_csv, library_saver
+    from src.run_agentic_workflow import run_workflow
+    from src.utils import load_config, initialize_database
+
+    if bool(theme) == bool(topics_csv):
+        click.echo("❌ Pass exactly one of --theme or --topics", err=True)
+        return
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("❌ Error: config.yaml or prompts.yaml not found", err=True)
+        return
+    api_key = get_api_key()
+    configure_gemini(api_key)
+    model_name = config.get("default_model", "gemini-2.5-flash-lite")
+    defaults = {"model_platform": platform, "content_type": content_type}
+
+    if topics_csv:
+        with open(topics_csv, "r", encoding="utf-8-sig") as f:
+            inputs = read_topics_csv(f.read(), defaults)
+    else:
+        from src.api_handler import agent_generate_concepts
+
+        click.echo(f"💡 Generating concepts for '{theme}'...")
+        concepts = agent_generate_concepts(genai.GenerativeModel(model_name), config, theme, {})
+        if "error" in concepts:
+            click.echo(f"❌ Error: {concepts['error']}", err=True)
+            return
+        inputs = concepts_to_inputs(concepts.get("concepts", []), defaults)
+    if not inputs:
+        click.echo("⚠️ No topics to build")
+        return
+
+    from src import library_index
+
+    database_name = config.get("database_name", "prompt_library.db")
+    if not no_save or os.path.exists(database_name):
+        initialize_database(database_name)  # also indexes library prompts saved before the similarity index
+    config = dict(config, library_dedup=library_index.resolve_settings(config, {"short_circuit": skip_duplicates}))
+    inputs, duplicates = library_index.split_duplicates(database_name, inputs, config["library_dedup"])
+    for user_inputs, similar in duplicates:
+        click.echo(f"  ⏭️ {user_inputs['topic']}: near-duplicate of {library_index.describe(similar['matches'])}")
+    if not inputs:
+        click.echo("⚠️ Every topic is already in the library")
+        return
+
+    settings = resolve_settings(config, {"max_concurrency": concurrency, "max_requests": budget, "initial_batch_size": batch_size})
+    on_result = None if no_save else library_saver(database_name)
+
+    def workflow(user_inputs):
+        return run_workflow(api_key, model_name, config.get("evaluator_model_name", model_name), config, user_inputs)
+
+    def generate_initial(items, size):
+        from src.api_handler import agent_generate_initial_prompts
+
+        click.echo(f"📝 Generating {len(items)} initial package(s), up to {size} per request...")
+        return agent_generate_initial_prompts(genai.GenerativeModel(model_name), config, items, batch_size=size)
+
+    budget_note = f", budget {settings['max_requests']} requests" if settings["max_requests"] else ""
+    click.echo(f"🌱 Fanning out {len(inputs)} topic(s), {settings['max_concurrency']} at a time{budget_note}...")
+    counts = {"completed": 0, "error": 0, "skipped": len(duplicates)}
+    for result in fan_out(workflow, inputs, settings, on_result=on_result, generate_initial=generate_initial):
+        counts[result["status"]] += 1
+        topic = result["user_inputs"]["topic"]
+        if result["status"] == "completed":
+            saved = " (saved to library)" if result.get("saved") else ""
+            click.echo(f"  ✅ {topic} -> {result['prompt_package'].get('topic', topic)}{saved}")
+        else:
+            click.echo(f"  {'⏭️' if result['status'] == 'skipped' else '❌'} {topic}: {result['error']}")
+    click.echo(f"🌳 Done: {counts['completed']} built, {counts['error']} failed, {counts['skipped']} skipped")
+    echo_request_stats()
+
+
+def queue_database():
+    """The database holding the job queue (the prompt library database from config.yaml)."""
+    from src.utils import load_config
+
+    if not os.path.exists("config.yaml"):
+        return "prompt_library.db"
+    return load_config(["config.yaml"]).get("database_name", "prompt_library.db")
+
+
+def worker_handlers(config, api_key):
+    """Job handlers for `cli.py worker`: queued batch images plus the HTTP service's job kinds."""
+    from src.service import default_runners
+
+    handlers = default_runners(config, api_key)
+
+    def run_image_job(payload, emit):
+        import google.generativeai as genai
+        from PIL import Image
+        from src.api_handler import agent_reverse_engineer_from_image
+
+        model = genai.GenerativeModel(config.get("default_model", "gemini-2.5-flash-lite"))
+        result = agent_reverse_engineer_from_image(
+            model=model,
+            prompts_config=config,
+            image_data=Image.open(payload["image_path"]),
+            additional_context=payload.get("context", "")
+        )
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        from src import library_index
+
+        settings = library_index.resolve_settings(config, {"short_circuit": payload.get("skip_duplicates")})
+        similar = library_index.check(config.get("database_name"), "template", result, settings)
+        if similar:
+            emit({"step": "Duplicate Check", "output": f"Similar library prompts: {library_index.describe(similar['matches'])}"})
+            if similar["short_circuit"]:
+                return {"skipped": "duplicate", "duplicate_of": similar["matches"]}
+        result = post_process_for_quick_copy(result, model, config, use_smart=payload.get("smart", False))
+        with open(payload["output_path"], "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        return {"output_path": payload["output_path"], "variables": len(result.get("variables", []))}
+
+    handlers["image"] = run_image_job
+    return handlers
+
+
+@cli.command()
+@click.option("--db", default=None, help="Queue database (default: database_name from config.yaml).")
+@click.option("--lane", "lanes", multiple=True, type=click.Choice(["interactive", "batch"]),
+              help="Only claim jobs from these lanes (repeatable; default: all, interactive first).")
+@click.option("--lease", default=300, help="Lease length in seconds; renewed by heartbeats while a job runs.")
+@click.option("--max-jobs", default=None, type=int, help="Exit after this many jobs.")
+@click.option("--exit-when-idle", is_flag=True, help="Exit once no job is runnable instead of polling.")
+@click.option("--poll", default=5.0, help="Seconds between polls when the queue is empty.")
+def worker(db, lanes, lease, max_jobs, exit_when_idle, poll):
+    """
+    Claim and process jobs from the durable job queue (run several for parallelism).
+    """
+    from src.jobqueue import Worker
+    from src.utils import load_config
+
+    try:
+        config = load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("❌ Error: config.yaml or prompts.yaml not found", err=True)
+        return
+    api_key = get_api_key()
+    configure_gemini(api_key)
+
+    runner = Worker(db or queue_database(), worker_handlers(config, api_key), lanes=lanes, lease_seconds=lease)
+    click.echo(f"👷 Worker {runner.name} on {runner.db_path} (lanes: {', '.join(lanes) or 'all'})")
+
+    def on_event(job, event):
+        click.echo(f"  [{job['id']}] {event.get('step', '')}: {event.get('output', '')}")
+
+    def on_job(job):
+        mark = "✅" if job["status"] == "done" else "❌"
+        click.echo(f"{mark} Job {job['id']} ({job['kind']}, {job['lane']}, attempt {job['attempts']}) {job.get('error') or ''}")
+
+    try:
+        done = runner.run(max_jobs=max_jobs, poll_seconds=poll, exit_when_idle=exit_when_idle, on_event=on_event, on_job=on_job)
+        click.echo(f"👷 Processed {done} job(s)")
+    except KeyboardInterrupt:
+        click.echo("⏹️ Interrupted; the running job's lease will expire and it will be retried.")
+    echo_request_stats()
+
+
+@cli.command("queue")
+@click.option("--db", default=None, help="Queue database (default: database_name from config.yaml).")
+@click.option("--retry-failed", is_flag=True, help="Requeue failed jobs with a fresh attempt budget.")
+def queue_status_command(db, retry_failed):
+    """Show job queue depth per lane, active workers and throughput."""
+    from src.jobqueue import queue_status, retry_failed as requeue_failed
+
+    db_path = db or queue_database()
+    if retry_failed:
+        click.echo(f"🔁 Requeued {requeue_failed(db_path)} failed job(s)")
+
+    status = queue_status(db_path)
+    click.echo(f"\n📋 Job queue ({db_path}):")
+    for lane, counts in status["lanes"].items():
+        click.echo(
+            f"  • {lane}: {counts.get('queued', 0)} queued, {counts.get('running', 0)} running, "
+            f"{counts.get('done', 0)} done, {counts.get('failed', 0)} failed"
+        )
+    click.echo(f"👷 Active workers: {status['workers']} | Expired leases awaiting retry: {status['expired_leases']}")
+    average = f", avg {status['avg_seconds']}s/job" if status["avg_seconds"] is not None else ""
+    click.echo(f"⚡ Throughput (last hour): {status['completed_recent']} jobs, {status['jobs_per_minute']}/min{average}")
+    if status["oldest_queued_seconds"] is not None:
+        click.echo(f"⏳ Oldest queued job: {status['oldest_queued_seconds']}s")
+
+
+@cli.group()
+def daemon():
+    """Warm daemon that serves CLI commands over a Unix socket."""
+
+
+@daemon.command("start")
+def daemon_start():
+    """
+    Run the daemon in the foreground (stop with Ctrl+C or `daemon stop`).
+    """
+    from src.daemon import Daemon
+
+    click.echo("🔥 Warming up (SDKs, config, key pools)...")
+    import importlib
+    from src.keypool import get_pool
+    from src.utils import load_config
+
+    for module in ("google.generativeai", "PIL.Image", "src.api_handler", "src.hf_handler", "src.packager"):
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            click.echo(f"⚠️ Could not preload {module}: {e}", err=True)
+    try:
+        load_config(["config.yaml", "prompts.yaml"])
+    except FileNotFoundError:
+        click.echo("⚠️ config.yaml or prompts.yaml not found; commands will report it", err=True)
+    configure_gemini(get_api_key())
+    get_pool("hf")
+
+    server = Daemon(cli)
+    try:
+        server.serve_forever(ready=lambda: click.echo(f"✅ Daemon listening on {server.path} (pid {os.getpid()})"))
+    except RuntimeError as e:
+        click.echo(f"❌ {e}", err=True)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    click.echo("👋 Daemon stopped")
+
+
+@daemon.command("status")
+def daemon_status():
+    """Show whether the daemon is running."""
+    from src.daemon import status, socket_path
+
+    info = status()
+    if not info:
+        click.echo(f"💤 No daemon listening on {socket_path()}")
+        return
+    click.echo(
+        f"🔥 Daemon pid {info['pid']} on {info['socket']} | cwd {info['cwd']} | "
+        f"up {info['uptime']}s | {info['requests']} request(s), {info['active']} active"
+    )
+
+
+@daemon.command("stop")
+def daemon_stop():
+    """Stop a running daemon."""
+    from src.daemon import stop
+
+    click.echo("✅ Daemon stopping" if stop() else "💤 No daemon running")
+
+
+# Commands a running daemon serves; everything else always runs in-process.
+DAEMON_COMMANDS = {"reverse", "create", "market", "enhance", "preview", "package"}
+
+
+def main():
+    """Entry point: forwards daemon-served commands when a daemon is running, else runs in-process."""
+    argv = sys.argv[1:]
+    if argv and argv[0] in DAEMON_COMMANDS:
+        from src.daemon import forward
+
+        code = forward(argv)
+        if code is not None:
+            sys.exit(code)
     cli()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,34 @@ Modules:
 - utils: Database and file utilities
 - quality_enhancers: Post-processing pipeline
 - workflow: Agentic workflow orchestration
+
+Submodules are imported on first use: `import src.catalog` does not load the
+Gemini SDK, and `from src import agent_generate_initial_prompt` still works.
 """
 
-from .api_handler import *
-from .utils import load_config, initialize_database, save_prompt_to_db
-from .quality_enhancers import enhance_package
+import importlib
+import importlib.util
+
+# --- Lazy Exports ---
+
+_EXPORTS = {
+    "load_config": "utils",
+    "initialize_database": "utils",
+    "save_prompt_to_db": "utils",
+    "enhance_package": "quality_enhancers"
+}
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if importlib.util.find_spec(f".{name}", __name__):
+        # `from src import <submodule>` asks for the attribute before importing the submodule
+        return importlib.import_module(f".{name}", __name__)
+    module = importlib.import_module(f".{_EXPORTS.get(name, 'api_handler')}", __name__)
+    try:
+        value = getattr(module, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
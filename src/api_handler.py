@@ -1,29 +1,37 @@
 
 import google.generativeai as genai
-from google.generativeai import types as genai_types
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import re
 import json
 import logging
-import requests
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from .fetcher import fetch_page_text, MAX_PAGE_TOKENS
+from .categorizer import classify_package, DEFAULT_CONFIDENCE_THRESHOLD
+from .quality_enhancers import get_matcher
+from .structured import RESPONSE_SCHEMAS, request_schema, validate_json, parse_json
+from .profiles import resolve_profile, request_kwargs, model_for
+from .policy import get_policy, is_transient
+from .keypool import get_pool, bind_client, is_quota_error
 
 logger = logging.getLogger(__name__)
 
+# Attempts per JSON agent call; a re-request only happens when local repair and validation fail
+JSON_ATTEMPTS = 2
+# Items per batched initial-generation request
+INITIAL_BATCH_SIZE = 4
+
 # --- Core Helper Functions ---
 
-def _generate_response(model: genai.GenerativeModel, prompt: str) -> Dict[str, Any]:
+def _request(model: genai.GenerativeModel, prompt: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Generates a response from the Gemini model with a standardized configuration.
+    Issues one generate_content request.
     Robustly handles cases where the model returns no text (e.g., safety block, max tokens).
+    Errors carry 'transient' (for the request policy's retries) and 'quota' flags.
     """
     try:
-        generation_config = genai_types.GenerationConfig(
-            temperature=0.7,
-            max_output_tokens=8192,
-            top_p=0.95,
-            top_k=40
-        )
-        response = model.generate_content(prompt, generation_config=generation_config)
+        response = model.generate_content(prompt, **kwargs)
         
         # Check if we have a valid candidate
         if not response.candidates:
@@ -56,29 +64,122 @@ def _generate_response(model: genai.GenerativeModel, prompt: str) -> Dict[str, A
         return {"error": f"Model generation failed (invalid response structure): {str(ve)}"}
 
     except Exception as e:
+        if is_transient(e):
+            logger.warning(f"Gemini API transient error: {e}")
+            return {"error": str(e), "transient": True, "quota": is_quota_error(e)}
         logger.error(f"Gemini API Generation Error: {e}", exc_info=True)
         return {"error": str(e)}
 
+def _call_model(model: genai.GenerativeModel, prompt: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Issues one request on the least-loaded pooled API key (the globally
+    configured key when the pool is empty); keys hitting quota errors are benched.
+    """
+    pool = get_pool("gemini")
+    if not len(pool):
+        result = _request(model, prompt, kwargs)
+        result.pop("quota", None)
+        return result
+    try:
+        with pool.lease() as key:
+            result = _request(bind_client(model, key), prompt, kwargs)
+            if result.pop("quota", False):
+                pool.bench(key)
+    except RuntimeError as e:
+        return {"error": str(e), "transient": True}
+    return result
+
+def _generate_response(
+    model: genai.GenerativeModel,
+    prompt: Any,
+    json_mode: bool = False,
+    response_schema: Optional[Dict[str, Any]] = None,
+    profile: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Generates a response from the Gemini model using the agent's generation profile
+    (model, sampling limits, timeout, stop sequences; the default profile if none),
+    under the profile's request policy (deadline, hedging, retries).
+    `json_mode` asks for a raw JSON reply, constrained by `response_schema` if given.
+    """
+    profile = profile or resolve_profile("default")
+    kwargs = request_kwargs(profile, json_mode=json_mode)
+    if json_mode and response_schema:
+        kwargs["generation_config"]["response_schema"] = response_schema
+
+    primary = model_for(model, profile)
+    settings = profile["policy"]
+    fallback = model_for(primary, {"model": settings["hedge_fallback_model"]}) if settings.get("hedge_fallback_model") else None
+    return get_policy().execute(
+        lambda m: _call_model(m, prompt, kwargs),
+        primary,
+        key=f"{profile['name']}:{getattr(primary, 'model_name', '')}",
+        settings=settings,
+        fallback_model=fallback
+    )
+
 def _parse_json_from_response(response_text: str) -> Dict[str, Any]:
     """
-    Robustly parses a JSON object from a string.
+    Robustly parses a JSON object from a string, repairing it locally if needed.
     """
     try:
-        json_match = re.search(r'''```json\s*([\s\S]*?)\s*```''', response_text)
-        if json_match:
-            json_string = json_match.group(1)
-        else:
-            start_index = response_text.find('{')
-            end_index = response_text.rfind('}')
-            if start_index != -1 and end_index != -1 and end_index > start_index:
-                json_string = response_text[start_index : end_index + 1]
-            else:
-                raise ValueError("No valid JSON structure found in the response.")
-        return json.loads(json_string)
-    except (json.JSONDecodeError, ValueError) as e:
+        parsed = parse_json(response_text)
+        if not isinstance(parsed, dict):
+            raise ValueError(f"Expected a JSON object, got {type(parsed).__name__}.")
+        return parsed
+    except ValueError as e:
         logger.error(f"Failed to parse JSON response: {e}\nRaw Response:\n{response_text}")
         return {"error": "The AI model returned a response that could not be understood."}
 
+def _is_structured_output_rejection(error: str) -> bool:
+    """True when the model/API refused the JSON mime type or response schema itself."""
+    lowered = error.lower()
+    return "response_mime_type" in lowered or "response_schema" in lowered or "mime type" in lowered
+
+def _generate_json(
+    model: genai.GenerativeModel,
+    prompt: Any,
+    schema_name: str,
+    profile: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Requests a JSON reply for one of the RESPONSE_SCHEMAS and validates it.
+
+    Replies are parsed with local repair first; the model is only asked again
+    (up to JSON_ATTEMPTS) when the repaired reply still fails to parse or validate.
+    Models that reject structured output are retried once in plain-text mode.
+
+    Returns:
+        dict: {'data': parsed JSON, 'text': raw reply} or {'error': ...}
+    """
+    schema = RESPONSE_SCHEMAS[schema_name]
+    structured = True
+    attempts = 0
+    while attempts < JSON_ATTEMPTS:
+        response = _generate_response(
+            model, prompt,
+            json_mode=structured,
+            response_schema=request_schema(schema_name) if structured else None,
+            profile=profile
+        )
+        if "error" in response:
+            if structured and _is_structured_output_rejection(response["error"]):
+                logger.warning(f"Structured output rejected for '{schema_name}'; retrying without it.")
+                structured = False
+                continue
+            return response
+        attempts += 1
+
+        parsed = _parse_json_from_response(response["text"])
+        if "error" in parsed:
+            continue
+        errors = validate_json(parsed, schema)
+        if not errors:
+            return {"data": parsed, "text": response["text"]}
+        logger.warning(f"Response for '{schema_name}' failed validation (attempt {attempts}): {'; '.join(errors[:3])}")
+
+    return {"error": "The AI model returned a response that could not be understood."}
+
 # --- Agent Functions ---
 
 def agent_analyze_market(
@@ -87,35 +188,47 @@ def agent_analyze_market(
     url: str
 ) -> Dict[str, Any]:
     """
-    Agent: Fetches content from a URL using the requests library and analyzes it.
+    Agent: Fetches a URL (cached, HTML stripped to main text) and analyzes it.
     """
     logger.info(f"Agent 'analyze_market' starting for URL: {url}")
 
-    try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()  # Raise an exception for bad status codes
-        html_content = response.text
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request to {url} failed: {e}", exc_info=True)
-        return {"error": f"Failed to fetch content from URL: {url}. Reason: {e}"}
+    page = fetch_page_text(url, max_tokens=prompts_config.get("market_page_max_tokens", MAX_PAGE_TOKENS))
+    if "error" in page:
+        return page
 
     meta_prompt_template = prompts_config.get("market_analysis_prompt")
     if not meta_prompt_template:
         return {"error": "No 'market_analysis_prompt' found in prompts configuration."}
 
-    meta_prompt = meta_prompt_template.format(html_content=html_content)
+    meta_prompt = meta_prompt_template.format(html_content=page["text"])
     
-    model_response = _generate_response(model, meta_prompt)
+    model_response = _generate_json(model, meta_prompt, "market_analysis", resolve_profile("analyze_market", prompts_config))
     if "error" in model_response:
         return model_response
-
-    parsed_json = _parse_json_from_response(model_response["text"])
-    if "error" in parsed_json:
-        return parsed_json
+    parsed_json = model_response["data"]
 
     logger.info("Agent 'analyze_market' completed successfully.")
     return parsed_json
 
+def agent_analyze_markets(
+    model: genai.GenerativeModel,
+    prompts_config: Dict[str, Any],
+    urls: List[str],
+    max_workers: int = 4
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Agent: Runs `agent_analyze_market` for several URLs concurrently.
+    Returns a mapping of URL -> analysis (or {'error': ...}) in input order.
+    """
+    logger.info(f"Agent 'analyze_markets' starting for {len(urls)} URLs.")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        # Copy the caller's context so its request meters (see policy.metered) count these calls
+        futures = {
+            url: executor.submit(contextvars.copy_context().run, agent_analyze_market, model, prompts_config, url)
+            for url in urls
+        }
+    return {url: future.result() for url, future in futures.items()}
+
 def agent_generate_concepts(
     model: genai.GenerativeModel,
     prompts_config: Dict[str, Any],
@@ -136,13 +249,10 @@ def agent_generate_concepts(
         theme=theme
     )
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_json(model, meta_prompt, "concepts", resolve_profile("generate_concepts", prompts_config))
     if "error" in response:
         return response
-
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return parsed_json
+    parsed_json = response["data"]
     
     logger.info("Agent 'generate_concepts' completed successfully.")
     return parsed_json
@@ -175,23 +285,29 @@ def agent_generate_initial_prompt(
         reference_examples=""
     )
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_json(model, meta_prompt, "initial_prompt", resolve_profile("generate_initial_prompt", prompts_config))
     if "error" in response:
         return response
 
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return parsed_json
+    initial_prompt_package = _initial_package(
+        {"topic": topic, "content_type": content_type, "style": style, "use_case": use_case, "model_platform": model_platform},
+        response["data"],
+        response["text"]
+    )
+    
+    logger.info("Agent 'generate_initial_prompt' completed successfully.")
+    return initial_prompt_package
 
+def _initial_package(item: Dict[str, Any], parsed_json: Dict[str, Any], raw_response: str) -> Dict[str, Any]:
+    """Builds the initial prompt package for one (topic, content_type, style, use_case, model_platform) item."""
     template = parsed_json.get("template", "")
     variables = list(set(re.findall(r'\[(.*?)\]', template)))
-    
-    initial_prompt_package = {
-        "topic": topic,
-        "content_type": content_type,
-        "platform": model_platform,
-        "style": style,
-        "use_case": use_case,
+    return {
+        "topic": item["topic"],
+        "content_type": item["content_type"],
+        "platform": item["model_platform"],
+        "style": item.get("style", ""),
+        "use_case": item.get("use_case", ""),
         "template": template,
         "variables": variables,
         "variable_explanations": parsed_json.get("variables_explanation", {}),
@@ -199,11 +315,118 @@ def agent_generate_initial_prompt(
         "tips": parsed_json.get("technical_tips", []),
         "description": parsed_json.get("description", ""),
         "instructions": parsed_json.get("instructions", ""),
-        "raw_response": response["text"]
+        "raw_response": raw_response
     }
-    
-    logger.info("Agent 'generate_initial_prompt' completed successfully.")
-    return initial_prompt_package
+
+def _generate_initial_batch(
+    model: genai.GenerativeModel,
+    prompts_config: Dict[str, Any],
+    items: List[Dict[str, Any]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    One request for several items of the same content type.
+    Returns packages by position in `items`; items missing from the reply or
+    failing validation are left out.
+    """
+    content_type = items[0]["content_type"]
+    instructions = prompts_config[f"{content_type.lower()}_meta_prompt"].format(
+        model_platform="the item's platform",
+        topic="the item's topic",
+        style="the item's style",
+        use_case="the item's use case",
+        reference_examples=""
+    )
+    listing = "\n".join(
+        f"{i}. platform: {item['model_platform']} | topic: {item['topic']} | "
+        f"style: {item.get('style') or 'any'} | use case: {item.get('use_case') or 'any'}"
+        for i, item in enumerate(items)
+    )
+    meta_prompt = prompts_config["batch_initial_prompt_meta_prompt"].format(
+        count=len(items), items=listing, instructions=instructions
+    )
+
+    response = _generate_json(model, meta_prompt, "initial_prompts", resolve_profile("generate_initial_prompts", prompts_config))
+    if "error" in response:
+        logger.warning(f"Batched initial generation failed for {len(items)} items: {response['error']}")
+        return {}
+
+    packages = {}
+    for entry in response["data"]["packages"]:
+        index = entry.get("index")
+        if not isinstance(index, int) or not 0 <= index < len(items) or index in packages:
+            continue
+        errors = validate_json(entry, RESPONSE_SCHEMAS["initial_prompt"])
+        if errors:
+            logger.warning(f"Batched package {index} ('{items[index]['topic']}') failed validation: {'; '.join(errors[:3])}")
+            continue
+        packages[index] = _initial_package(items[index], entry, json.dumps(entry, ensure_ascii=False))
+    return packages
+
+def agent_generate_initial_prompts(
+    model: genai.GenerativeModel,
+    prompts_config: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    batch_size: int = INITIAL_BATCH_SIZE,
+    max_workers: int = 2
+) -> List[Dict[str, Any]]:
+    """
+    Agent: Generates initial prompt packages for several items, several per request.
+
+    Items ({'topic', 'content_type', 'style', 'use_case', 'model_platform'}) are
+    grouped by content type so the meta-prompt instructions are sent once per
+    request instead of once per topic. Each returned package is validated on its
+    own; items missing from a reply, failing validation, or in a failed request
+    fall back to `agent_generate_initial_prompt`.
+
+    Returns:
+        list: One package (or {'error': ...}) per item, in input order.
+    """
+    logger.info(f"Agent 'generate_initial_prompts' starting for {len(items)} items.")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    groups: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        if prompts_config.get(f"{item['content_type'].lower()}_meta_prompt"):
+            groups.setdefault(item["content_type"], []).append(i)
+        else:
+            results[i] = {"error": f"No meta-prompt found for content type '{item['content_type']}'"}
+    chunks = [
+        indexes[start:start + batch_size]
+        for indexes in groups.values()
+        for start in range(0, len(indexes), max(1, batch_size))
+    ]
+    # Single-item chunks gain nothing from the batch prompt; they go straight to the fallback
+    batched = [chunk for chunk in chunks if len(chunk) > 1 and "batch_initial_prompt_meta_prompt" in prompts_config]
+
+    if batched:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batched)))) as executor:
+            futures = [
+                (chunk, executor.submit(
+                    contextvars.copy_context().run, _generate_initial_batch, model, prompts_config, [items[i] for i in chunk]
+                ))
+                for chunk in batched
+            ]
+        for chunk, future in futures:
+            for position, package in future.result().items():
+                results[chunk[position]] = package
+
+    fallback = [i for i, result in enumerate(results) if result is None]
+    if fallback:
+        logger.info(f"Generating {len(fallback)} of {len(items)} initial packages one at a time.")
+    for i in fallback:
+        item = items[i]
+        results[i] = agent_generate_initial_prompt(
+            model=model,
+            prompts_config=prompts_config,
+            topic=item["topic"],
+            content_type=item["content_type"],
+            style=item.get("style", ""),
+            use_case=item.get("use_case", ""),
+            model_platform=item["model_platform"]
+        )
+
+    logger.info("Agent 'generate_initial_prompts' completed successfully.")
+    return results
 
 def agent_analyze_template(
     model: genai.GenerativeModel,
@@ -224,13 +447,10 @@ def agent_analyze_template(
         
     meta_prompt = meta_prompt_template.format(template=template_content)
     
-    response = _generate_response(model, meta_prompt)
+    response = _generate_json(model, meta_prompt, "template_analysis", resolve_profile("analyze_template", prompts_config))
     if "error" in response:
         return response
-
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return parsed_json
+    parsed_json = response["data"]
     
     # Use enhanced template if model provided one, otherwise use original
     template_to_use = parsed_json.get("template", template_content)
@@ -283,19 +503,13 @@ def agent_reverse_engineer_from_image(
     meta_prompt = meta_prompt_template.format(additional_context=context_str)
 
     # For vision models, we pass a list [prompt, image]
-    try:
-        response = model.generate_content([meta_prompt, image_data])
-    except Exception as e:
-        logger.error(f"Vision API Error: {e}")
-        return {"error": f"Error interacting with Vision model: {e}"}
-
-    try:
-        parsed_json = _parse_json_from_response(response.text)
-    except Exception as e:
-         return {"error": f"Failed to parse Vision response: {e}"}
-         
-    if "error" in parsed_json:
-        return parsed_json
+    response = _generate_json(
+        model, [meta_prompt, image_data], "image_analysis", resolve_profile("reverse_engineer_from_image", prompts_config)
+    )
+    if "error" in response:
+        logger.error(f"Vision API Error: {response['error']}")
+        return {"error": f"Error interacting with Vision model: {response['error']}"}
+    parsed_json = response["data"]
 
     # Handle self-evaluation: use improved_template if model scored itself low
     template_to_use = parsed_json.get("template", "")
@@ -344,19 +558,14 @@ def agent_normalize_data(
     meta_prompt = meta_prompt_template.format(raw_text=raw_text)
 
     try:
-        response = _generate_response(model, meta_prompt)
+        response = _generate_json(model, meta_prompt, "normalized_items", resolve_profile("normalize_data", prompts_config))
     except Exception as e:
         return [{"error": f"LLM Error: {e}"}]
 
     if "error" in response:
         return [{"error": response["error"]}]
-    
-    parsed_json = _parse_json_from_response(response["text"])
-    
-    if "error" in parsed_json:
-        return [{"error": parsed_json["error"]}]
         
-    return parsed_json.get("items", [])
+    return response["data"].get("items", [])
 
 def agent_evaluate_compliance(
     evaluator_model: genai.GenerativeModel,
@@ -381,13 +590,14 @@ def agent_evaluate_compliance(
         commercial_description=prompt_package.get('commercial_description', '')
     )
     
-    response = _generate_response(evaluator_model, evaluation_prompt)
+    response = _generate_json(
+        evaluator_model, evaluation_prompt, "compliance_evaluation", resolve_profile("evaluate_compliance", prompts_config)
+    )
     if "error" in response:
         return response
-        
-    parsed_json = _parse_json_from_response(response["text"])
+
     logger.info("Agent 'evaluate_compliance' completed.")
-    return parsed_json
+    return response["data"]
 
 
 def agent_refine_prompt(
@@ -418,13 +628,10 @@ def agent_refine_prompt(
     3.  Return ONLY a JSON object with the single key "improved_template".
     """
     
-    response = _generate_response(model, refinement_prompt)
+    response = _generate_json(model, refinement_prompt, "refined_template", resolve_profile("refine_prompt"))
     if "error" in response:
         return response
-        
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return parsed_json
+    parsed_json = response["data"]
 
     refined_package = prompt_package.copy()
     refined_package["template"] = parsed_json.get("improved_template", prompt_package["template"])
@@ -481,16 +688,12 @@ def agent_generate_examples(
     Ensure your entire output is a single, valid JSON object.
     """
     
-    response = _generate_response(model, examples_prompt)
+    response = _generate_json(model, examples_prompt, "examples", resolve_profile("generate_examples"))
     if "error" in response:
         return [{"error": response["error"]}]
         
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return [{"error": parsed_json["error"]}]
-        
     logger.info("Agent 'generate_examples' completed successfully.")
-    return parsed_json.get("examples", [])
+    return response["data"].get("examples", [])
 
 def agent_manage_examples(
     model: genai.GenerativeModel,
@@ -498,9 +701,13 @@ def agent_manage_examples(
     action: str,
     target_total: int = 9,
     example_to_regenerate: str = "",
-    example_index: int = -1
+    example_index: int = -1,
+    example_indexes: Optional[List[int]] = None
 ) -> List[str]:
-    """Agent for completing or regenerating examples for a prompt package."""
+    """
+    Agent for completing or regenerating examples for a prompt package.
+    `regenerate_duplicates` replaces every slot in `example_indexes` with one request.
+    """
     logger.info(f"Agent 'manage_examples' starting with action: {action}")
     
     existing_examples = prompt_package.get("examples", [])
@@ -515,15 +722,11 @@ def agent_manage_examples(
 
         prompt = f"""You are a creative assistant. Your task is to generate {num_to_generate} new, diverse example prompts based on a template. These new examples MUST be different from the provided list of existing examples.\n\nPROMPT TEMPLATE:\n{template}\n\nVARIABLES:\n{variables}\n\nEXISTING EXAMPLES (DO NOT REPEAT THESE):\n{json.dumps(existing_examples, indent=2)}\n\nYOUR TASK:\n- Generate exactly {num_to_generate} new, high-quality, and diverse examples.\n- Return ONLY a JSON object with a single key \"new_examples\", which is a list of strings."""
         
-        response = _generate_response(model, prompt)
+        response = _generate_json(model, prompt, "new_examples", resolve_profile("manage_examples"))
         if "error" in response:
             return [response["error"]]
-        
-        parsed_json = _parse_json_from_response(response["text"])
-        if "error" in parsed_json:
-            return [parsed_json["error"]]
             
-        new_examples = parsed_json.get("new_examples", [])
+        new_examples = response["data"].get("new_examples", [])
         return existing_examples + new_examples
 
     elif action == "regenerate_one":
@@ -532,15 +735,11 @@ def agent_manage_examples(
 
         prompt = f"""You are a creative assistant. Your task is to regenerate a single prompt example. The new example must be high-quality, diverse, and substantively different from all other examples in the provided list.\n\nPROMPT TEMPLATE:\n{template}\n\nFULL LIST OF CURRENT EXAMPLES:\n{json.dumps(existing_examples, indent=2)}\n\nEXAMPLE TO REPLACE:\n\"{example_to_regenerate}\"\n\nYOUR TASK:\n- Generate exactly one new example to replace the specified one.\n- The new example must be creative and distinct from all other examples in the full list.\n- Return ONLY a JSON object with a single key \"new_example\", which is a single string."""
 
-        response = _generate_response(model, prompt)
+        response = _generate_json(model, prompt, "new_example", resolve_profile("manage_examples"))
         if "error" in response:
             return response
 
-        parsed_json = _parse_json_from_response(response["text"])
-        if "error" in parsed_json:
-            return parsed_json
-
-        new_example = parsed_json.get("new_example", "")
+        new_example = response["data"].get("new_example", "")
         if new_example:
             updated_examples = existing_examples[:]
             updated_examples[example_index] = new_example
@@ -548,6 +747,33 @@ def agent_manage_examples(
         else:
             return {"error": "The model did not return a new example."}
 
+    elif action == "regenerate_duplicates":
+        slots = sorted({i for i in example_indexes or [] if 0 <= i < len(existing_examples)})
+        if not slots:
+            return existing_examples
+        kept = [example for i, example in enumerate(existing_examples) if i not in slots]
+        structured = any(isinstance(example, dict) for example in existing_examples)
+        if structured:
+            output_format = f"Return ONLY a JSON object with a single key \"examples\": a list of exactly {len(slots)} objects, each with \"variables\" (variable name -> value) and \"prompt\" (the filled template)."
+        else:
+            output_format = f"Return ONLY a JSON object with a single key \"new_examples\", which is a list of exactly {len(slots)} strings."
+
+        prompt = f"""You are a creative assistant. Some examples of a prompt template were too similar to each other. Your task is to write {len(slots)} replacement examples.\n\nPROMPT TEMPLATE:\n{template}\n\nVARIABLES:\n{variables}\n\nEXAMPLES BEING KEPT (the replacements must differ clearly from these and from each other):\n{json.dumps(kept, indent=2, ensure_ascii=False)}\n\nYOUR TASK:\n- Generate exactly {len(slots)} new examples using different subjects, moods and settings than the kept ones.\n- {output_format}"""
+
+        schema_name = "examples" if structured else "new_examples"
+        response = _generate_json(model, prompt, schema_name, resolve_profile("manage_examples"))
+        if "error" in response:
+            return response
+
+        replacements = response["data"].get(schema_name, [])
+        if not replacements:
+            return {"error": "The model did not return replacement examples."}
+        updated_examples = existing_examples[:]
+        # A short reply replaces as many duplicate slots as it covers
+        for slot, replacement in zip(slots, replacements):
+            updated_examples[slot] = replacement
+        return updated_examples
+
     else:
         return {"error": f"Invalid action specified: {action}"}
 
@@ -603,6 +829,17 @@ def agent_generate_test_guidance(prompt_package: Dict[str, Any]) -> Dict[str, Li
     logger.info("Agent 'generate_test_guidance' completed.")
     return test_guidance
 
+TITLE_EMOTIONAL_WORDS = (
+    'whimsical', 'ethereal', 'bold', 'playful', 'cozy', 'mysterious',
+    'soft', 'vibrant', 'muted', 'luminous', 'epic', 'cinematic',
+    'elegant', 'rustic', 'modern', 'vintage', 'dreamy', 'surreal'
+)
+
+TITLE_FORMAT_WORDS = (
+    'art', 'illustration', 'photo', 'pattern', 'design', 'cover',
+    'poster', 'wallpaper', 'texture', 'scene', 'portrait', 'landscape'
+)
+
 def validate_prompt_title(title: str) -> dict:
     """
     Validates the prompt title against patterns of success.
@@ -630,25 +867,16 @@ def validate_prompt_title(title: str) -> dict:
         suggestions.append("Condense to essential elements")
     
     # Must include emotional/visual descriptor
-    emotional_words = {
-        'whimsical', 'ethereal', 'bold', 'playful', 'cozy', 'mysterious',
-        'soft', 'vibrant', 'muted', 'luminous', 'epic', 'cinematic',
-        'elegant', 'rustic', 'modern', 'vintage', 'dreamy', 'surreal'
-    }
-    if not any(word.lower() in emotional_words for word in title.split()):
+    if not get_matcher(TITLE_EMOTIONAL_WORDS).search(title):
         score -= 0.25
         issues.append("Missing emotional/visual descriptor")
-        suggestions.append(f"Consider: {', '.join(list(emotional_words)[:5])}")
+        suggestions.append(f"Consider: {', '.join(TITLE_EMOTIONAL_WORDS[:5])}")
     
     # Must include content type or format
-    format_words = {
-        'art', 'illustration', 'photo', 'pattern', 'design', 'cover',
-        'poster', 'wallpaper', 'texture', 'scene', 'portrait', 'landscape'
-    }
-    if not any(word.lower() in format_words for word in title.split()):
+    if not get_matcher(TITLE_FORMAT_WORDS).search(title):
         score -= 0.25
         issues.append("Missing format/type specification")
-        suggestions.append(f"Add: {', '.join(list(format_words)[:5])}")
+        suggestions.append(f"Add: {', '.join(TITLE_FORMAT_WORDS[:5])}")
     
     return {
         'score': max(0, score),
@@ -677,7 +905,7 @@ def agent_generate_description(
         use_cases=", ".join(prompt_package.get('use_cases', ['general use']))
     )
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_response(model, meta_prompt, profile=resolve_profile("generate_description", prompts_config))
     if "error" in response:
         logger.error(f"Description agent failed: {response['error']}")
         return "Professional AI Prompt Template. Easy to use and high quality."
@@ -691,6 +919,7 @@ def agent_categorize_prompt(
 ) -> str:
     """
     Agent: Assigns a category to a prompt package.
+    Uses the local classifier when it is confident; otherwise asks the LLM.
     """
     logger.info(f"Agent 'categorize_prompt' starting for topic: {prompt_package.get('topic')}")
 
@@ -700,6 +929,14 @@ def agent_categorize_prompt(
     if not categorization_prompt_template or not category_list:
         return "Uncategorized"
 
+    categorizer_config = prompts_config.get("categorizer") or {}
+    if categorizer_config.get("enabled", True):
+        local = classify_package(prompt_package, category_list)
+        threshold = categorizer_config.get("confidence_threshold", DEFAULT_CONFIDENCE_THRESHOLD)
+        if local and local[1] >= threshold:
+            logger.info(f"Agent 'categorize_prompt' completed locally ({local[1]:.2f}). Assigned category: {local[0]}")
+            return local[0]
+
     meta_prompt = categorization_prompt_template.format(
         prompt_title=prompt_package.get("topic", ""),
         prompt_description=prompt_package.get("description", ""),
@@ -707,7 +944,7 @@ def agent_categorize_prompt(
         category_list="\n".join([f"- {c}" for c in category_list])
     )
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_response(model, meta_prompt, profile=resolve_profile("categorize_prompt", prompts_config))
     if "error" in response:
         logger.error(f"Categorization agent failed: {response['error']}")
         return "Uncategorized"
@@ -745,15 +982,11 @@ def agent_analyze_trends(
 
     meta_prompt = trend_prompt_template.format(market_data=market_data)
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_json(model, meta_prompt, "trends", resolve_profile("analyze_trends", prompts_config))
     if "error" in response:
         return [{"error": response["error"]}]
 
-    parsed_json = _parse_json_from_response(response["text"])
-    if "error" in parsed_json:
-        return [{"error": parsed_json["error"]}]
-
-    return parsed_json.get("trends", [])
+    return response["data"].get("trends", [])
 
 
 def agent_extract_variables(
@@ -780,16 +1013,10 @@ def agent_extract_variables(
         text=text
     )
 
-    response = _generate_response(model, meta_prompt)
+    response = _generate_json(model, meta_prompt, "extracted_variables", resolve_profile("extract_variables", prompts_config))
     if "error" in response:
         logger.error(f"Extraction agent failed: {response['error']}")
         return {}
-
-    parsed_json = _parse_json_from_response(response["text"])
-    
-    if "error" in parsed_json:
-        logger.warning(f"Failed to parse extraction JSON: {parsed_json['error']}")
-        return {}
         
-    return parsed_json
+    return response["data"]
 
@@ -0,0 +1,312 @@
+"""
+Library Audit Module.
+
+Re-validates stored prompt packages after rule changes, without LLM calls:
+1. Stream packages from a `published/` directory or the `prompts` table
+2. Run the local validators across a process pool (bounded in-flight work)
+3. Write one JSONL finding record per audited package, plus a summary
+4. Remember a fingerprint per package so re-audits skip unchanged ones
+
+Checks: title pattern, example count, abstract examples, variable count
+(>= MIN_VARIABLES) and template/variable consistency.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from .quality_enhancers import (
+    validate_title_pattern,
+    validate_examples,
+    check_abstract_examples,
+    DESCRIPTORS,
+    FORMAT_TYPES,
+    ABSTRACT_KEYWORDS,
+    MIN_TITLE_WORDS,
+    MAX_TITLE_WORDS,
+    MIN_EXAMPLES,
+    MIN_ABSTRACT_EXAMPLES
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+MIN_VARIABLES = 4
+STATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "audit")
+JSON_FIELDS = ["variables", "variable_explanations", "examples", "tips", "validation", "test_guidance"]
+
+
+def rules_version() -> str:
+    """Fingerprint of the audit rules: numeric limits plus the (sorted) vocabularies the checks match against."""
+    return hashlib.sha256(json.dumps([
+        "v2", MIN_VARIABLES, MIN_TITLE_WORDS, MAX_TITLE_WORDS, MIN_EXAMPLES, MIN_ABSTRACT_EXAMPLES,
+        sorted(DESCRIPTORS), sorted(FORMAT_TYPES), sorted(ABSTRACT_KEYWORDS)
+    ]).encode("utf-8")).hexdigest()[:12]
+
+
+# Any change to the rules above invalidates previous audit state
+RULES_VERSION = rules_version()
+
+
+# --- Checks ---
+
+def _variable_names(variables: Any) -> set:
+    """Normalizes declared variables (list of names, list of dicts, or dict) to a set of names."""
+    if isinstance(variables, dict):
+        return set(variables)
+    names = set()
+    for v in variables or []:
+        if isinstance(v, dict):
+            v = v.get("name", "")
+        if isinstance(v, str) and v:
+            names.add(v.strip("[]"))
+    return names
+
+
+def audit_package(package: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Runs every local validator on a package.
+
+    Returns:
+        list: Findings as {'check', 'message'} dicts; empty when the package passes.
+    """
+    findings = []
+
+    title = package.get("topic", "") or ""
+    title_validation = validate_title_pattern(title)
+    if not title_validation["is_valid"]:
+        findings.append({"check": "title_pattern", "message": f"Title issues: {', '.join(title_validation['issues'])}"})
+
+    example_validation = validate_examples(package)
+    if not example_validation["is_valid"]:
+        findings.append({
+            "check": "example_count",
+            "message": f"{example_validation['current_count']}/{example_validation['required_count']} examples"
+        })
+
+    abstract_check = check_abstract_examples(package)
+    if not abstract_check["has_abstract"]:
+        findings.append({
+            "check": "abstract_examples",
+            "message": f"{abstract_check['abstract_count']}/{abstract_check['required_count']} abstract examples"
+        })
+
+    template_vars = set(re.findall(r'\[(.*?)\]', package.get("template", "") or ""))
+    if len(template_vars) < MIN_VARIABLES:
+        findings.append({"check": "variable_count", "message": f"{len(template_vars)} variables (minimum {MIN_VARIABLES})"})
+
+    declared_vars = _variable_names(package.get("variables"))
+    if template_vars != declared_vars:
+        missing = sorted(template_vars - declared_vars)
+        unused = sorted(declared_vars - template_vars)
+        findings.append({
+            "check": "variable_consistency",
+            "message": f"Undeclared: {missing or '-'}; unused: {unused or '-'}"
+        })
+
+    return findings
+
+
+def _audit_record(key: str, package: Dict[str, Any]) -> Dict[str, Any]:
+    findings = audit_package(package)
+    return {"key": key, "topic": package.get("topic", ""), "ok": not findings, "findings": findings}
+
+
+def _audit_file(key: str) -> Dict[str, Any]:
+    """Worker: loads one published JSON file and audits it."""
+    try:
+        with open(key, "r", encoding="utf-8") as f:
+            package = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return {"key": key, "topic": "", "ok": False, "findings": [{"check": "unreadable", "message": str(e)}]}
+    if not isinstance(package, dict):
+        return {"key": key, "topic": "", "ok": False, "findings": [{"check": "unreadable", "message": "Not a JSON object"}]}
+    return _audit_record(key, package)
+
+
+# --- Sources ---
+
+def iter_directory_items(directory: str) -> Iterator[Tuple[str, str, Tuple]]:
+    """
+    Yields (key, fingerprint, task) for every JSON file in `directory`.
+    The fingerprint is size + mtime, so files are only read by the workers.
+    """
+    with os.scandir(directory) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            stat = entry.stat()
+            yield entry.path, f"{stat.st_size}:{stat.st_mtime_ns}", (_audit_file, entry.path)
+
+
+def iter_database_items(database_name: str) -> Iterator[Tuple[str, str, Tuple]]:
+    """Yields (key, fingerprint, task) for every row of the `prompts` table, streamed from a cursor."""
+    with sqlite3.connect(database_name) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.execute("SELECT * FROM prompts ORDER BY id")
+        for row in cursor:
+            row = dict(row)
+            fingerprint = hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            for field in JSON_FIELDS:
+                if isinstance(row.get(field), str):
+                    try:
+                        row[field] = json.loads(row[field])
+                    except json.JSONDecodeError:
+                        row[field] = {}
+            yield f"db:{row['id']}", fingerprint, (_audit_record, f"db:{row['id']}", row)
+
+
+def iter_source_items(source: str) -> Iterator[Tuple[str, str, Tuple]]:
+    """Dispatches on the source: a directory of JSON packages or a SQLite database file."""
+    if os.path.isdir(source):
+        return iter_directory_items(source)
+    return iter_database_items(source)
+
+
+# --- State ---
+
+def state_path_for(source: str) -> str:
+    """Per-source audit state file under .cache/audit."""
+    digest = hashlib.sha256(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(STATE_DIR, f"{digest}.json")
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    """Loads previous audit state; discarded when the rules changed since it was written."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"rules_version": RULES_VERSION, "items": {}}
+    if state.get("rules_version") != RULES_VERSION:
+        logger.info("Audit rules changed since the last run; re-auditing everything.")
+        return {"rules_version": RULES_VERSION, "items": {}}
+    return state
+
+
+def save_state(path: str, state: Dict[str, Any]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+# --- Runner ---
+
+def _run_tasks(tasks: Iterator[Tuple], workers: int) -> Iterator[Dict[str, Any]]:
+    """Runs audit tasks in a process pool with at most two tasks per worker in flight."""
+    if workers <= 1:
+        for func, *args in tasks:
+            yield func(*args)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for func, *args in itertools.islice(tasks, workers * 2):
+            pending.append(executor.submit(func, *args))
+        while pending:
+            record = pending.popleft().result()
+            for func, *args in itertools.islice(tasks, 1):
+                pending.append(executor.submit(func, *args))
+            yield record
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _audit_pass(
+    source: str,
+    output_path: str,
+    previous: Dict[str, Any],
+    workers: int
+) -> Tuple[Dict[str, Any], int, int]:
+    """One pass over the source; returns (new state items, audited, skipped)."""
+    current: Dict[str, Any] = {}
+    skipped = 0
+    audited = 0
+
+    def pending_tasks():
+        nonlocal skipped
+        for key, fingerprint, task in iter_source_items(source):
+            known = previous.get(key)
+            if known and known["fingerprint"] == fingerprint:
+                current[key] = known
+                skipped += 1
+                continue
+            current[key] = {"fingerprint": fingerprint, "checks": []}
+            yield task
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        for record in _run_tasks(pending_tasks(), workers):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            current[record["key"]]["checks"] = [f["check"] for f in record["findings"]]
+            audited += 1
+
+    return current, audited, skipped
+
+
+def run_audit(
+    source: str,
+    output_path: str,
+    workers: Optional[int] = None,
+    incremental: bool = True,
+    state_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Audits every package in `source` and writes findings as JSONL.
+
+    Args:
+        source: A directory of package JSON files, or a SQLite database path.
+        output_path: JSONL file receiving one record per audited package.
+        workers: Worker processes. Defaults to the CPU count; 1 runs in-process.
+        incremental: Skip packages whose fingerprint matches the last run.
+        state_path: Audit state file. Defaults to one per source under .cache/audit.
+
+    Returns:
+        dict: Summary with 'total', 'audited', 'skipped_unchanged', 'passed',
+        'failed', 'by_check' (whole library, including skipped packages) and 'elapsed'.
+    """
+    started = time.perf_counter()
+    state_path = state_path or state_path_for(source)
+    previous = load_state(state_path)["items"] if incremental else {}
+    workers = workers or os.cpu_count() or 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    try:
+        current, audited, skipped = _audit_pass(source, output_path, previous, workers)
+    except (BrokenProcessPool, OSError) as e:
+        if workers == 1:
+            raise
+        logger.warning(f"Parallel audit unavailable ({e}); rerunning sequentially.")
+        current, audited, skipped = _audit_pass(source, output_path, previous, 1)
+
+    save_state(state_path, {"rules_version": RULES_VERSION, "items": current})
+
+    by_check: Dict[str, int] = {}
+    failed = 0
+    for item in current.values():
+        failed += bool(item["checks"])
+        for check in item["checks"]:
+            by_check[check] = by_check.get(check, 0) + 1
+
+    return {
+        "total": len(current),
+        "audited": audited,
+        "skipped_unchanged": skipped,
+        "passed": len(current) - failed,
+        "failed": failed,
+        "by_check": by_check,
+        "output": output_path,
+        "elapsed": round(time.perf_counter() - started, 2)
+    }
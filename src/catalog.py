@@ -0,0 +1,217 @@
+"""
+Published Package Catalog Module.
+
+Keeps a small SQLite index of the JSON packages in `published/` so listing
+and browsing do not stat and parse every file:
+1. Scan - compare each file's size/mtime with the catalog; only changed files are read
+2. Hash - a content hash turns touched-but-identical files into no-ops
+3. Query - filtering, sorting and pagination run as indexed SQL
+
+The catalog lives next to the files it indexes (`<dir>/.catalog.db`).
+"""
+
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .utils import OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+CATALOG_FILENAME = ".catalog.db"
+SORT_COLUMNS = {
+    "mtime": "mtime",
+    "topic": "topic COLLATE NOCASE",
+    "size": "size",
+    "variables": "variable_count",
+    "platform": "platform COLLATE NOCASE",
+    "category": "category COLLATE NOCASE"
+}
+
+
+def catalog_path_for(directory: str = OUTPUT_DIR) -> str:
+    return os.path.join(directory, CATALOG_FILENAME)
+
+
+def _has_directory(db_path: str) -> bool:
+    """False before anything was published (no directory to hold the catalog yet)."""
+    return os.path.isdir(os.path.dirname(os.path.abspath(db_path)))
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS packages (
+            path TEXT PRIMARY KEY,
+            topic TEXT,
+            platform TEXT,
+            category TEXT,
+            variable_count INTEGER,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_packages_mtime ON packages (mtime)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_packages_platform ON packages (platform)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_packages_category ON packages (category)")
+    return conn
+
+
+# --- Scanning ---
+
+def extract_entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Pulls the catalog fields out of a package JSON object."""
+    variables = data.get("variables")
+    if isinstance(variables, (list, dict)) and variables:
+        variable_count = len(variables)
+    else:
+        variable_count = len(set(re.findall(r'\[(.*?)\]', data.get("template", "") or "")))
+    return {
+        "topic": data.get("topic") or data.get("title") or "Unknown",
+        "platform": data.get("platform") or data.get("model_platform") or "",
+        "category": data.get("category") or "",
+        "variable_count": variable_count
+    }
+
+
+def scan_directory(directory: str = OUTPUT_DIR, db_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Brings the catalog up to date with the JSON files in `directory`.
+
+    Files whose size and mtime match the catalog are not opened; changed
+    files are hashed and only re-parsed when their content differs.
+
+    Returns:
+        dict: {'added', 'updated', 'unchanged', 'removed'} counts.
+    """
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    if not os.path.isdir(directory):
+        return stats
+
+    with _connect(db_path or catalog_path_for(directory)) as conn:
+        known = {row["path"]: row for row in conn.execute("SELECT path, size, mtime, content_hash FROM packages")}
+        seen = set()
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".json"):
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                row = known.get(entry.name)
+                if row and row["size"] == stat.st_size and row["mtime"] == stat.st_mtime:
+                    stats["unchanged"] += 1
+                    continue
+
+                try:
+                    with open(entry.path, "rb") as f:
+                        raw = f.read()
+                except OSError as e:
+                    logger.warning(f"Could not read {entry.path}: {e}")
+                    continue
+                digest = hashlib.sha256(raw).hexdigest()
+
+                if row and row["content_hash"] == digest:
+                    conn.execute(
+                        "UPDATE packages SET size = ?, mtime = ? WHERE path = ?",
+                        (stat.st_size, stat.st_mtime, entry.name)
+                    )
+                    stats["unchanged"] += 1
+                    continue
+
+                try:
+                    data = json.loads(raw)
+                    fields = extract_entry(data if isinstance(data, dict) else {})
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    fields = {"topic": "[Error reading]", "platform": "", "category": "", "variable_count": 0}
+
+                conn.execute("""
+                    INSERT OR REPLACE INTO packages
+                        (path, topic, platform, category, variable_count, size, mtime, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    entry.name, fields["topic"], fields["platform"], fields["category"],
+                    fields["variable_count"], stat.st_size, stat.st_mtime, digest
+                ))
+                stats["updated" if row else "added"] += 1
+
+        removed = [(path,) for path in known if path not in seen]
+        if removed:
+            conn.executemany("DELETE FROM packages WHERE path = ?", removed)
+            stats["removed"] = len(removed)
+        conn.commit()
+
+    return stats
+
+
+# --- Queries ---
+
+def query_catalog(
+    directory: str = OUTPUT_DIR,
+    search: str = "",
+    platform: str = "",
+    category: str = "",
+    min_variables: int = 0,
+    sort: str = "mtime",
+    descending: bool = True,
+    limit: int = 20,
+    offset: int = 0,
+    db_path: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Filters, sorts and paginates the catalog.
+
+    Returns:
+        tuple: (rows for the requested page, total rows matching the filters).
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort}'. Choose from: {', '.join(SORT_COLUMNS)}")
+
+    clauses, params = [], []
+    if search:
+        clauses.append("topic LIKE ?")
+        params.append(f"%{search}%")
+    if platform:
+        clauses.append("platform = ? COLLATE NOCASE")
+        params.append(platform)
+    if category:
+        clauses.append("category = ? COLLATE NOCASE")
+        params.append(category)
+    if min_variables:
+        clauses.append("variable_count >= ?")
+        params.append(min_variables)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = f"{SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, path"
+
+    db_path = db_path or catalog_path_for(directory)
+    if not _has_directory(db_path):
+        return [], 0
+    with _connect(db_path) as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM packages {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM packages {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+    return [dict(row) for row in rows], total
+
+
+def catalog_facets(directory: str = OUTPUT_DIR, db_path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Distinct platforms and categories, for filter dropdowns."""
+    db_path = db_path or catalog_path_for(directory)
+    if not _has_directory(db_path):
+        return {"platform": [], "category": []}
+    with _connect(db_path) as conn:
+        return {
+            column: [r[0] for r in conn.execute(
+                f"SELECT DISTINCT {column} FROM packages WHERE {column} != '' ORDER BY {column} COLLATE NOCASE"
+            )]
+            for column in ("platform", "category")
+        }
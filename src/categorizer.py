@@ -0,0 +1,206 @@
+"""
+Local Category Classifier Module.
+
+`agent_categorize_prompt` used to spend a full LLM call to pick one label from
+the static `prompt_categories` list. This module provides a multinomial naive
+Bayes classifier (NumPy) trained from prompts already categorized in the
+`prompts` table:
+1. Tokenize topic, style, use case, description and template
+2. Accumulate per-category token counts with Laplace smoothing
+3. Predict a category with a posterior-probability confidence
+
+The agent only falls back to the LLM when confidence is below the configured
+threshold or no trained model exists.
+"""
+
+import os
+import re
+import random
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "category_classifier.npz")
+DEFAULT_CONFIDENCE_THRESHOLD = 0.6
+MIN_TRAINING_SAMPLES = 20
+SMOOTHING = 1.0
+
+STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "your", "you", "are", "into",
+    "its", "their", "has", "have", "was", "were", "will", "can", "each", "all", "any",
+    "style", "prompt", "template", "image"
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9\-]{2,}")
+_cache: Dict[str, Tuple[float, "CategoryClassifier"]] = {}
+_cache_lock = threading.Lock()
+
+
+# --- Text Features ---
+
+def package_text(package: Dict[str, Any]) -> str:
+    """Concatenates the fields of a package (or `prompts` row) that describe its category."""
+    parts = [
+        package.get("topic"),
+        package.get("style") if isinstance(package.get("style"), str) else ", ".join(package.get("style") or []),
+        package.get("use_case") if isinstance(package.get("use_case"), str) else ", ".join(package.get("use_case") or []),
+        package.get("commercial_description") or package.get("description"),
+        package.get("template")
+    ]
+    return " ".join(p for p in parts if p)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of three or more characters, minus stopwords."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# --- Classifier ---
+
+class CategoryClassifier:
+    """Multinomial naive Bayes over word counts."""
+
+    def __init__(self, labels: List[str], vocabulary: List[str], class_log_prior: np.ndarray, feature_log_prob: np.ndarray):
+        self.labels = labels
+        self.vocabulary = vocabulary
+        self.index = {token: i for i, token in enumerate(vocabulary)}
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+
+    @classmethod
+    def train(cls, texts: List[str], labels: List[str], smoothing: float = SMOOTHING) -> "CategoryClassifier":
+        """Fits the classifier on parallel lists of texts and category labels."""
+        label_set = sorted(set(labels))
+        label_index = {label: i for i, label in enumerate(label_set)}
+        tokenized = [tokenize(t) for t in texts]
+        vocabulary = sorted({token for tokens in tokenized for token in tokens})
+        token_index = {token: i for i, token in enumerate(vocabulary)}
+
+        counts = np.zeros((len(label_set), len(vocabulary)), dtype=np.float64)
+        doc_counts = np.zeros(len(label_set), dtype=np.float64)
+        for tokens, label in zip(tokenized, labels):
+            row = label_index[label]
+            doc_counts[row] += 1
+            if tokens:
+                np.add.at(counts[row], [token_index[t] for t in tokens], 1)
+
+        smoothed = counts + smoothing
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log(doc_counts) - np.log(doc_counts.sum())
+        return cls(label_set, vocabulary, class_log_prior, feature_log_prob)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Returns (category, confidence) where confidence is the posterior probability."""
+        ids = [self.index[t] for t in tokenize(text) if t in self.index]
+        joint = self.class_log_prior + (self.feature_log_prob[:, ids].sum(axis=1) if ids else 0.0)
+        posterior = np.exp(joint - joint.max())
+        posterior /= posterior.sum()
+        best = int(posterior.argmax())
+        return self.labels[best], float(posterior[best])
+
+    def save(self, path: str = MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            vocabulary=np.array(self.vocabulary),
+            class_log_prior=self.class_log_prior,
+            feature_log_prob=self.feature_log_prob
+        )
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "CategoryClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                [str(label) for label in data["labels"]],
+                [str(token) for token in data["vocabulary"]],
+                data["class_log_prior"],
+                data["feature_log_prob"]
+            )
+
+
+def load_classifier(path: str = MODEL_PATH) -> Optional[CategoryClassifier]:
+    """Loads the trained classifier, cached per file modification time. None if untrained."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            classifier = CategoryClassifier.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load category classifier from {path}: {e}")
+            return None
+        _cache[path] = (mtime, classifier)
+        return classifier
+
+
+def classify_package(
+    package: Dict[str, Any],
+    category_list: List[str],
+    path: str = MODEL_PATH
+) -> Optional[Tuple[str, float]]:
+    """
+    Classifies a package locally. Returns (category, confidence), or None when no
+    model is trained or the predicted label is no longer in `category_list`.
+    """
+    classifier = load_classifier(path)
+    if classifier is None:
+        return None
+    category, confidence = classifier.predict(package_text(package))
+    if category not in category_list:
+        return None
+    return category, confidence
+
+
+# --- Training ---
+
+def train_from_rows(
+    rows: List[Dict[str, Any]],
+    holdout: float = 0.2,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Trains on categorized `prompts` rows and reports accuracy.
+
+    A shuffled `holdout` fraction is scored with a model trained on the rest,
+    then the final model is trained on all rows.
+
+    Returns:
+        dict: {'classifier', 'samples', 'label_counts', 'holdout_accuracy', 'training_accuracy'}
+    """
+    texts = [package_text(r) for r in rows]
+    labels = [r["category"] for r in rows]
+    label_counts: Dict[str, int] = {}
+    for label in labels:
+        label_counts[label] = label_counts.get(label, 0) + 1
+
+    holdout_accuracy = None
+    order = list(range(len(rows)))
+    random.Random(seed).shuffle(order)
+    split = int(len(order) * holdout)
+    if split and len(order) - split >= 2:
+        test_ids, train_ids = order[:split], order[split:]
+        partial = CategoryClassifier.train([texts[i] for i in train_ids], [labels[i] for i in train_ids])
+        hits = sum(partial.predict(texts[i])[0] == labels[i] for i in test_ids)
+        holdout_accuracy = hits / len(test_ids)
+
+    classifier = CategoryClassifier.train(texts, labels)
+    training_accuracy = sum(classifier.predict(t)[0] == l for t, l in zip(texts, labels)) / len(rows)
+
+    return {
+        "classifier": classifier,
+        "samples": len(rows),
+        "label_counts": label_counts,
+        "holdout_accuracy": holdout_accuracy,
+        "training_accuracy": training_accuracy
+    }
@@ -0,0 +1,263 @@
+"""
+Warm Daemon Module.
+
+Keeps one long-lived process serving CLI commands over a Unix socket:
+1. Warm state - imports, parsed config, Gemini/HF clients, key pools, rate
+   limiters and latency history survive between commands
+2. Forwarding - `cli.py` sends its argv to the daemon when one is listening and
+   runs the command in-process otherwise
+3. Streaming - command output is relayed to the calling terminal line by line
+4. Concurrency - each connection runs on its own thread; output is captured
+   per thread
+
+Protocol: one JSON request line per connection, answered by JSON lines
+({"stream": "out"|"err", "data": ...} then {"exit": code}). Requests from a
+different working directory are declined ({"fallback": reason}) so relative
+paths always resolve as the caller expects.
+
+This module stays import-light: the client side runs on every CLI call.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+SOCKET_ENV = "PBT_DAEMON_SOCKET"
+DISABLE_ENV = "PBT_NO_DAEMON"
+DEFAULT_SOCKET_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".pbt-daemon.sock")
+CONNECT_TIMEOUT = 0.5
+
+
+def socket_path() -> str:
+    return os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET_PATH
+
+
+# --- Client ---
+
+def _connect(path: Optional[str] = None) -> Optional[socket.socket]:
+    """A connection to the daemon, or None when no daemon is listening."""
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def _request(message: Dict[str, Any], path: Optional[str] = None):
+    """Sends one request and yields the daemon's reply messages (nothing if it is not running)."""
+    sock = _connect(path)
+    if sock is None:
+        return
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        for line in stream:
+            yield json.loads(line)
+
+
+def forward(argv: List[str], path: Optional[str] = None) -> Optional[int]:
+    """
+    Runs a CLI command on the daemon, relaying its output.
+
+    Returns:
+        int | None: The command's exit code, or None when the caller should run
+        it in-process (no daemon, daemon disabled, or request declined).
+    """
+    if os.environ.get(DISABLE_ENV):
+        return None
+    try:
+        for reply in _request({"op": "run", "argv": argv, "cwd": os.getcwd()}, path):
+            if "fallback" in reply:
+                return None
+            if "exit" in reply:
+                return reply["exit"]
+            target = sys.stderr if reply.get("stream") == "err" else sys.stdout
+            target.write(reply.get("data", ""))
+            target.flush()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Lost connection to the daemon: {e}")
+        return 1
+    return None
+
+
+def status(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The daemon's pid, uptime and request count, or None when it is not running."""
+    try:
+        return next(_request({"op": "status"}, path), None)
+    except (OSError, ValueError):
+        return None
+
+
+def stop(path: Optional[str] = None) -> bool:
+    """Asks a running daemon to shut down; False when none is running."""
+    try:
+        return next(_request({"op": "stop"}, path), None) is not None
+    except (OSError, ValueError):
+        return False
+
+
+# --- Server ---
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    Stand-in for sys.stdout/sys.stderr that writes to the current thread's
+    client when one is attached, and to the daemon's own stream otherwise.
+    """
+
+    def __init__(self, default, name: str):
+        self._default = default
+        self._name = name
+        self._local = threading.local()
+
+    def attach(self, send: Optional[Callable[[Dict[str, Any]], None]]):
+        self._local.send = send
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError("text stream")
+        send = getattr(self._local, "send", None)
+        if send is None:
+            return self._default.write(text)
+        send({"stream": self._name, "data": text})
+        return len(text)
+
+    def flush(self):
+        if getattr(self._local, "send", None) is None:
+            self._default.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _send(self, message: Dict[str, Any]):
+        with self.lock:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def handle(self):
+        self.lock = threading.Lock()
+        daemon: "Daemon" = self.server.owner
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            return
+        op = request.get("op")
+        if op == "status":
+            self._send(daemon.status())
+        elif op == "stop":
+            self._send({"stopping": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif op == "run":
+            if request.get("cwd") != daemon.cwd:
+                self._send({"fallback": f"daemon runs in {daemon.cwd}"})
+                return
+            self._send({"exit": daemon.run(request.get("argv") or [], self._send)})
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """
+    Serves a click command group on a Unix socket.
+
+    Commands run in this process, so everything they cache at module level
+    (config, clients, key pools, request policy) stays warm between calls.
+    """
+
+    def __init__(self, command: Any, path: Optional[str] = None, prog_name: str = "cli.py"):
+        self.command = command
+        self.path = path or socket_path()
+        self.prog_name = prog_name
+        self.cwd = os.getcwd()
+        self.started = time.time()
+        self.requests = 0
+        self.active = 0
+        self._lock = threading.Lock()
+        self._stdout = _ThreadOutput(sys.stdout, "out")
+        self._stderr = _ThreadOutput(sys.stderr, "err")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "cwd": self.cwd,
+                "socket": self.path,
+                "uptime": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "active": self.active
+            }
+
+    def run(self, argv: List[str], send: Callable[[Dict[str, Any]], None]) -> int:
+        """Runs one command with its output streamed through `send`; returns the exit code."""
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+        self._stdout.attach(send)
+        self._stderr.attach(send)
+        try:
+            self.command.main(args=list(argv), prog_name=self.prog_name, standalone_mode=True)
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            logger.error(f"Daemon command {argv} failed: {e}", exc_info=True)
+            send({"stream": "err", "data": f"Error: {e}\n"})
+            return 1
+        finally:
+            self._stdout.attach(None)
+            self._stderr.attach(None)
+            with self._lock:
+                self.active -= 1
+
+    def serve_forever(self, ready: Optional[Callable[[], None]] = None):
+        """
+        Listens until stopped (`stop()` or Ctrl+C).
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket.
+        """
+        if status(self.path) is not None:
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a crashed daemon
+
+        server = _Server(self.path, _Handler)
+        server.owner = self
+        stdin = sys.stdin
+        sys.stdout, sys.stderr = self._stdout, self._stderr
+        sys.stdin = io.StringIO("")  # commands must never wait for input on the daemon's terminal
+        try:
+            if ready:
+                ready()
+            server.serve_forever()
+        finally:
+            sys.stdout, sys.stderr, sys.stdin = self._stdout._default, self._stderr._default, stdin
+            server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
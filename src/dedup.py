@@ -0,0 +1,115 @@
+"""
+Near-Duplicate Detection Module (MinHash + LSH).
+
+Provides compact similarity signatures for free text so the Knowledge Base
+can reject or merge entries that are near-copies of something already stored:
+1. Shingling - word 3-grams over normalized text
+2. MinHash - fixed-size signature estimating Jaccard similarity
+3. LSH banding - bucket keys so candidates are found by index lookup
+
+Everything here is pure and deterministic (no salted `hash()`), so signatures
+stored in SQLite remain comparable across processes and restarts.
+"""
+
+import re
+import random
+import struct
+import hashlib
+from typing import List, Set, Tuple, Iterable
+
+# --- Constants ---
+
+NUM_PERM = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.85
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _make_permutations(num_perm: int, seed: int = 1) -> List[Tuple[int, int]]:
+    rng = random.Random(seed)
+    return [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+
+
+_PERMUTATIONS = _make_permutations(NUM_PERM)
+
+
+# --- Shingling ---
+
+def normalize_text(text: str) -> str:
+    """Lowercases and collapses whitespace/punctuation into single spaces."""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the normalized text; identical for exact (formatting-insensitive) copies."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def shingle(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Returns the set of word n-grams of `text`.
+    Texts shorter than `size` words fall back to their word set.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+# --- MinHash ---
+
+def _hash_shingle(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_signature(shingles: Iterable[str]) -> List[int]:
+    """Computes a NUM_PERM-length MinHash signature for a shingle set."""
+    hashes = [_hash_shingle(s) for s in shingles]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def text_signature(text: str) -> List[int]:
+    """Shingles and signs a text in one step."""
+    return minhash_signature(shingle(text))
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity: the fraction of matching signature slots."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+# --- LSH & Storage ---
+
+def lsh_buckets(signature: List[int], bands: int = LSH_BANDS) -> List[Tuple[int, str]]:
+    """
+    Splits a signature into `bands` bands and hashes each into a bucket key.
+    Two texts sharing any (band, bucket) pair are duplicate candidates.
+    """
+    rows = len(signature) // bands
+    buckets = []
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows]
+        key = hashlib.blake2b(struct.pack(f"<{len(chunk)}I", *chunk), digest_size=8).hexdigest()
+        buckets.append((band, key))
+    return buckets
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    """Serializes a signature to a compact BLOB for SQLite."""
+    return struct.pack(f"<{len(signature)}I", *signature)
+
+
+def unpack_signature(blob: bytes) -> List[int]:
+    """Inverse of `pack_signature`."""
+    return list(struct.unpack(f"<{len(blob) // 4}I", blob))
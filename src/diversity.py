@@ -0,0 +1,115 @@
+"""
+Example Diversity Module.
+
+Scores how different a package's examples really are, locally, instead of
+trusting the model's "substantively different":
+1. Text - each example is reduced to what it fills in: its variable values,
+   or for plain-string examples the words not already fixed by the template
+2. Similarity - token-set Jaccard and TF-IDF cosine between every pair (NumPy)
+3. Flags - a later example too close to an earlier kept one is a duplicate slot
+4. Score - diversity = 1 - mean pairwise cosine (1.0 = nothing shared)
+
+The duplicate slots drive one batched regeneration request
+(`agent_manage_examples(action="regenerate_duplicates")`) instead of one
+request per example.
+"""
+
+import re
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+# --- Constants ---
+
+DEFAULT_DIVERSITY: Dict[str, Any] = {
+    "jaccard_threshold": 0.6,        # token-set overlap that marks two examples as near-duplicates
+    "cosine_threshold": 0.85,        # TF-IDF cosine that marks two examples as near-duplicates
+    "regenerate_in_workflow": True   # replace duplicate slots right after example generation
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_VARIABLE_PATTERN = re.compile(r"\[[^\]]*\]")
+
+
+def resolve_settings(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merges the config's `example_diversity` block over the defaults."""
+    settings = dict(DEFAULT_DIVERSITY)
+    settings.update((config or {}).get("example_diversity") or {})
+    return settings
+
+
+# --- Text ---
+
+def example_tokens(example: Any, template: str = "") -> List[str]:
+    """The words an example contributes beyond the template's fixed text."""
+    if isinstance(example, dict) and example.get("variables"):
+        return _TOKEN_PATTERN.findall(" ".join(str(v) for v in example["variables"].values()).lower())
+    text = example.get("prompt", "") if isinstance(example, dict) else str(example)
+    fixed = set(_TOKEN_PATTERN.findall(_VARIABLE_PATTERN.sub(" ", template).lower()))
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in fixed]
+
+
+def _matrices(token_lists: List[List[str]]):
+    """Binary presence and raw count matrices (examples x vocabulary)."""
+    vocabulary = {token: i for i, token in enumerate(sorted({t for tokens in token_lists for t in tokens}))}
+    counts = np.zeros((len(token_lists), len(vocabulary)), dtype=np.float64)
+    for row, tokens in enumerate(token_lists):
+        if tokens:
+            np.add.at(counts[row], [vocabulary[t] for t in tokens], 1)
+    return (counts > 0).astype(np.float64), counts
+
+
+# --- Similarity ---
+
+def jaccard_matrix(token_lists: List[List[str]]) -> np.ndarray:
+    """Pairwise token-set Jaccard similarity (0 where both examples are empty)."""
+    presence, _ = _matrices(token_lists)
+    intersection = presence @ presence.T
+    sizes = presence.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def tfidf_cosine_matrix(token_lists: List[List[str]]) -> np.ndarray:
+    """Pairwise cosine similarity of smoothed TF-IDF vectors."""
+    presence, counts = _matrices(token_lists)
+    n = len(token_lists)
+    idf = np.log((1 + n) / (1 + presence.sum(axis=0))) + 1
+    weights = counts * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights = np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+    return weights @ weights.T
+
+
+def analyze_examples(examples: List[Any], template: str = "", settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Scores a package's examples and flags near-duplicates.
+
+    Returns:
+        dict: {'score' (0-1, higher = more diverse), 'pairs' ([{'a', 'b', 'jaccard',
+        'cosine'}] flagged pairs), 'duplicates' (slots to regenerate: each is too
+        close to an earlier example that is kept)}
+    """
+    settings = settings or resolve_settings()
+    if len(examples) < 2:
+        return {"score": 1.0, "pairs": [], "duplicates": []}
+
+    token_lists = [example_tokens(example, template) for example in examples]
+    jaccard = jaccard_matrix(token_lists)
+    cosine = tfidf_cosine_matrix(token_lists)
+    flagged = (jaccard >= settings["jaccard_threshold"]) | (cosine >= settings["cosine_threshold"])
+
+    pairs, duplicates = [], []
+    for b in range(len(examples)):
+        for a in range(b):
+            if flagged[a, b]:
+                pairs.append({"a": a, "b": b, "jaccard": round(float(jaccard[a, b]), 2), "cosine": round(float(cosine[a, b]), 2)})
+                if a not in duplicates and b not in duplicates:
+                    duplicates.append(b)
+
+    upper = np.triu_indices(len(examples), k=1)
+    return {
+        "score": round(float(1 - cosine[upper].mean()), 2),
+        "pairs": pairs,
+        "duplicates": duplicates
+    }
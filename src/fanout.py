@@ -0,0 +1,259 @@
+"""
+Concept Fan-out Module.
+
+Builds many prompt packages from one idea list instead of one at a time:
+1. Inputs - concepts from `agent_generate_concepts` or topics from a CSV
+   become workflow inputs
+2. Concurrency - items run `run_workflow` in parallel, capped per fan-out and
+   by a process-wide limit shared by every fan-out (UI sessions, CLI)
+3. Budget - once the fan-out has used `max_requests` model requests, no new
+   items start (running items finish); the rest are reported as skipped.
+   Only this fan-out's own requests count (a per-fan-out `RequestMeter`),
+   not those of other fan-outs or sessions in the same process
+4. Streaming - results are yielded as each item finishes and, optionally,
+   saved to the prompt library right away
+5. Batched start - initial packages can be generated several per request
+   (`agent_generate_initial_prompts`) before the per-item workflows continue
+
+Settings come from the `fanout` block of config.yaml.
+"""
+
+import io
+import csv
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Callable, Iterator, Iterable
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_FANOUT: Dict[str, Any] = {
+    "max_concurrency": 3,         # items in flight per fan-out
+    "global_max_concurrency": 6,  # items in flight across all fan-outs in this process
+    "max_requests": None,         # model-request budget per fan-out (None = unlimited)
+    "initial_batch_size": 4       # items per initial-generation request (<= 1 = one request per item)
+}
+CSV_COLUMNS = {
+    "topic": "topic",
+    "theme": "topic",
+    "style": "style",
+    "use_case": "use_case",
+    "use case": "use_case",
+    "content_type": "content_type",
+    "content type": "content_type",
+    "platform": "model_platform",
+    "model_platform": "model_platform"
+}
+
+Workflow = Callable[[Dict[str, Any]], Iterable[Dict[str, Any]]]
+InitialGenerator = Callable[[List[Dict[str, Any]], int], List[Dict[str, Any]]]
+
+
+def resolve_settings(config: Optional[Dict[str, Any]] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merges the config's `fanout` block and explicit overrides (None values ignored) over the defaults."""
+    settings = dict(DEFAULT_FANOUT)
+    settings.update((config or {}).get("fanout") or {})
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+
+# --- Inputs ---
+
+def concepts_to_inputs(concepts: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Workflow `user_inputs` for each concept returned by `agent_generate_concepts`."""
+    defaults = defaults or {}
+    inputs = []
+    for concept in concepts:
+        if not concept.get("topic"):
+            continue
+        inputs.append({
+            "input_mode": "Generation",
+            "topic": concept["topic"],
+            "content_type": concept.get("content_type") or defaults.get("content_type", "Image"),
+            "style": ", ".join(concept.get("style_descriptors") or []) or defaults.get("style", ""),
+            "use_case": ", ".join(concept.get("use_cases") or []) or defaults.get("use_case", ""),
+            "model_platform": defaults.get("model_platform", "Midjourney")
+        })
+    return inputs
+
+
+def read_topics_csv(text: str, defaults: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Workflow `user_inputs` from CSV text: a `topic` column plus optional
+    `style`, `use_case`, `content_type` and `platform` columns. Without a
+    recognised header, the first column of every row is the topic.
+    """
+    defaults = defaults or {}
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [CSV_COLUMNS.get(cell.strip().lower()) for cell in rows[0]]
+    if "topic" in header:
+        rows = rows[1:]
+    else:
+        header = ["topic"] + [None] * (len(rows[0]) - 1)
+
+    inputs = []
+    for row in rows:
+        values = {key: cell.strip() for key, cell in zip(header, row) if key and cell.strip()}
+        if values.get("topic"):
+            inputs.append({
+                "input_mode": "Generation",
+                "topic": values["topic"],
+                "content_type": values.get("content_type", defaults.get("content_type", "Image")),
+                "style": values.get("style", defaults.get("style", "")),
+                "use_case": values.get("use_case", defaults.get("use_case", "")),
+                "model_platform": values.get("model_platform", defaults.get("model_platform", "Midjourney"))
+            })
+    return inputs
+
+
+def attach_initial_packages(inputs: List[Dict[str, Any]], generate: InitialGenerator, batch_size: int) -> List[Dict[str, Any]]:
+    """
+    Copies of `inputs` whose Generation-mode items carry an `initial_package`
+    from `generate(items, batch_size)` (e.g. `agent_generate_initial_prompts`),
+    so `run_workflow` starts from it instead of generating one itself.
+    """
+    positions = [i for i, user_inputs in enumerate(inputs) if user_inputs.get("input_mode", "Generation") == "Generation"]
+    if len(positions) < 2:
+        return inputs
+    items = [{key: inputs[i].get(key, "") for key in ("topic", "content_type", "style", "use_case", "model_platform")} for i in positions]
+    packages = generate(items, batch_size)
+    prepared = list(inputs)
+    for i, package in zip(positions, packages):
+        prepared[i] = dict(inputs[i], initial_package=package)
+    return prepared
+
+
+# --- Fan-out ---
+
+_global_slots: Optional[threading.BoundedSemaphore] = None
+_global_lock = threading.Lock()
+
+
+def _slots(limit: int) -> threading.BoundedSemaphore:
+    """The process-wide concurrency limit (sized by the first fan-out that runs)."""
+    global _global_slots
+    with _global_lock:
+        if _global_slots is None:
+            _global_slots = threading.BoundedSemaphore(max(1, limit))
+        return _global_slots
+
+
+def _run_item(workflow: Workflow, user_inputs: Dict[str, Any], slots: threading.BoundedSemaphore, meter: Any) -> Dict[str, Any]:
+    """Runs one workflow to completion, holding a global slot and counting its requests on `meter`."""
+    from .policy import metered
+
+    package, steps = None, 0
+    with slots, metered(meter):
+        for state in workflow(user_inputs):
+            steps += 1
+            package = state.get("prompt_package", package)
+            if state["status"] == "error":
+                # Library near-duplicates stopped by the workflow are skipped, not failed
+                status = "skipped" if state.get("duplicate_of") else "error"
+                return {"status": status, "error": state["output"], "prompt_package": package, "steps": steps}
+            if state["status"] == "completed":
+                return {"status": "completed", "output": state["output"], "prompt_package": package, "steps": steps}
+    return {"status": "error", "error": "Workflow ended without completing.", "prompt_package": package, "steps": steps}
+
+
+def fan_out(
+    workflow: Workflow,
+    inputs: List[Dict[str, Any]],
+    settings: Optional[Dict[str, Any]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    requests_made: Optional[Callable[[], int]] = None,
+    generate_initial: Optional[InitialGenerator] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Runs `workflow(user_inputs)` for every input concurrently, yielding results as they finish.
+
+    Args:
+        workflow: Function returning the workflow's state generator for one input
+            (typically `run_workflow` with the API key, models and config bound).
+        inputs: Workflow `user_inputs`, one per package.
+        settings: Resolved fan-out settings (see resolve_settings).
+        on_result: Called with each finished result before it is yielded (e.g. to save it).
+        requests_made: Request counter used for the budget; defaults to the
+            requests made by this fan-out's own items and initial generation.
+        generate_initial: Batched initial-package generator; when given and
+            `initial_batch_size` > 1, initial packages are generated up front
+            (counted against the budget) and the workflows continue from them.
+
+    Yields:
+        dict: {'index', 'user_inputs', 'status' ('completed' | 'error' | 'skipped'),
+        'prompt_package', 'error', 'steps'}; skipped items were not started because
+        the request budget ran out, or were stopped as library near-duplicates.
+    """
+    from .policy import RequestMeter, metered
+
+    settings = settings or resolve_settings()
+    slots = _slots(settings["global_max_concurrency"])
+    budget = settings.get("max_requests")
+    meter = RequestMeter()
+    requests_made = requests_made or (lambda: meter.count)
+    baseline = requests_made()
+    if generate_initial and (settings.get("initial_batch_size") or 0) > 1:
+        with metered(meter):
+            inputs = attach_initial_packages(inputs, generate_initial, settings["initial_batch_size"])
+    pending_inputs = list(enumerate(inputs))
+
+    def over_budget() -> bool:
+        return budget is not None and requests_made() - baseline >= budget
+
+    with ThreadPoolExecutor(max_workers=max(1, settings["max_concurrency"]), thread_name_prefix="fanout") as executor:
+        running = {}
+
+        def launch():
+            while pending_inputs and len(running) < settings["max_concurrency"] and not over_budget():
+                index, user_inputs = pending_inputs.pop(0)
+                running[executor.submit(_run_item, workflow, user_inputs, slots, meter)] = (index, user_inputs)
+
+        launch()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, user_inputs = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Fan-out item '{user_inputs.get('topic')}' failed: {e}", exc_info=True)
+                    result = {"status": "error", "error": str(e), "prompt_package": None, "steps": 0}
+                result.update(index=index, user_inputs=user_inputs)
+                if on_result:
+                    on_result(result)
+                yield result
+            launch()
+
+    for index, user_inputs in pending_inputs:
+        result = {
+            "index": index, "user_inputs": user_inputs, "status": "skipped", "prompt_package": None, "steps": 0,
+            "error": f"Request budget of {budget} exhausted."
+        }
+        if on_result:
+            on_result(result)
+        yield result
+
+
+def library_saver(database_name: str) -> Callable[[Dict[str, Any]], None]:
+    """An `on_result` hook that saves each completed package to the prompt library as it finishes."""
+    from .utils import save_prompt_to_db
+
+    def save(result: Dict[str, Any]):
+        if result["status"] != "completed" or not result.get("prompt_package"):
+            return
+        package = dict(result["prompt_package"])
+        for key in ("content_type", "style", "use_case"):
+            package.setdefault(key, result["user_inputs"].get(key, ""))
+        package.setdefault("platform", result["user_inputs"].get("model_platform", ""))
+        try:
+            save_prompt_to_db(database_name, package)
+            result["saved"] = True
+        except Exception as e:
+            logger.error(f"Could not save fan-out package '{package.get('topic')}': {e}")
+            result["saved"] = False
+
+    return save
@@ -0,0 +1,232 @@
+"""
+Web Fetch Module for market analysis.
+
+Replaces the bare `requests.get` in `agent_analyze_market` with:
+1. A pooled, shared `requests.Session` (keep-alive across calls and threads)
+2. An on-disk cache revalidated with ETag / Last-Modified conditional requests
+3. HTML-to-main-text extraction (drops scripts, styles, navigation and markup)
+4. A token cap so a single page cannot flood the analysis prompt
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from html.parser import HTMLParser
+from typing import Dict, Any, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+USER_AGENT = "Mozilla/5.0 (compatible; PBT-MarketAnalyzer/1.0)"
+DEFAULT_TIMEOUT = 15
+POOL_SIZE = 16
+
+# Cache lives at project root, next to published/
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "http")
+
+# Rough budget for page text inside the analysis prompt (~4 characters per token)
+MAX_PAGE_TOKENS = 6000
+CHARS_PER_TOKEN = 4
+
+# Elements whose text never belongs to the main content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "head", "nav", "footer", "form"}
+
+# Elements that end a line of text
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "li", "ul", "ol", "br", "tr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "figcaption"
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+# --- Session ---
+
+def get_session() -> requests.Session:
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _session = session
+        return _session
+
+
+# --- Disk Cache ---
+
+def _cache_path(url: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_cache_entry(url: str, cache_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(url, cache_dir), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _store_cache_entry(url: str, cache_dir: str, entry: Dict[str, Any]):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(url, cache_dir)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def fetch_url(
+    url: str,
+    cache_dir: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Fetches a URL through the pooled session with conditional-request caching.
+
+    Args:
+        url: The page to fetch.
+        cache_dir: Directory for cached bodies (defaults to CACHE_DIR, read at call time).
+        timeout: Per-request timeout in seconds.
+        use_cache: False skips the disk cache entirely.
+
+    Returns:
+        dict: {'url', 'status', 'body', 'from_cache'} or {'error'} on failure.
+    """
+    cache_dir = (cache_dir or CACHE_DIR) if use_cache else None
+    cached = _load_cache_entry(url, cache_dir) if cache_dir else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            logger.info(f"Cache revalidated (304) for {url}")
+            return {"url": url, "status": 304, "body": cached["body"], "from_cache": True}
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request to {url} failed: {e}", exc_info=True)
+        return {"error": f"Failed to fetch content from URL: {url}. Reason: {e}"}
+
+    body = response.text
+    if cache_dir and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+        try:
+            _store_cache_entry(url, cache_dir, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "body": body
+            })
+        except OSError as e:
+            logger.warning(f"Could not cache response for {url}: {e}")
+
+    return {"url": url, "status": response.status_code, "body": body, "from_cache": False}
+
+
+# --- HTML Extraction ---
+
+class _MainTextParser(HTMLParser):
+    """Collects visible text, tracking <main>/<article> content separately."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._main_depth = 0
+        self.lines: List[str] = [""]
+        self.main_lines: List[str] = [""]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in ("main", "article"):
+            self._main_depth += 1
+        if tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("main", "article") and self._main_depth:
+            self._main_depth -= 1
+        if tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = " ".join(data.split())
+        if not text:
+            return
+        self.lines[-1] = f"{self.lines[-1]} {text}".strip()
+        if self._main_depth:
+            self.main_lines[-1] = f"{self.main_lines[-1]} {text}".strip()
+
+    def _break(self):
+        if self.lines[-1]:
+            self.lines.append("")
+        if self.main_lines[-1]:
+            self.main_lines.append("")
+
+
+def truncate_to_tokens(text: str, max_tokens: int = MAX_PAGE_TOKENS) -> str:
+    """Cuts text to an approximate token budget, on a line boundary where possible."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars] + "\n[... truncated]"
+
+
+def extract_main_text(html: str, max_tokens: int = MAX_PAGE_TOKENS) -> str:
+    """
+    Converts an HTML document to its main readable text.
+    Prefers <main>/<article> content when the page has a meaningful amount of it.
+    """
+    parser = _MainTextParser()
+    parser.feed(html)
+    parser.close()
+
+    main_text = "\n".join(line for line in parser.main_lines if line)
+    full_text = "\n".join(line for line in parser.lines if line)
+    text = main_text if len(main_text) >= 200 else full_text
+    return truncate_to_tokens(text, max_tokens)
+
+
+def fetch_page_text(
+    url: str,
+    max_tokens: int = MAX_PAGE_TOKENS,
+    cache_dir: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Fetches a page and returns its extracted main text (caching as in `fetch_url`).
+
+    Returns:
+        dict: {'url', 'text', 'from_cache'} or {'error'} on failure.
+    """
+    result = fetch_url(url, cache_dir=cache_dir, timeout=timeout, use_cache=use_cache)
+    if "error" in result:
+        return result
+    return {"url": url, "text": extract_main_text(result["body"], max_tokens), "from_cache": result["from_cache"]}
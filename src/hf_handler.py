@@ -1,4 +1,3 @@
-import os
 import requests
 from huggingface_hub import InferenceClient
 from PIL import Image
@@ -6,6 +5,9 @@ import io
 
 import re
 
+from .previews import tier_parameters, DEFAULT_TIER
+from .keypool import get_pool, is_quota_error
+
 # Models
 FLUX_SCHNELL = "black-forest-labs/FLUX.1-schnell"
 SDXL_BASE = "stabilityai/stable-diffusion-xl-base-1.0"
@@ -18,42 +20,59 @@ def clean_prompt(prompt: str) -> str:
     cleaned = re.sub(r'--[a-zA-Z0-9]+(\s+[a-zA-Z0-9:.]+)?', '', prompt)
     return cleaned.strip()
 
-def generate_preview_image(prompt: str, output_path: str, api_key: str = None, model: str = FLUX_SCHNELL):
+def generate_preview_image(prompt: str, output_path: str, api_key: str = None, model: str = FLUX_SCHNELL, tier: str = DEFAULT_TIER):
     """
     Generate a preview image using HuggingFace Inference API.
+    `tier` selects "draft" (low resolution, few steps) or "final" parameters.
+    Without an explicit `api_key`, the least-loaded key of the HF key pool is used
+    and benched if it hits a quota error.
     """
-    if not api_key:
-        api_key = os.environ.get("HF_API_KEY")
-        
-    if not api_key:
+    if api_key:
+        return _generate_with_key(prompt, output_path, api_key, model, tier)
+
+    pool = get_pool("hf")
+    if not len(pool):
         return {"error": "No HF_API_KEY found. Please set it in .env or pass it as an argument."}
+    try:
+        with pool.lease() as key:
+            result = _generate_with_key(prompt, output_path, key.value, model, tier)
+            if is_quota_error(result.get("error")):
+                pool.bench(key)
+            return result
+    except RuntimeError as e:
+        return {"error": str(e)}
 
+def _generate_with_key(prompt: str, output_path: str, api_key: str, model: str, tier: str):
     # Clean prompt for HF
     clean_p = clean_prompt(prompt)
-    print(f"🎨 Generating preview with {model}...")
+    params = tier_parameters(tier, model)
+    print(f"🎨 Generating {tier} preview with {model}...")
     print(f"   Prompt: {clean_p[:50]}...")
     
     try:
         client = InferenceClient(model=model, token=api_key)
         
         # Generate image
-        image = client.text_to_image(clean_p)
+        image = client.text_to_image(clean_p, **params)
         
         # Save image
         image.save(output_path)
-        return {"success": True, "path": output_path}
+        return {"success": True, "path": output_path, "tier": tier}
         
     except Exception as e:
         # Fallback to requests if client fails or for specific errors
         print(f"⚠️ InferenceClient error: {e}. Trying raw API request...")
-        return _generate_via_requests(prompt, output_path, api_key, model)
+        return _generate_via_requests(prompt, output_path, api_key, model, params)
 
-def _generate_via_requests(prompt, output_path, api_key, model):
+def _generate_via_requests(prompt, output_path, api_key, model, params=None):
     headers = {"Authorization": f"Bearer {api_key}"}
     api_url = f"https://router.huggingface.co/models/{model}"
+    payload = {"inputs": prompt}
+    if params:
+        payload["parameters"] = params
     
     try:
-        response = requests.post(api_url, headers=headers, json={"inputs": prompt})
+        response = requests.post(api_url, headers=headers, json=payload)
         
         if response.status_code != 200:
             return {"error": f"API Error {response.status_code}: {response.text}"}
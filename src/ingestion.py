@@ -0,0 +1,441 @@
+"""
+Streaming Ingestion Module for the Trend Engine Knowledge Base.
+
+Large market reports used to be loaded whole before being parsed:
+1. PDF text was built by concatenating every page in a single string
+2. CSV files were read fully into memory before `parse_csv_to_text`
+3. JSON files were `json.loads`-ed in one go before `parse_json_to_text`
+
+This module replaces that path with generators over pages, rows and items,
+optional parallel PDF page extraction in a process pool, row sampling/limits,
+and chunked writes straight into the `market_data` table. Each file is
+identified by a content hash so re-uploading it is a no-op.
+"""
+
+import io
+import os
+import csv
+import json
+import random
+import shutil
+import hashlib
+import itertools
+import logging
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple, BinaryIO
+
+from pypdf import PdfReader
+
+from .dedup import DUPLICATE_THRESHOLD
+from .utils import (
+    format_csv_row,
+    format_json_item,
+    format_json_field,
+    is_file_ingested,
+    save_market_data_chunks
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+HASH_BLOCK_SIZE = 1024 * 1024
+JSON_BUFFER_SIZE = 64 * 1024
+
+# Records per Knowledge Base chunk, by unit
+CHUNK_SIZES = {
+    "pages": 10,
+    "rows": 200,
+    "items": 200,
+    "lines": 200
+}
+
+# Pages handed to a single worker process at a time
+PDF_PAGES_PER_TASK = 8
+
+# Upper bound for the text handed to the trend analyzer from a single upload
+MAX_ANALYSIS_CHARS = 100_000
+
+
+# --- File Helpers ---
+
+def compute_file_hash(fileobj: BinaryIO) -> str:
+    """
+    Computes a SHA-256 content hash of a binary file object in fixed-size blocks.
+    The stream is rewound before and after hashing.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def detect_kind(filename: str, mime_type: str = "") -> str:
+    """Maps an uploaded file to one of: 'pdf', 'csv', 'json' or 'text'."""
+    name = filename.lower()
+    if mime_type == "application/pdf" or name.endswith(".pdf"):
+        return "pdf"
+    if mime_type == "text/csv" or name.endswith(".csv"):
+        return "csv"
+    if mime_type == "application/json" or name.endswith(".json"):
+        return "json"
+    return "text"
+
+
+def _sample(
+    records: Iterable[Tuple[int, str]],
+    limit: Optional[int] = None,
+    sample_rate: Optional[float] = None,
+    seed: int = 0
+) -> Iterator[Tuple[int, str]]:
+    """Keeps roughly `sample_rate` of the records, stopping after `limit` kept records."""
+    rng = random.Random(seed)
+    kept = 0
+    for record in records:
+        if limit is not None and kept >= limit:
+            return
+        if sample_rate is not None and sample_rate < 1.0 and rng.random() >= sample_rate:
+            continue
+        kept += 1
+        yield record
+
+
+def _text_stream(fileobj: BinaryIO, encoding: str = "utf-8") -> io.TextIOWrapper:
+    """Wraps a binary stream for incremental text decoding."""
+    fileobj.seek(0)
+    return io.TextIOWrapper(fileobj, encoding=encoding, errors="replace", newline="")
+
+
+# --- Row / Item Generators ---
+
+def iter_csv_rows(fileobj: BinaryIO, encoding: str = "utf-8") -> Iterator[Tuple[int, str]]:
+    """Yields (row_number, formatted_row) for each CSV data row, one row at a time."""
+    text = _text_stream(fileobj, encoding)
+    try:
+        reader = csv.DictReader(text)
+        for i, row in enumerate(reader):
+            yield i + 1, format_csv_row(i, row)
+    finally:
+        # Detach so closing the wrapper does not close the caller's file
+        text.detach()
+
+
+def iter_text_lines(fileobj: BinaryIO, encoding: str = "utf-8") -> Iterator[Tuple[int, str]]:
+    """Yields (line_number, line) for plain text / markdown uploads."""
+    text = _text_stream(fileobj, encoding)
+    try:
+        for i, line in enumerate(text):
+            yield i + 1, line.rstrip("\r\n")
+    finally:
+        text.detach()
+
+
+class _JsonStreamReader:
+    """
+    Minimal incremental JSON reader for a top-level list or object.
+    Decodes one element at a time with `json.JSONDecoder.raw_decode`, keeping
+    only the unconsumed tail of the input in memory.
+    """
+
+    def __init__(self, text_stream: io.TextIOBase, buffer_size: int = JSON_BUFFER_SIZE):
+        self._stream = text_stream
+        self._buffer_size = buffer_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        chunk = self._stream.read(self._buffer_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos] if self._pos < len(self._buf) else ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found '{found or 'EOF'}'.")
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof or not self._fill():
+                    raise
+                continue
+            # A number ending exactly at the buffer edge may continue in the next read
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def iter_json_entries(fileobj: BinaryIO, encoding: str = "utf-8") -> Iterator[Tuple[int, str]]:
+    """
+    Yields (entry_number, formatted_entry) for each element of a top-level JSON
+    list, or each key of a top-level JSON object, without loading the whole file.
+    Formatting matches `parse_json_to_text`.
+    """
+    text = _text_stream(fileobj, encoding)
+    try:
+        reader = _JsonStreamReader(text)
+        opener = reader.peek()
+
+        if opener == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                return
+            i = 0
+            while True:
+                yield i + 1, format_json_item(i, reader.value())
+                i += 1
+                if reader.peek() == ",":
+                    reader.expect(",")
+                    continue
+                reader.expect("]")
+                return
+
+        elif opener == "{":
+            reader.expect("{")
+            if reader.peek() == "}":
+                return
+            i = 0
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                yield i + 1, format_json_field(key, reader.value())
+                i += 1
+                if reader.peek() == ",":
+                    reader.expect(",")
+                    continue
+                reader.expect("}")
+                return
+
+        elif opener:
+            yield 1, str(reader.value())
+    finally:
+        text.detach()
+
+
+# --- PDF Pages ---
+
+def _extract_pdf_page_range(path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Worker: extracts text for pages [start, stop) of the PDF at `path`."""
+    reader = PdfReader(path)
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+def _spool_to_path(fileobj: BinaryIO) -> Tuple[str, bool]:
+    """
+    Returns a filesystem path for the stream so worker processes can open it.
+    The boolean is True when a temporary copy was made and must be removed.
+    """
+    name = getattr(fileobj, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name, False
+
+    fileobj.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        shutil.copyfileobj(fileobj, tmp, HASH_BLOCK_SIZE)
+    fileobj.seek(0)
+    return tmp.name, True
+
+
+def _iter_pdf_pages_parallel(path: str, ranges: List[Tuple[int, int]], workers: int) -> Iterator[Tuple[int, str]]:
+    """
+    Extracts page ranges in a process pool, yielding pages in order.
+    At most two ranges per worker are in flight, so a consumer that stops
+    early (e.g. a capped preview) does not pay for the whole document.
+    """
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    remaining = iter(ranges)
+    try:
+        for start, stop in itertools.islice(remaining, workers * 2):
+            pending.append(executor.submit(_extract_pdf_page_range, path, start, stop))
+        while pending:
+            page_texts = pending.popleft().result()
+            for start, stop in itertools.islice(remaining, 1):
+                pending.append(executor.submit(_extract_pdf_page_range, path, start, stop))
+            yield from page_texts
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_pages(
+    fileobj: BinaryIO,
+    workers: Optional[int] = None,
+    page_limit: Optional[int] = None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) for each page of a PDF, in order.
+
+    Args:
+        fileobj: Binary PDF stream (e.g. a Streamlit UploadedFile).
+        workers: Worker processes for extraction. Defaults to the CPU count;
+            1 disables the process pool.
+        page_limit: Optional maximum number of pages to read.
+    """
+    path, is_temp = _spool_to_path(fileobj)
+    try:
+        total = len(PdfReader(path).pages)
+        if page_limit is not None:
+            total = min(total, page_limit)
+
+        workers = workers or os.cpu_count() or 1
+        ranges = [(s, min(s + PDF_PAGES_PER_TASK, total)) for s in range(0, total, PDF_PAGES_PER_TASK)]
+
+        done = 0
+        if workers > 1 and len(ranges) > 1:
+            try:
+                for page in _iter_pdf_pages_parallel(path, ranges, min(workers, len(ranges))):
+                    yield page
+                    done = page[0]
+                return
+            except (BrokenProcessPool, OSError) as e:
+                # Resume from the last page delivered
+                logger.warning(f"Parallel PDF extraction unavailable ({e}); continuing sequentially.")
+
+        for start, stop in ranges:
+            if stop <= done:
+                continue
+            yield from _extract_pdf_page_range(path, max(start, done), stop)
+    finally:
+        if is_temp:
+            os.remove(path)
+
+
+# --- Chunking & Ingestion ---
+
+def iter_file_records(
+    fileobj: BinaryIO,
+    filename: str,
+    mime_type: str = "",
+    row_limit: Optional[int] = None,
+    sample_rate: Optional[float] = None,
+    pdf_workers: Optional[int] = None
+) -> Tuple[str, Iterator[Tuple[int, str]]]:
+    """
+    Returns (unit, records) for an uploaded file, where records is a lazy
+    iterator of (number, text). `row_limit` caps pages/rows/items kept and
+    `sample_rate` keeps a random fraction of them.
+    """
+    kind = detect_kind(filename, mime_type)
+    if kind == "pdf":
+        # Without sampling, the limit also bounds how many pages get extracted
+        page_limit = row_limit if sample_rate is None else None
+        unit, records = "pages", iter_pdf_pages(fileobj, workers=pdf_workers, page_limit=page_limit)
+    elif kind == "csv":
+        unit, records = "rows", iter_csv_rows(fileobj)
+    elif kind == "json":
+        unit, records = "items", iter_json_entries(fileobj)
+    else:
+        unit, records = "lines", iter_text_lines(fileobj)
+    return unit, _sample(records, limit=row_limit, sample_rate=sample_rate)
+
+
+def iter_chunks(
+    records: Iterable[Tuple[int, str]],
+    unit: str,
+    chunk_size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Groups numbered records into page- or row-range chunk dicts."""
+    chunk_size = chunk_size or CHUNK_SIZES.get(unit, 200)
+    lines: List[str] = []
+    start = end = None
+
+    for number, text in records:
+        if start is None:
+            start = number
+        end = number
+        lines.append(text)
+        if len(lines) >= chunk_size:
+            yield {"unit": unit, "start": start, "end": end, "content": "\n".join(lines)}
+            lines, start = [], None
+
+    if lines:
+        yield {"unit": unit, "start": start, "end": end, "content": "\n".join(lines)}
+
+
+def read_file_text(
+    fileobj: BinaryIO,
+    filename: str,
+    mime_type: str = "",
+    max_chars: int = MAX_ANALYSIS_CHARS,
+    **options: Any
+) -> str:
+    """
+    Streams an upload into a single text block for immediate analysis,
+    stopping once `max_chars` is reached. Options are passed to `iter_file_records`.
+    """
+    _, records = iter_file_records(fileobj, filename, mime_type, **options)
+    parts: List[str] = []
+    size = 0
+    for _, text in records:
+        if size + len(text) > max_chars:
+            parts.append(f"... [truncated at {max_chars} characters]")
+            break
+        parts.append(text)
+        size += len(text) + 1
+    fileobj.seek(0)
+    return "\n".join(parts)
+
+
+def ingest_file(
+    database_name: str,
+    fileobj: BinaryIO,
+    filename: str,
+    mime_type: str = "",
+    chunk_size: Optional[int] = None,
+    threshold: float = DUPLICATE_THRESHOLD,
+    **options: Any
+) -> Dict[str, Any]:
+    """
+    Streams an uploaded file into the Knowledge Base as range chunks.
+
+    Args:
+        database_name: SQLite database path.
+        fileobj: Binary stream of the upload.
+        filename: Original file name (used for type detection and source labels).
+        mime_type: Optional MIME type reported by the uploader.
+        chunk_size: Records per chunk (defaults per unit, see CHUNK_SIZES).
+        threshold: Similarity above which a chunk is skipped as a near-duplicate.
+        **options: row_limit, sample_rate, pdf_workers (see `iter_file_records`).
+            Only complete ingests (no row_limit, no sampling) register the file
+            hash, so a sampled preview doesn't block the full upload later.
+
+    Returns:
+        dict: {'file_hash', 'skipped', 'chunks', 'unit'}
+    """
+    file_hash = compute_file_hash(fileobj)
+    if is_file_ingested(database_name, file_hash):
+        logger.info(f"Skipping already ingested file: {filename} ({file_hash[:12]})")
+        return {"file_hash": file_hash, "skipped": True, "chunks": 0, "unit": None}
+
+    complete = options.get("row_limit") is None and (options.get("sample_rate") is None or options["sample_rate"] >= 1.0)
+    unit, records = iter_file_records(fileobj, filename, mime_type, **options)
+    count = save_market_data_chunks(
+        database_name, iter_chunks(records, unit, chunk_size), filename, file_hash, threshold, register=complete
+    )
+    fileobj.seek(0)
+    return {"file_hash": file_hash, "skipped": False, "chunks": count, "unit": unit}
@@ -0,0 +1,360 @@
+"""
+Durable Job Queue Module.
+
+A `jobs` table in the prompt database that any number of worker processes
+can share:
+1. Leases - a worker claims a job for `lease_seconds` and extends the lease
+   with heartbeats while it runs; jobs whose lease expires (crash, reboot,
+   killed worker) are handed to another worker
+2. Retries - failed and expired jobs are retried up to `max_attempts` times
+   with a growing delay, then marked failed
+3. Lanes - interactive jobs are always claimed before batch jobs
+4. Status - queue depth per lane, active workers and recent throughput
+
+Claims run in `BEGIN IMMEDIATE` transactions, so two workers never get the
+same job. The database keeps SQLite's default rollback journal (WAL does not
+work across hosts); workers on other hosts need a filesystem with working
+file locking for the shared database file.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+LANES = {"interactive": 0, "batch": 10}  # lower runs first
+DEFAULT_LANE = "batch"
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 30.0
+BUSY_TIMEOUT_MS = 30000
+THROUGHPUT_WINDOW_SECONDS = 3600
+
+Handler = Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Any]
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            lane TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            dedupe_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            available_at REAL NOT NULL,
+            worker TEXT,
+            lease_until REAL,
+            heartbeat_at REAL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            result TEXT,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, id)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key) WHERE dedupe_key IS NOT NULL")
+    return conn
+
+
+@contextmanager
+def _session(db_path: str) -> Iterator[sqlite3.Connection]:
+    conn = _connect(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def worker_name() -> str:
+    """Identifies this process in the `worker` column (host:pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --- Producers ---
+
+def enqueue(
+    db_path: str,
+    kind: str,
+    payload: Dict[str, Any],
+    lane: str = DEFAULT_LANE,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    dedupe_key: Optional[str] = None
+) -> Optional[int]:
+    """
+    Adds a job to the queue.
+
+    A `dedupe_key` already in the table (queued, running or finished) is not
+    enqueued again, so re-running a batch submission only adds new work.
+
+    Returns:
+        int | None: The new job id, or None when `dedupe_key` was already queued.
+    """
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane '{lane}' (expected one of {', '.join(LANES)})")
+    now = time.time()
+    with _session(db_path) as conn:
+        cursor = conn.execute(
+            """INSERT OR IGNORE INTO jobs (kind, payload, lane, priority, dedupe_key, max_attempts, available_at, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (kind, json.dumps(payload, ensure_ascii=False), lane, LANES[lane], dedupe_key, max_attempts, now, now)
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+def retry_failed(db_path: str) -> int:
+    """Puts failed jobs back in the queue with a fresh attempt budget; returns how many."""
+    with _session(db_path) as conn:
+        return conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, error = NULL WHERE status = 'failed'",
+            (time.time(),)
+        ).rowcount
+
+
+# --- Workers ---
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    if job.get("result"):
+        job["result"] = json.loads(job["result"])
+    return job
+
+
+def claim(
+    db_path: str,
+    worker: str,
+    kinds: Optional[Iterable[str]] = None,
+    lanes: Optional[Iterable[str]] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS
+) -> Optional[Dict[str, Any]]:
+    """
+    Leases the next runnable job: queued jobs and jobs whose lease expired,
+    interactive lane first, oldest first.
+
+    Expired jobs that already used all their attempts are marked failed.
+
+    Returns:
+        dict | None: The claimed job (payload decoded), or None if nothing is runnable.
+    """
+    now = time.time()
+    filters, params = ["(status = 'queued' OR (status = 'running' AND lease_until < ?))", "available_at <= ?"], [now, now]
+    if kinds:
+        kinds = list(kinds)
+        filters.append(f"kind IN ({', '.join('?' * len(kinds))})")
+        params.extend(kinds)
+    if lanes:
+        lanes = list(lanes)
+        filters.append(f"lane IN ({', '.join('?' * len(lanes))})")
+        params.extend(lanes)
+
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            """UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Lease expired after ' || attempts || ' attempt(s)'
+               WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts""",
+            (now, now)
+        )
+        row = conn.execute(
+            f"SELECT * FROM jobs WHERE {' AND '.join(filters)} ORDER BY priority, id LIMIT 1", params
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        if row["status"] == "running":
+            logger.warning(f"Job {row['id']} lease held by {row['worker']} expired; retrying on {worker}.")
+        conn.execute(
+            """UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, heartbeat_at = ?,
+               attempts = attempts + 1, started_at = ? WHERE id = ?""",
+            (worker, now + lease_seconds, now, now, row["id"])
+        )
+        conn.execute("COMMIT")
+        job = _row_to_job(row)
+        job.update(status="running", worker=worker, attempts=row["attempts"] + 1)
+        return job
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def heartbeat(db_path: str, job_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+    """Extends a job's lease; False when the lease was lost to another worker."""
+    now = time.time()
+    with _session(db_path) as conn:
+        return conn.execute(
+            "UPDATE jobs SET lease_until = ?, heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (now + lease_seconds, now, job_id, worker)
+        ).rowcount == 1
+
+
+def complete(db_path: str, job_id: int, worker: str, result: Any = None) -> bool:
+    """Records a job's result; False when the lease was lost (another worker owns the job now)."""
+    with _session(db_path) as conn:
+        return conn.execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), json.dumps(result, ensure_ascii=False, default=str), job_id, worker)
+        ).rowcount == 1
+
+
+def fail(db_path: str, job_id: int, worker: str, error: str) -> bool:
+    """Records a failure: the job is requeued with a delay until its attempts run out, then marked failed."""
+    now = time.time()
+    with _session(db_path) as conn:
+        return conn.execute(
+            """UPDATE jobs SET
+                   status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                   available_at = ? + ? * attempts,
+                   finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE ? END,
+                   lease_until = NULL, error = ?
+               WHERE id = ? AND worker = ? AND status = 'running'""",
+            (now, RETRY_DELAY_SECONDS, now, error, job_id, worker)
+        ).rowcount == 1
+
+
+def get_job(db_path: str, job_id: int) -> Optional[Dict[str, Any]]:
+    with _session(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+
+class Worker:
+    """
+    Claims and runs jobs until stopped or out of work.
+
+    Handlers are `handler(payload, emit)` functions (the same shape as the
+    HTTP service's runners); a heartbeat thread keeps the lease alive while
+    a handler runs.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        handlers: Dict[str, Handler],
+        lanes: Optional[Iterable[str]] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        name: Optional[str] = None
+    ):
+        self.db_path = db_path
+        self.handlers = handlers
+        self.lanes = list(lanes) if lanes else None
+        self.lease_seconds = lease_seconds
+        self.name = name or worker_name()
+        self.stop_event = threading.Event()
+
+    def _keep_alive(self, job_id: int, done: threading.Event):
+        while not done.wait(self.lease_seconds / 3):
+            if not heartbeat(self.db_path, job_id, self.name, self.lease_seconds):
+                logger.warning(f"Worker {self.name} lost the lease on job {job_id}.")
+                return
+
+    def run_one(self, on_event: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Claims and runs one job.
+
+        Returns:
+            dict | None: The job as claimed plus its final 'status', or None when nothing was runnable.
+        """
+        job = claim(self.db_path, self.name, kinds=self.handlers, lanes=self.lanes, lease_seconds=self.lease_seconds)
+        if job is None:
+            return None
+
+        done = threading.Event()
+        threading.Thread(target=self._keep_alive, args=(job["id"], done), daemon=True).start()
+        emit = (lambda event: on_event(job, event)) if on_event else (lambda event: None)
+        try:
+            result = self.handlers[job["kind"]](job["payload"], emit)
+            complete(self.db_path, job["id"], self.name, result)
+            job["status"] = "done"
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}: {e}", exc_info=True)
+            fail(self.db_path, job["id"], self.name, str(e))
+            job["status"], job["error"] = "failed", str(e)
+        finally:
+            done.set()
+        return job
+
+    def run(
+        self,
+        max_jobs: Optional[int] = None,
+        poll_seconds: float = 5.0,
+        exit_when_idle: bool = False,
+        on_event: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+        on_job: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> int:
+        """
+        Processes jobs until `stop_event` is set, `max_jobs` ran, or (optionally)
+        the queue is idle. `on_event` sees each job's progress events and
+        `on_job` each finished job.
+
+        Returns:
+            int: Number of jobs run.
+        """
+        processed = 0
+        while not self.stop_event.is_set() and (max_jobs is None or processed < max_jobs):
+            job = self.run_one(on_event)
+            if job is None:
+                if exit_when_idle:
+                    break
+                self.stop_event.wait(poll_seconds)
+                continue
+            processed += 1
+            if on_job:
+                on_job(job)
+        return processed
+
+
+# --- Status ---
+
+def queue_status(db_path: str, window_seconds: float = THROUGHPUT_WINDOW_SECONDS) -> Dict[str, Any]:
+    """
+    Queue depth per lane and status, active workers and recent throughput.
+
+    Returns:
+        dict: {'lanes': {lane: {status: count}}, 'workers', 'expired_leases',
+        'completed_recent', 'jobs_per_minute', 'avg_seconds', 'oldest_queued_seconds'}
+    """
+    now = time.time()
+    with _session(db_path) as conn:
+        lanes: Dict[str, Dict[str, int]] = {lane: {} for lane in LANES}
+        for row in conn.execute("SELECT lane, status, COUNT(*) AS n FROM jobs GROUP BY lane, status"):
+            lanes.setdefault(row["lane"], {})[row["status"]] = row["n"]
+        workers = conn.execute(
+            "SELECT COUNT(DISTINCT worker) FROM jobs WHERE status = 'running' AND lease_until >= ?", (now,)
+        ).fetchone()[0]
+        expired = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until < ?", (now,)
+        ).fetchone()[0]
+        recent = conn.execute(
+            "SELECT COUNT(*), AVG(finished_at - started_at) FROM jobs WHERE status = 'done' AND finished_at >= ?",
+            (now - window_seconds,)
+        ).fetchone()
+        oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    return {
+        "lanes": lanes,
+        "workers": workers,
+        "expired_leases": expired,
+        "completed_recent": recent[0],
+        "jobs_per_minute": round(recent[0] / (window_seconds / 60), 2),
+        "avg_seconds": round(recent[1], 1) if recent[1] is not None else None,
+        "oldest_queued_seconds": round(now - oldest, 1) if oldest else None
+    }
@@ -0,0 +1,272 @@
+"""
+API Key Pool Module.
+
+Spreads requests over several API keys instead of one global key per process:
+1. Keys - Gemini and Hugging Face keys from the environment (`GEMINI_API_KEYS`,
+   `HF_API_KEYS`, comma-separated, plus the single-key variables) and config.yaml
+2. Clients - each Gemini key gets its own GenerativeServiceClient, so threads
+   can use different keys concurrently (no global `genai.configure`)
+3. Limits - a token-bucket rate limiter per key; requests lease the least-loaded key
+4. Benching - keys that hit quota errors are benched for a cool-down period
+
+When a pool has no keys, callers fall back to the globally configured key.
+"""
+
+import os
+import copy
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator, Iterable
+
+import yaml
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
+ENV_VARS = {
+    "gemini": ("GEMINI_API_KEYS", "GEMINI_API_KEY"),
+    "hf": ("HF_API_KEYS", "HF_API_KEY")
+}
+DEFAULT_REQUESTS_PER_MINUTE = {"gemini": 15, "hf": 30}
+DEFAULT_BENCH_SECONDS = 60.0
+MAX_WAIT_SECONDS = 120.0
+
+QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+
+def is_quota_error(error: Any) -> bool:
+    """True for quota / rate-limit errors (exceptions or HTTP error strings)."""
+    if isinstance(error, BaseException):
+        return isinstance(error, QUOTA_ERRORS)
+    text = str(error or "").lower()
+    return any(marker in text for marker in ("429", "402", "quota", "rate limit", "resource exhausted"))
+
+
+# --- Rate Limiting ---
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` requests per minute with bursts up to the same size."""
+
+    def __init__(self, per_minute: Optional[float]):
+        self.capacity = float(per_minute) if per_minute else 0.0
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.capacity:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until a token is available (0 when unlimited)."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now or time.monotonic())
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.capacity:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+
+# --- Keys ---
+
+class ApiKey:
+    """One API key with its rate limiter, load and bench state."""
+
+    def __init__(self, value: str, per_minute: Optional[float] = None):
+        self.value = value
+        self.limiter = RateLimiter(per_minute)
+        self.in_flight = 0
+        self.benched_until = 0.0
+        self.requests = 0
+        self.quota_errors = 0
+        self._client = None
+
+    @property
+    def label(self) -> str:
+        """Non-secret identifier for logs."""
+        return f"...{self.value[-4:]}"
+
+    @property
+    def client(self) -> glm.GenerativeServiceClient:
+        """Gemini client bound to this key (created on first use)."""
+        if self._client is None:
+            self._client = glm.GenerativeServiceClient(client_options={"api_key": self.value})
+        return self._client
+
+
+class KeyPool:
+    """
+    Least-loaded scheduling over a set of API keys.
+
+    `lease()` picks the non-benched key with the fewest in-flight requests
+    (then the shortest rate-limit wait), waits for its rate limiter and
+    yields it; `bench()` takes a key out of rotation after a quota error.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = (),
+        requests_per_minute: Optional[float] = None,
+        bench_seconds: float = DEFAULT_BENCH_SECONDS
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.bench_seconds = bench_seconds
+        self._keys: List[ApiKey] = []
+        self._condition = threading.Condition()
+        self.add(keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, keys: Iterable[str]):
+        """Adds keys not already in the pool (blank values are ignored)."""
+        with self._condition:
+            known = {k.value for k in self._keys}
+            for value in keys:
+                value = (value or "").strip()
+                if value and value not in known:
+                    self._keys.append(ApiKey(value, self.requests_per_minute))
+                    known.add(value)
+            self._condition.notify_all()
+
+    def _pick(self, now: float) -> Optional[ApiKey]:
+        available = [k for k in self._keys if k.benched_until <= now]
+        if not available:
+            return None
+        return min(available, key=lambda k: (k.in_flight, k.limiter.wait_time(now), k.requests))
+
+    @contextmanager
+    def lease(self, timeout: float = MAX_WAIT_SECONDS) -> Iterator[ApiKey]:
+        """
+        Yields the least-loaded key, blocking while every key is benched or rate limited.
+
+        Raises:
+            RuntimeError: If the pool is empty or no key frees up within `timeout`.
+        """
+        if not self._keys:
+            raise RuntimeError("The API key pool is empty.")
+        give_up = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                key = self._pick(now)
+                if key is not None:
+                    wait = key.limiter.wait_time(now)
+                    if wait <= 0:
+                        key.limiter.take()
+                        key.in_flight += 1
+                        key.requests += 1
+                        break
+                else:
+                    wait = min(k.benched_until for k in self._keys) - now
+                if now + wait > give_up:
+                    raise RuntimeError("No API key available: all keys are benched or rate limited.")
+                self._condition.wait(timeout=max(wait, 0.01))
+        try:
+            yield key
+        finally:
+            with self._condition:
+                key.in_flight -= 1
+                self._condition.notify_all()
+
+    def bench(self, key: ApiKey, seconds: Optional[float] = None):
+        """Takes a key out of rotation after a quota error."""
+        seconds = self.bench_seconds if seconds is None else seconds
+        with self._condition:
+            key.quota_errors += 1
+            key.benched_until = max(key.benched_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+        logger.warning(f"API key {key.label} benched for {seconds:.0f}s after a quota error.")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Per-key load and health, safe to log (keys are masked)."""
+        now = time.monotonic()
+        with self._condition:
+            return [
+                {
+                    "key": k.label,
+                    "in_flight": k.in_flight,
+                    "requests": k.requests,
+                    "quota_errors": k.quota_errors,
+                    "benched_for": round(max(0.0, k.benched_until - now), 1)
+                }
+                for k in self._keys
+            ]
+
+
+# --- Process-wide Pools ---
+
+_pools: Dict[str, KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _split(value: Any) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [v for v in str(value or "").split(",")]
+
+
+def load_keys(service: str, config: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Keys for a service from its environment variables and the `api_keys` config block."""
+    keys = []
+    for var in ENV_VARS[service]:
+        keys.extend(_split(os.environ.get(var)))
+    keys.extend(_split(((config or {}).get("api_keys") or {}).get(service)))
+    return [k.strip() for k in keys if k and k.strip()]
+
+
+def _read_config(path: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        with open(path or CONFIG_PATH, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+def get_pool(service: str, config: Optional[Dict[str, Any]] = None) -> KeyPool:
+    """The process-wide pool for "gemini" or "hf", built from env/config on first use."""
+    with _pools_lock:
+        if service not in _pools:
+            config = config if config is not None else _read_config()
+            settings = config.get("api_keys") or {}
+            per_minute = (settings.get("requests_per_minute") or {}).get(service, DEFAULT_REQUESTS_PER_MINUTE[service])
+            _pools[service] = KeyPool(
+                load_keys(service, config),
+                requests_per_minute=per_minute,
+                bench_seconds=settings.get("bench_seconds", DEFAULT_BENCH_SECONDS)
+            )
+        return _pools[service]
+
+
+def register_key(service: str, key: Optional[str]):
+    """Adds a key supplied at runtime (UI field, CLI prompt) to the service's pool."""
+    if key:
+        get_pool(service).add([key])
+
+
+def bind_client(model: Any, key: ApiKey) -> Any:
+    """A shallow copy of a GenerativeModel that sends its requests with `key`'s client."""
+    bound = copy.copy(model)
+    bound._client = key.client
+    return bound
+
+
+@contextmanager
+def leased_model(model: Any) -> Iterator[Any]:
+    """Yields `model` bound to a leased Gemini key (or unchanged when the pool is empty)."""
+    pool = get_pool("gemini")
+    if not len(pool):
+        yield model
+        return
+    with pool.lease() as key:
+        yield bind_client(model, key)
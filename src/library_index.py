@@ -0,0 +1,201 @@
+"""
+Library Similarity Index Module.
+
+Finds prompt packages in the library that a new request would nearly duplicate,
+before the workflow spends model calls on it:
+1. Signatures - every saved prompt gets a MinHash signature of its request
+   (topic, style, use case; word sets) and of its template (word 3-grams)
+2. Index - LSH band buckets stored in the `prompts_lsh` table next to `prompts`,
+   so candidates are found by index lookup instead of a library scan
+3. Checks - a request is checked before generation, a template right after
+   it; the closest matches are reported and, with `short_circuit`, the run
+   stops when one clears the threshold
+
+Settings come from the `library_dedup` block of config.yaml. Signatures use
+the deterministic MinHash/LSH helpers of `dedup`.
+"""
+
+import os
+import sqlite3
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .dedup import shingle, minhash_signature, text_signature, estimate_similarity, lsh_buckets, pack_signature, unpack_signature
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_LIBRARY_DEDUP: Dict[str, Any] = {
+    "enabled": True,
+    "request_threshold": 0.7,   # Jaccard of topic/style/use-case words
+    "template_threshold": 0.85, # Jaccard of template word 3-grams
+    "short_circuit": False,     # stop the run when a match clears the threshold
+    "max_matches": 3
+}
+KINDS = ("request", "template")
+REQUEST_FIELDS = ("topic", "style", "use_case")
+
+
+def resolve_settings(config: Optional[Dict[str, Any]] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merges the config's `library_dedup` block and explicit overrides (None values ignored) over the defaults."""
+    settings = dict(DEFAULT_LIBRARY_DEDUP)
+    settings.update((config or {}).get("library_dedup") or {})
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return settings
+
+
+# --- Signatures ---
+
+def _field_text(value: Any) -> str:
+    return value if isinstance(value, str) else ", ".join(str(v) for v in value or [])
+
+
+def request_signature(package: Dict[str, Any]) -> List[int]:
+    """Signature of a request's (or package's) topic, style and use case as a word set."""
+    return minhash_signature(shingle(" ".join(_field_text(package.get(field, "")) for field in REQUEST_FIELDS), size=1))
+
+
+def signatures(package: Dict[str, Any]) -> Dict[str, List[int]]:
+    """Request and template signatures of a prompt package."""
+    return {"request": request_signature(package), "template": text_signature(package.get("template") or "")}
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    """Creates the LSH table; signature columns are added to `prompts` by initialize_database."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prompts_lsh (
+            kind TEXT NOT NULL,
+            band INTEGER NOT NULL,
+            bucket TEXT NOT NULL,
+            prompt_id INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompts_lsh ON prompts_lsh (kind, band, bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompts_lsh_prompt ON prompts_lsh (prompt_id)")
+
+
+def index_prompt(cursor: sqlite3.Cursor, prompt_id: int, package: Dict[str, Any]):
+    """Stores (or replaces) a prompt's signatures and LSH buckets."""
+    signed = signatures(package)
+    cursor.execute(
+        "UPDATE prompts SET request_signature = ?, template_signature = ? WHERE id = ?",
+        (pack_signature(signed["request"]), pack_signature(signed["template"]), prompt_id)
+    )
+    cursor.execute("DELETE FROM prompts_lsh WHERE prompt_id = ?", (prompt_id,))
+    cursor.executemany(
+        "INSERT INTO prompts_lsh (kind, band, bucket, prompt_id) VALUES (?, ?, ?, ?)",
+        [(kind, band, bucket, prompt_id) for kind in KINDS for band, bucket in lsh_buckets(signed[kind])]
+    )
+
+
+def backfill(cursor: sqlite3.Cursor):
+    """Signs prompts saved before the similarity index existed."""
+    cursor.execute("SELECT id, topic, style, use_case, template FROM prompts WHERE request_signature IS NULL")
+    rows = cursor.fetchall()
+    for row_id, topic, style, use_case, template in rows:
+        index_prompt(cursor, row_id, {"topic": topic, "style": style, "use_case": use_case, "template": template})
+    if rows:
+        logger.info(f"Indexed {len(rows)} library prompts for similarity checks.")
+
+
+# --- Queries ---
+
+def find_similar(
+    database_name: str,
+    kind: str,
+    signature: List[int],
+    threshold: float = 0.0,
+    limit: int = 3,
+    content_type: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Library prompts sharing an LSH bucket with `signature`, closest first.
+
+    Args:
+        kind: 'request' or 'template'.
+        threshold: Minimum estimated similarity to report.
+        content_type: Only compare against prompts of this content type.
+
+    Returns:
+        list: [{'id', 'topic', 'content_type', 'platform', 'similarity'}] (at most `limit`).
+    """
+    buckets = lsh_buckets(signature)
+    clause = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+    params: List[Any] = [kind] + [value for pair in buckets for value in pair]
+    type_clause = ""
+    if content_type:
+        type_clause = "AND content_type = ?"
+        params.append(content_type)
+    try:
+        with sqlite3.connect(database_name) as conn:
+            rows = conn.execute(f"""
+                SELECT id, topic, content_type, platform, {kind}_signature FROM prompts
+                WHERE id IN (SELECT prompt_id FROM prompts_lsh WHERE kind = ? AND ({clause})) {type_clause}
+            """, params).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(f"Library similarity lookup failed: {e}")
+        return []
+
+    matches = []
+    for row_id, topic, row_type, platform, blob in rows:
+        similarity = estimate_similarity(signature, unpack_signature(blob)) if blob else 0.0
+        if similarity >= threshold:
+            matches.append({"id": row_id, "topic": topic, "content_type": row_type, "platform": platform, "similarity": round(similarity, 2)})
+    matches.sort(key=lambda match: (-match["similarity"], match["id"]))
+    return matches[:limit]
+
+
+def check(
+    database_name: Optional[str],
+    kind: str,
+    package: Dict[str, Any],
+    settings: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Checks a request (kind 'request') or generated package (kind 'template') against the library.
+
+    Returns:
+        dict | None: {'matches', 'duplicate' (closest match clears the threshold),
+        'short_circuit' (duplicate and the settings say to stop)}; None when the
+        check is disabled, there is no library yet, or nothing is similar.
+    """
+    settings = settings or resolve_settings()
+    if not settings["enabled"] or not database_name or not os.path.exists(database_name):
+        return None
+    signature = request_signature(package) if kind == "request" else text_signature(package.get("template") or "")
+    threshold = settings[f"{kind}_threshold"]
+    # Report somewhat-close packages too, not only the ones that clear the threshold
+    matches = find_similar(database_name, kind, signature, threshold / 2, settings["max_matches"], package.get("content_type"))
+    if not matches:
+        return None
+    duplicate = matches[0]["similarity"] >= threshold
+    return {"matches": matches, "duplicate": duplicate, "short_circuit": duplicate and bool(settings["short_circuit"])}
+
+
+def split_duplicates(
+    database_name: Optional[str],
+    inputs: List[Dict[str, Any]],
+    settings: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+    """
+    Splits workflow inputs into those to build and those the request check
+    would short-circuit, so bulk runs don't batch-generate packages that stop
+    right away.
+
+    Returns:
+        tuple: (inputs to build, [(user_inputs, check result)] for duplicates)
+    """
+    keep, duplicates = [], []
+    for user_inputs in inputs:
+        similar = check(database_name, "request", user_inputs, settings)
+        if similar and similar["short_circuit"]:
+            duplicates.append((user_inputs, similar))
+        else:
+            keep.append(user_inputs)
+    return keep, duplicates
+
+
+def describe(matches: List[Dict[str, Any]]) -> str:
+    """One-line summary of matches: "'Topic' (#12, 91%), ..."."""
+    return ", ".join(f"'{match['topic']}' (#{match['id']}, {match['similarity']:.0%})" for match in matches)
@@ -0,0 +1,261 @@
+"""
+Submission Packaging Module.
+
+Builds submission-ready ZIPs for processed prompt JSONs:
+1. Assets are written straight from their source files into the ZIP (no staging copy)
+2. Already-compressed images use ZIP_STORED; text is deflated
+3. Each ZIP's input fingerprint is recorded so unchanged packages are skipped
+4. Whole directories are packaged across a process pool
+5. Each package gets a contact sheet of its source image and previews
+"""
+
+import os
+import json
+import time
+import hashlib
+import zipfile
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
+
+from .thumbnails import build_package_sheet, sheet_path_for
+from .previews import list_previews
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+STATE_FILENAME = ".package_state.json"
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".heic", ".zip"}
+
+
+# --- Package Contents ---
+
+def build_submission_text(data: Dict[str, Any]) -> str:
+    """Renders the PromptBase-ready submission.txt for a package."""
+    pb_data = data.get("promptbase_ready", {})
+    if not pb_data:
+        # Fallback if enhance wasn't run
+        pb_data = {
+            "title": data.get("topic"),
+            "description": data.get("description"),
+            "template": data.get("template"),
+            "example_prompts": data.get("examples")
+        }
+
+    submission_text = f"""
+================================================================
+TITLE
+================================================================
+{pb_data.get('title')}
+
+================================================================
+DESCRIPTION
+================================================================
+{pb_data.get('description')}
+
+================================================================
+PROMPT
+================================================================
+{pb_data.get('template')}
+
+================================================================
+TESTING PROMPTS
+================================================================
+"""
+    for ex in pb_data.get("example_prompts") or []:
+        submission_text += f"{ex}\n\n"
+
+    submission_text += f"""
+================================================================
+INSTRUCTIONS
+================================================================
+{data.get('instructions', 'Copy and paste the prompt...')}
+
+================================================================
+TIPS
+================================================================
+"""
+    for tip in data.get("tips", []):
+        submission_text += f"- {tip}\n"
+
+    # Add Smart Examples if available
+    qc = data.get("quick_copy_examples", [])
+    if qc:
+        submission_text += "\n================================================================\n"
+        submission_text += "VARIABLE EXAMPLES (For Buyer README)\n"
+        submission_text += "================================================================\n"
+        submission_text += json.dumps(qc, indent=2)
+
+    return submission_text
+
+
+def collect_assets(json_path: str, data: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Lists (source path, name inside the package) for every file a package includes:
+    the JSON itself, the source image (if it exists), sibling final previews
+    named `{json_stem}*_preview_{n}.png` (never drafts) and the contact sheet (if rendered).
+    """
+    json_file = Path(json_path)
+    assets = [(str(json_file), "data.json")]
+
+    source_path = data.get("source_image_path")
+    if source_path and Path(source_path).exists():
+        assets.append((source_path, f"source_image{Path(source_path).suffix}"))
+
+    for preview in list_previews(json_path):
+        assets.append((str(preview), f"previews/{preview.name}"))
+
+    sheet_path = sheet_path_for(json_path)
+    if os.path.exists(sheet_path):
+        assets.append((sheet_path, "contact_sheet.jpg"))
+    return assets
+
+
+def input_fingerprint(assets: List[Tuple[str, str]]) -> str:
+    """Hash of every input's path, size and mtime; changes whenever any input does."""
+    digest = hashlib.sha256()
+    for source, arcname in assets:
+        stat = os.stat(source)
+        digest.update(f"{arcname}\0{os.path.abspath(source)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _compression_for(path: str) -> int:
+    return zipfile.ZIP_STORED if Path(path).suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+# --- Packaging ---
+
+def package_file(json_path: str, out_root: str, name_suffix: str = "") -> Dict[str, Any]:
+    """
+    Writes `{topic}_{timestamp}{name_suffix}.zip` for one processed JSON directly from its sources.
+
+    Returns:
+        dict: {'json_path', 'zip_path', 'topic', 'source_image', 'previews', 'contact_sheet', 'fingerprint'}
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    topic = data.get("topic", "Unknown").replace(" ", "_")
+    project_name = f"{topic}_{int(time.time())}{name_suffix}"
+    build_package_sheet(json_path, data.get("source_image_path"))
+    assets = collect_assets(json_path, data)
+
+    os.makedirs(out_root, exist_ok=True)
+    zip_path = os.path.join(out_root, f"{project_name}.zip")
+    tmp_path = f"{zip_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, strict_timestamps=False) as zf:
+        for source, arcname in assets:
+            zf.write(source, f"{project_name}/{arcname}", compress_type=_compression_for(source))
+        zf.writestr(f"{project_name}/submission.txt", build_submission_text(data))
+    os.replace(tmp_path, zip_path)
+
+    return {
+        "json_path": json_path,
+        "zip_path": zip_path,
+        "topic": topic,
+        "source_image": any(arcname.startswith("source_image") for _, arcname in assets),
+        "previews": sum(arcname.startswith("previews/") for _, arcname in assets),
+        "contact_sheet": any(arcname == "contact_sheet.jpg" for _, arcname in assets),
+        "fingerprint": input_fingerprint(assets)
+    }
+
+
+def _load_state(out_root: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(out_root, STATE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(out_root: str, state: Dict[str, Any]):
+    os.makedirs(out_root, exist_ok=True)
+    path = os.path.join(out_root, STATE_FILENAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def _is_unchanged(json_path: str, known: Optional[Dict[str, Any]]) -> bool:
+    if not known or not os.path.exists(known.get("zip_path", "")):
+        return False
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return input_fingerprint(collect_assets(json_path, data)) == known["fingerprint"]
+    except (OSError, json.JSONDecodeError):
+        return False
+
+
+def name_suffix(json_path: str) -> str:
+    """Keeps ZIP names unique when packages sharing a topic are built in the same second."""
+    return "_" + hashlib.sha256(os.path.abspath(json_path).encode("utf-8")).hexdigest()[:6]
+
+
+def package_directory(
+    directory: str,
+    out_root: str,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Packages every processed JSON in `directory` across a process pool.
+
+    Packages whose inputs (JSON, source image, previews) are unchanged since
+    their last ZIP are skipped unless `force` is set; a rebuilt package
+    replaces its previous ZIP.
+
+    Returns:
+        dict: {'packaged': [results], 'skipped': [json paths], 'failed': {json path: error}}
+    """
+    state = _load_state(out_root)
+    json_paths = sorted(str(p) for p in Path(directory).glob("*.json"))
+    todo = []
+    skipped = []
+    for json_path in json_paths:
+        key = os.path.abspath(json_path)
+        if not force and _is_unchanged(json_path, state.get(key)):
+            skipped.append(json_path)
+        else:
+            todo.append(json_path)
+
+    packaged, failed = [], {}
+
+    def record(result: Dict[str, Any]):
+        key = os.path.abspath(result["json_path"])
+        previous = state.get(key, {}).get("zip_path")
+        if previous and previous != result["zip_path"] and os.path.exists(previous):
+            os.remove(previous)
+        state[key] = {"fingerprint": result["fingerprint"], "zip_path": result["zip_path"]}
+        packaged.append(result)
+
+    workers = workers or os.cpu_count() or 1
+    remaining = list(todo)
+    if workers > 1 and len(todo) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as executor:
+                futures = {executor.submit(package_file, path, out_root, name_suffix(path)): path for path in todo}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        record(future.result())
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        failed[path] = str(e)
+                    remaining.remove(path)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Parallel packaging unavailable ({e}); continuing sequentially.")
+
+    for path in remaining:
+        try:
+            record(package_file(path, out_root, name_suffix(path)))
+        except Exception as e:
+            failed[path] = str(e)
+
+    _save_state(out_root, state)
+    return {"packaged": packaged, "skipped": skipped, "failed": failed}
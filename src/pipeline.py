@@ -0,0 +1,232 @@
+"""
+Streaming Pipeline Module.
+
+Runs items through a chain of stages concurrently instead of one pass per stage:
+1. Stages - each stage has its own worker threads, so API-bound stages
+   (Gemini, Hugging Face) and CPU-bound stages (zipping) get separate limits
+2. Backpressure - stages are connected by bounded queues; a slow stage makes
+   the stages before it wait instead of piling up work in memory
+3. Metrics - per stage: processed/skipped/failed counts, busy time, time spent
+   blocked on the next stage, queue high-water mark and throughput
+4. Resume - each item's completed stages and their outputs are recorded in a
+   state file; a re-run skips finished stages and retries failed items
+
+A stage function takes the item (a dict with an 'id') and returns a dict of
+JSON-serializable outputs, which are merged into the item and recorded.
+"""
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_QUEUE_SIZE = 8
+STATE_FILENAME = ".pipeline_state.json"
+_DONE = object()
+
+StageFunc = Callable[[Dict[str, Any]], Dict[str, Any]]
+EventHook = Callable[[str, Dict[str, Any], str, str], None]
+
+
+class Stage:
+    """One pipeline step: a function, its worker count and its input queue size."""
+
+    def __init__(self, name: str, func: StageFunc, workers: int = 1, queue_size: Optional[int] = None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.metrics: Dict[str, float] = {
+            "processed": 0, "skipped": 0, "failed": 0,
+            "busy_seconds": 0.0, "blocked_seconds": 0.0, "max_queue": 0
+        }
+        self.first_start: Optional[float] = None
+        self.last_finish: Optional[float] = None
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.last_finish - self.first_start) if self.first_start and self.last_finish else 0.0
+        return dict(
+            self.metrics,
+            busy_seconds=round(self.metrics["busy_seconds"], 2),
+            blocked_seconds=round(self.metrics["blocked_seconds"], 2),
+            workers=self.workers,
+            elapsed_seconds=round(elapsed, 2),
+            items_per_minute=round(self.metrics["processed"] * 60 / elapsed, 2) if elapsed else None
+        )
+
+
+# --- Resume State ---
+
+class PipelineState:
+    """Per-item stage outputs persisted to a JSON file after every stage."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.items: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.items = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable pipeline state {path}: {e}")
+
+    def completed(self, item_id: str, stage: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.items.get(item_id, {}).get("stages", {}).get(stage)
+
+    def record(self, item_id: str, stage: str, outputs: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._lock:
+            entry = self.items.setdefault(item_id, {"stages": {}})
+            if error is None:
+                entry["stages"][stage] = outputs or {}
+                entry.pop("error", None)
+            else:
+                entry["error"] = {"stage": stage, "message": error}
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.items, f, indent=2, ensure_ascii=False)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def state_path_for(out_dir: str) -> str:
+    return os.path.join(out_dir, STATE_FILENAME)
+
+
+# --- Pipeline ---
+
+class Pipeline:
+    """
+    Streams items through stages connected by bounded queues.
+
+    Items that fail a stage are recorded and dropped from the rest of the run;
+    the next run retries them from the failed stage.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        state: Optional[PipelineState] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        on_event: Optional[EventHook] = None
+    ):
+        self.stages = stages
+        self.state = state or PipelineState()
+        self.on_event = on_event
+        self._queues = [queue.Queue(maxsize=stage.queue_size or queue_size) for stage in stages]
+        self._alive = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        self.completed: List[Dict[str, Any]] = []
+        self.failed: Dict[str, Dict[str, str]] = {}
+
+    def _event(self, stage: Stage, item: Dict[str, Any], status: str, detail: str = ""):
+        if self.on_event:
+            self.on_event(stage.name, item, status, detail)
+
+    def _put(self, index: int, item: Any) -> float:
+        """Hands an item to stage `index` (or the finished list), returning seconds spent blocked."""
+        if index >= len(self.stages):
+            if item is not _DONE:
+                with self._lock:
+                    self.completed.append(item)
+            return 0.0
+        started = time.monotonic()
+        self._queues[index].put(item)
+        return time.monotonic() - started
+
+    def _process(self, index: int, item: Dict[str, Any]) -> bool:
+        stage = self.stages[index]
+        done = self.state.completed(item["id"], stage.name)
+        if done is not None:
+            item.update(done)
+            with self._lock:
+                stage.metrics["skipped"] += 1
+            self._event(stage, item, "skipped")
+            return True
+
+        started = time.monotonic()
+        try:
+            outputs = stage.func(item) or {}
+        except Exception as e:
+            logger.error(f"Pipeline stage '{stage.name}' failed for {item['id']}: {e}", exc_info=True)
+            with self._lock:
+                stage.metrics["failed"] += 1
+                stage.metrics["busy_seconds"] += time.monotonic() - started
+                self.failed[item["id"]] = {"stage": stage.name, "error": str(e)}
+            self.state.record(item["id"], stage.name, error=str(e))
+            self._event(stage, item, "failed", str(e))
+            return False
+
+        item.update(outputs)
+        self.state.record(item["id"], stage.name, outputs)
+        with self._lock:
+            stage.metrics["processed"] += 1
+            stage.metrics["busy_seconds"] += time.monotonic() - started
+        self._event(stage, item, "done")
+        return True
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        source = self._queues[index]
+        while True:
+            item = source.get()
+            if item is _DONE:
+                with self._lock:
+                    self._alive[index] -= 1
+                    last = self._alive[index] == 0
+                if last:
+                    stage.last_finish = time.monotonic()
+                    following = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                    for _ in range(following):
+                        self._put(index + 1, _DONE)
+                return
+            with self._lock:
+                stage.first_start = stage.first_start or time.monotonic()
+                stage.metrics["max_queue"] = max(stage.metrics["max_queue"], source.qsize() + 1)
+            if self._process(index, item):
+                blocked = self._put(index + 1, item)
+                with self._lock:
+                    stage.metrics["blocked_seconds"] += blocked
+
+    def run(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Streams `items` through every stage and waits for them to finish.
+
+        Returns:
+            dict: {'completed': [items], 'failed': {id: {'stage', 'error'}},
+            'stages': {name: metrics}, 'elapsed_seconds'}
+        """
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=self._worker, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        for item in items:
+            self._put(0, item)
+        for _ in range(self.stages[0].workers if self.stages else 0):
+            self._put(0, _DONE)
+        for thread in threads:
+            thread.join()
+
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "stages": {stage.name: stage.summary() for stage in self.stages},
+            "elapsed_seconds": round(time.monotonic() - started, 2)
+        }
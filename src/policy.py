@@ -0,0 +1,282 @@
+"""
+Request Policy Module.
+
+Bounds the tail latency of model calls:
+1. Deadlines - every call gets an overall deadline covering hedges and retries
+2. Hedging - once a call outlives the observed p95 latency for its profile and
+   model, a duplicate request is fired (optionally to a fallback model) and the
+   first valid answer wins
+3. Retries - transient errors (429/5xx/timeouts) are retried a bounded number of
+   times with full-jitter exponential backoff
+4. Counters - calls, hedges, hedge wins, retries and deadline misses per process
+5. Meters - a `RequestMeter` activated with `metered()` counts only the calls
+   made in its own context (e.g. one fan-out), not those of other sessions
+
+Settings come from the `request_policy` block of config.yaml; a generation
+profile can override them with its own `policy` mapping. Losing hedges cannot
+be cancelled mid-request; their results are discarded.
+"""
+
+import time
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, Optional, Deque, Iterator, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "deadline": 300,              # seconds for the whole call, hedges and retries included (None = no deadline)
+    "max_retries": 2,
+    "backoff_base": 1.0,
+    "backoff_max": 20.0,
+    "hedge": True,
+    "hedge_percentile": 0.95,
+    "hedge_min_samples": 20,      # latencies observed before hedging starts
+    "hedge_fallback_model": None  # model for the hedge request (None = same model)
+}
+LATENCY_WINDOW = 200
+MAX_WORKERS = 16
+
+TRANSIENT_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    ConnectionError,
+    TimeoutError
+)
+
+ModelCall = Callable[[Any], Dict[str, Any]]
+
+
+def resolve_policy(config: Optional[Dict[str, Any]] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merges the config's `request_policy` block and a profile's `policy` overrides over the defaults."""
+    settings = dict(DEFAULT_POLICY)
+    settings.update((config or {}).get("request_policy") or {})
+    settings.update(overrides or {})
+    return settings
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for errors worth retrying (rate limits, 5xx, timeouts, dropped connections)."""
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+# --- Policy ---
+
+class RequestPolicy:
+    """
+    Runs model calls under a deadline with hedging and jittered retries.
+
+    A call is any function taking a model and returning {'text': ...} or
+    {'error': ..., 'transient': bool}; the 'transient' flag is consumed here.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-request")
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def record_latency(self, key: str, seconds: float):
+        with self._lock:
+            self._latencies[key].append(seconds)
+
+    def latency_percentile(self, key: str, percentile: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(percentile * len(samples)))]
+
+    def hedge_delay(self, key: str, settings: Dict[str, Any]) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or there is too little history."""
+        if not settings.get("hedge"):
+            return None
+        with self._lock:
+            observed = len(self._latencies.get(key, ()))
+        if observed < settings["hedge_min_samples"]:
+            return None
+        return self.latency_percentile(key, settings["hedge_percentile"])
+
+    def _timed(self, call: ModelCall, model: Any, key: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        result = call(model)
+        if "error" not in result:
+            self.record_latency(key, time.monotonic() - started)
+        return result
+
+    def _hedged(
+        self,
+        call: ModelCall,
+        model: Any,
+        key: str,
+        settings: Dict[str, Any],
+        deadline: Optional[float],
+        fallback_model: Any = None
+    ) -> Dict[str, Any]:
+        """One attempt: the primary request, plus a hedge if it outlives the p95 latency."""
+        started = time.monotonic()
+        primary = self._executor.submit(self._timed, call, model, key)
+        roles = {primary: "primary"}
+        pending = {primary}
+        delay = self.hedge_delay(key, settings)
+        result: Dict[str, Any] = {}
+
+        while pending:
+            now = time.monotonic()
+            timeout = None if deadline is None else max(0.0, deadline - now)
+            hedge_at = None if delay is None or "hedge" in roles.values() else started + delay
+            if hedge_at is not None:
+                timeout = max(0.0, hedge_at - now) if timeout is None else min(timeout, max(0.0, hedge_at - now))
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if "error" not in result:
+                    if roles[future] == "hedge":
+                        self._count("hedge_wins")
+                    return result
+
+            if not done:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._count("deadline_exceeded")
+                    return {"error": f"Request deadline of {settings['deadline']}s exceeded.", "transient": False}
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    self._count("hedges")
+                    logger.info(f"Hedging request for '{key}' after {delay:.1f}s (p{int(settings['hedge_percentile'] * 100)}).")
+                    hedge = self._executor.submit(self._timed, call, fallback_model or model, key)
+                    roles[hedge] = "hedge"
+                    pending.add(hedge)
+        return result
+
+    def execute(
+        self,
+        call: ModelCall,
+        model: Any,
+        key: str,
+        settings: Optional[Dict[str, Any]] = None,
+        fallback_model: Any = None
+    ) -> Dict[str, Any]:
+        """
+        Runs `call(model)` under the policy.
+
+        Args:
+            call: Function issuing one request against the given model.
+            model: Primary model.
+            key: Latency-history key (typically profile and model name).
+            settings: Resolved policy settings (see resolve_policy).
+            fallback_model: Model for hedge requests (defaults to `model`).
+
+        Returns:
+            dict: The first valid result, or the last error.
+        """
+        settings = settings or resolve_policy()
+        deadline = time.monotonic() + settings["deadline"] if settings.get("deadline") else None
+        self._count("calls")
+        for meter in _active_meters.get():
+            meter.add()
+
+        attempt = 0
+        while True:
+            result = self._hedged(call, model, key, settings, deadline, fallback_model)
+            transient = result.pop("transient", False)
+            if "error" not in result or not transient or attempt >= settings["max_retries"]:
+                if "error" in result:
+                    self._count("errors")
+                return result
+
+            backoff = random.uniform(0, min(settings["backoff_max"], settings["backoff_base"] * 2 ** attempt))
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                self._count("errors")
+                return result
+            attempt += 1
+            self._count("retries")
+            logger.warning(f"Transient error for '{key}' ({result['error']}); retry {attempt} in {backoff:.1f}s.")
+            time.sleep(backoff)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus p50/p95 latency per key."""
+        with self._lock:
+            counters = dict(self._counters)
+            keys = list(self._latencies)
+        return {
+            "counters": counters,
+            "latency": {
+                key: {
+                    "samples": len(self._latencies[key]),
+                    "p50": self.latency_percentile(key, 0.5),
+                    "p95": self.latency_percentile(key, 0.95)
+                }
+                for key in keys
+            }
+        }
+
+
+# --- Request Meters ---
+
+class RequestMeter:
+    """Thread-safe count of the model calls made while the meter is active."""
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return self._count
+
+
+_active_meters: contextvars.ContextVar[Tuple[RequestMeter, ...]] = contextvars.ContextVar("request_meters", default=())
+
+
+@contextmanager
+def metered(meter: RequestMeter) -> Iterator[RequestMeter]:
+    """
+    Counts the calls made in the current context on `meter` (nested meters all count).
+    Work handed to other threads is only counted when submitted with
+    `contextvars.copy_context().run`.
+    """
+    token = _active_meters.set(_active_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _active_meters.reset(token)
+
+
+_policy: Optional[RequestPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> RequestPolicy:
+    """The process-wide request policy (shared latency history and counters)."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = RequestPolicy()
+        return _policy
+
+
+def policy_stats() -> Dict[str, Any]:
+    """Snapshot of the process-wide policy's counters and latencies."""
+    return get_policy().snapshot()
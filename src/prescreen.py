@@ -0,0 +1,290 @@
+"""
+Local Compliance Pre-Screen Module.
+
+Scores a prompt package with the cheap local validators before the LLM
+compliance evaluator is called:
+1. Title signals - `validate_prompt_title`, `validate_title_pattern`
+2. Template signals - variable count/consistency, length, clause structure
+3. Example signals - example count, `check_abstract_examples`
+4. Listing signals - description, use case, style, tips
+
+The rubric mirrors the weights of `agent_quality_evaluation` (0-100) and is
+mapped onto the LLM's scale by a linear calibration fitted from the decision
+log. Packages that clearly pass or clearly fail skip the evaluator; only
+borderline ones (plus a small audit sample) are sent to the LLM.
+"""
+
+import os
+import re
+import json
+import random
+import logging
+from typing import Dict, Any, List, Optional
+
+from .api_handler import validate_prompt_title
+from .quality_enhancers import (
+    validate_title_pattern,
+    validate_examples,
+    check_abstract_examples,
+    MIN_EXAMPLES,
+    MIN_ABSTRACT_EXAMPLES
+)
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "prescreen_decisions.jsonl")
+
+DEFAULT_SETTINGS = {
+    "enabled": True,
+    "pass_score": 85,
+    "fail_score": 25,
+    "audit_rate": 0.05,
+    "calibration": {"slope": 1.0, "intercept": 0.0},
+    "log_path": DEFAULT_LOG_PATH
+}
+
+MIN_VARIABLES = 4
+TEMPLATE_WORDS_RANGE = (30, 150)
+MIN_TEMPLATE_CLAUSES = 5
+GOOD_DESCRIPTION_CHARS = 200
+
+
+def resolve_settings(prompts_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges the optional `prescreen` block of the config over the defaults."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(prompts_config.get("prescreen") or {})
+    if not os.path.isabs(settings["log_path"]):
+        settings["log_path"] = os.path.join(os.path.dirname(os.path.dirname(__file__)), settings["log_path"])
+    return settings
+
+
+# --- Features & Scoring ---
+
+def extract_features(package: Dict[str, Any]) -> Dict[str, Any]:
+    """Collects the local quality signals for a prompt package."""
+    title = package.get("topic", "") or ""
+    template = package.get("template", "") or ""
+    template_vars = set(re.findall(r'\[(.*?)\]', template))
+    declared_vars = set(package.get("variables") or [])
+
+    return {
+        "title_score": validate_prompt_title(title)["score"],
+        "title_pattern_issues": len(validate_title_pattern(title)["issues"]),
+        "variable_count": len(template_vars),
+        "variables_consistent": bool(template_vars) and template_vars == declared_vars,
+        "template_words": len(template.split()),
+        "template_clauses": template.count(",") + 1 if template else 0,
+        "example_count": validate_examples(package)["current_count"],
+        "abstract_count": check_abstract_examples(package)["abstract_count"],
+        "description_chars": len(package.get("description", "") or ""),
+        "has_use_case": bool(package.get("use_case")),
+        "has_style": bool(package.get("style")),
+        "has_tips": bool(package.get("tips"))
+    }
+
+
+def rubric_score(features: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Scores features on the same five criteria as `agent_quality_evaluation`.
+
+    Returns:
+        dict: {'scores': per-criterion points, 'total': 0-100, 'reasons': list of issues}
+    """
+    reasons = []
+
+    title = 10 * features["title_score"] + 10 * (4 - features["title_pattern_issues"]) / 4
+    if features["title_pattern_issues"]:
+        reasons.append("Title does not follow the [Descriptor] + [Subject] + [Type] pattern")
+
+    low, high = TEMPLATE_WORDS_RANGE
+    words = features["template_words"]
+    length_fit = 1.0 if low <= words <= high else (words / low if words < low else high / words)
+    template = (
+        10 * min(features["variable_count"] / MIN_VARIABLES, 1.0)
+        + 5 * features["variables_consistent"]
+        + 10 * length_fit
+        + 5 * min(features["template_clauses"] / MIN_TEMPLATE_CLAUSES, 1.0)
+    )
+    if features["variable_count"] < MIN_VARIABLES:
+        reasons.append(f"Template has only {features['variable_count']} variables (minimum {MIN_VARIABLES})")
+    if not features["variables_consistent"]:
+        reasons.append("Declared variables do not match the [VARIABLES] in the template")
+    if length_fit < 1.0:
+        reasons.append(f"Template length ({words} words) is outside {low}-{high} words")
+
+    examples = (
+        12 * min(features["example_count"] / MIN_EXAMPLES, 1.0)
+        + 8 * min(features["abstract_count"] / MIN_ABSTRACT_EXAMPLES, 1.0)
+    )
+    if features["example_count"] < MIN_EXAMPLES:
+        reasons.append(f"Only {features['example_count']} examples (need {MIN_EXAMPLES})")
+    if features["abstract_count"] < MIN_ABSTRACT_EXAMPLES:
+        reasons.append("Add abstract/mood-based examples")
+
+    commercial = 5 * features["has_use_case"] + 5 * features["has_style"] + 5 * features["has_tips"]
+    description = 15 * min(features["description_chars"] / GOOD_DESCRIPTION_CHARS, 1.0)
+    if features["description_chars"] < GOOD_DESCRIPTION_CHARS:
+        reasons.append("Description is missing or too short")
+
+    scores = {
+        "title_quality": round(title, 1),
+        "template_structure": round(template, 1),
+        "variable_examples": round(examples, 1),
+        "commercial_viability": round(commercial, 1),
+        "description_quality": round(description, 1)
+    }
+    return {"scores": scores, "total": round(sum(scores.values()), 1), "reasons": reasons}
+
+
+def prescreen_package(
+    package: Dict[str, Any],
+    settings: Optional[Dict[str, Any]] = None,
+    rng: Optional[random.Random] = None
+) -> Dict[str, Any]:
+    """
+    Decides whether a package needs the LLM compliance evaluator.
+
+    Returns:
+        dict: {
+            'decision': 'pass' | 'fail' | 'borderline',
+            'score': calibrated 0-100 score,
+            'raw_score': uncalibrated rubric total,
+            'send_to_llm': bool (borderline, or sampled for calibration),
+            'scores', 'reasons', 'features'
+        }
+    """
+    settings = settings or DEFAULT_SETTINGS
+    features = extract_features(package)
+    rubric = rubric_score(features)
+
+    calibration = settings.get("calibration") or {}
+    score = calibration.get("slope", 1.0) * rubric["total"] + calibration.get("intercept", 0.0)
+    score = round(max(0.0, min(100.0, score)), 1)
+
+    if score >= settings["pass_score"]:
+        decision = "pass"
+    elif score <= settings["fail_score"]:
+        decision = "fail"
+    else:
+        decision = "borderline"
+
+    audited = decision != "borderline" and (rng or random).random() < settings.get("audit_rate", 0.0)
+
+    return {
+        "decision": decision,
+        "score": score,
+        "raw_score": rubric["total"],
+        "send_to_llm": decision == "borderline" or audited,
+        "audited": audited,
+        "scores": rubric["scores"],
+        "reasons": rubric["reasons"],
+        "features": features
+    }
+
+
+def local_evaluation(screen: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds an evaluation dict shaped like `agent_evaluate_compliance` output."""
+    return {
+        "scores": screen["scores"],
+        "total_score": screen["score"],
+        "feedback": {"summary": f"Local pre-screen decision: {screen['decision']} (LLM evaluation skipped)."},
+        "priority_improvements": screen["reasons"],
+        "source": "local_prescreen"
+    }
+
+
+# --- Decision Log & Calibration ---
+
+def log_decision(
+    screen: Dict[str, Any],
+    package: Dict[str, Any],
+    llm_evaluation: Optional[Dict[str, Any]] = None,
+    log_path: str = DEFAULT_LOG_PATH
+):
+    """Appends a pre-screen decision (and the LLM score, if one was obtained) to the JSONL log."""
+    record = {
+        "topic": package.get("topic", ""),
+        "decision": screen["decision"],
+        "audited": screen["audited"],
+        "score": screen["score"],
+        "raw_score": screen["raw_score"],
+        "features": screen["features"],
+        "llm_score": (llm_evaluation or {}).get("total_score")
+    }
+    try:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write pre-screen log: {e}")
+
+
+def load_decisions(log_path: str = DEFAULT_LOG_PATH) -> List[Dict[str, Any]]:
+    """Reads logged decisions, skipping malformed lines."""
+    records = []
+    if not os.path.exists(log_path):
+        return records
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def fit_calibration(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Least-squares fit of LLM score against raw rubric score.
+
+    Returns:
+        dict: {'slope', 'intercept', 'samples', 'mae'}; identity mapping if
+        fewer than two LLM-scored records are available.
+    """
+    pairs = [
+        (float(r["raw_score"]), float(r["llm_score"]))
+        for r in records
+        if isinstance(r.get("llm_score"), (int, float))
+    ]
+    if len(pairs) < 2:
+        return {"slope": 1.0, "intercept": 0.0, "samples": len(pairs), "mae": None}
+
+    n = len(pairs)
+    mean_x = sum(x for x, _ in pairs) / n
+    mean_y = sum(y for _, y in pairs) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in pairs) / var_x if var_x else 1.0
+    intercept = mean_y - slope * mean_x
+    mae = sum(abs(slope * x + intercept - y) for x, y in pairs) / n
+
+    return {"slope": round(slope, 4), "intercept": round(intercept, 4), "samples": n, "mae": round(mae, 2)}
+
+
+def evaluate_thresholds(
+    records: List[Dict[str, Any]],
+    calibration: Dict[str, Any],
+    pass_score: float,
+    fail_score: float,
+    compliance_threshold: float
+) -> Dict[str, Any]:
+    """
+    Replays LLM-scored records against candidate thresholds.
+
+    A 'false pass' is a package the pre-screen would pass whose LLM score is
+    below `compliance_threshold`; a 'false fail' is the reverse.
+    """
+    stats = {"samples": 0, "skipped_llm": 0, "false_pass": 0, "false_fail": 0}
+    for r in records:
+        if not isinstance(r.get("llm_score"), (int, float)):
+            continue
+        stats["samples"] += 1
+        score = calibration.get("slope", 1.0) * r["raw_score"] + calibration.get("intercept", 0.0)
+        if score >= pass_score:
+            stats["skipped_llm"] += 1
+            stats["false_pass"] += r["llm_score"] < compliance_threshold
+        elif score <= fail_score:
+            stats["skipped_llm"] += 1
+            stats["false_fail"] += r["llm_score"] >= compliance_threshold
+    return stats
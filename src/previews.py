@@ -0,0 +1,68 @@
+"""
+Preview Tier & Naming Module.
+
+Previews come in two tiers:
+1. draft - reduced resolution and inference steps, for quick sanity checks
+2. final - full-resolution renders for submission
+
+The tier is part of the filename, and only final previews are listed for
+packaging and contact sheets, so drafts never end up in a ZIP.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# --- Constants ---
+
+DEFAULT_TIER = "final"
+
+# Text-to-image parameters per tier; steps are per model (None / missing = model default)
+PREVIEW_TIERS: Dict[str, Dict[str, Any]] = {
+    "draft": {
+        "width": 512,
+        "height": 512,
+        "steps": {"black-forest-labs/FLUX.1-schnell": 2, "stabilityai/stable-diffusion-xl-base-1.0": 12}
+    },
+    "final": {
+        "width": None,
+        "height": None,
+        "steps": {}
+    }
+}
+
+
+def tier_parameters(tier: str, model: str) -> Dict[str, Any]:
+    """Returns the non-default `text_to_image` parameters for a tier and model."""
+    if tier not in PREVIEW_TIERS:
+        raise ValueError(f"Unknown preview tier '{tier}'. Choose from: {', '.join(PREVIEW_TIERS)}")
+    settings = PREVIEW_TIERS[tier]
+    params = {
+        "width": settings["width"],
+        "height": settings["height"],
+        "num_inference_steps": settings["steps"].get(model)
+    }
+    return {k: v for k, v in params.items() if v}
+
+
+def preview_filename(base_name: str, index: int, tier: str = DEFAULT_TIER) -> str:
+    """`{base}_preview_{n}.png` for final previews, `{base}_preview_draft_{n}.png` for drafts."""
+    if tier == DEFAULT_TIER:
+        return f"{base_name}_preview_{index}.png"
+    return f"{base_name}_preview_{tier}_{index}.png"
+
+
+def list_previews(json_path: str, tier: Optional[str] = DEFAULT_TIER) -> List[Path]:
+    """
+    Lists a package's sibling previews of one tier (None for every tier), sorted by name.
+    Matches the historical `{json_stem}*_preview_{n}.png` convention for final previews.
+    """
+    json_file = Path(json_path)
+    if tier is None:
+        suffix = r"_preview_(?:[a-z]+_)?\d+\.png"
+    elif tier == DEFAULT_TIER:
+        suffix = r"_preview_\d+\.png"
+    else:
+        suffix = rf"_preview_{re.escape(tier)}_\d+\.png"
+    pattern = re.compile(re.escape(json_file.stem) + r".*?" + suffix + "$")
+    return sorted(p for p in json_file.parent.glob(f"{json_file.stem}*_preview_*.png") if pattern.match(p.name))
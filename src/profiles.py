@@ -0,0 +1,137 @@
+"""
+Generation Profile Module.
+
+Named generation profiles let each agent run with limits that fit its output:
+1. Profiles - model, temperature, max output tokens, timeout and stop sequences,
+   defined under `generation_profiles` in config.yaml (unset fields inherit `default`)
+2. Routing - `agent_profiles` maps agent names to profiles, so cheap agents
+   (labels, titles, short JSON) can run on a Flash-Lite model
+3. Requests - resolved profiles become `generate_content` keyword arguments,
+   and carry the request policy (deadline, hedging, retries) for the call
+
+Agents that receive the merged config resolve against it; the others fall
+back to the project's config.yaml.
+"""
+
+import os
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+
+import yaml
+import google.generativeai as genai
+
+from .structured import JSON_MIME_TYPE
+from .policy import resolve_policy
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yaml")
+DEFAULT_PROFILE_NAME = "default"
+
+# Built-in defaults (the historical global generation settings)
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "model": None,
+    "temperature": 0.7,
+    "max_output_tokens": 8192,
+    "top_p": 0.95,
+    "top_k": 40,
+    "timeout": None,             # per-request timeout; the overall deadline is the request policy's
+    "stop_sequences": [],
+    "policy": None               # overrides for the `request_policy` block
+}
+GENERATION_KEYS = ("temperature", "max_output_tokens", "top_p", "top_k", "stop_sequences")
+
+_config_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_config_lock = threading.Lock()
+
+
+# --- Configuration ---
+
+def load_profile_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Reads the profile blocks from config.yaml, cached until the file changes."""
+    path = path or CONFIG_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _config_lock:
+        cached = _config_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"Could not read generation profiles from {path}: {e}")
+        return {}
+    profile_config = {key: data.get(key) or {} for key in ("generation_profiles", "agent_profiles", "request_policy")}
+    with _config_lock:
+        _config_cache[path] = (mtime, profile_config)
+    return profile_config
+
+
+def resolve_profile(agent: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Resolves the generation profile for an agent.
+
+    Args:
+        agent: Agent name without the `agent_` prefix (e.g. "categorize_prompt", "fix_title").
+        config: Merged config; when it has no `generation_profiles`, config.yaml is used.
+
+    Returns:
+        dict: DEFAULT_PROFILE keys plus 'name' (the profile the agent resolved to)
+            and 'policy' (its resolved request policy settings).
+    """
+    if not config or "generation_profiles" not in config:
+        config = load_profile_config()
+    profiles = config.get("generation_profiles") or {}
+    name = (config.get("agent_profiles") or {}).get(agent, DEFAULT_PROFILE_NAME)
+
+    profile = dict(DEFAULT_PROFILE)
+    profile.update(profiles.get(DEFAULT_PROFILE_NAME) or {})
+    if name != DEFAULT_PROFILE_NAME:
+        if name not in profiles:
+            logger.warning(f"Agent '{agent}' references unknown generation profile '{name}'; using default.")
+        profile.update(profiles.get(name) or {})
+    profile["name"] = name
+    profile["policy"] = resolve_policy(config, profile.get("policy"))
+    return profile
+
+
+# --- Requests ---
+
+def generation_options(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The GenerationConfig fields a profile sets."""
+    return {key: profile[key] for key in GENERATION_KEYS if profile.get(key) not in (None, [])}
+
+
+def request_kwargs(profile: Dict[str, Any], json_mode: bool = False) -> Dict[str, Any]:
+    """`generate_content` keyword arguments (generation_config, request_options) for a profile."""
+    options = generation_options(profile)
+    if json_mode:
+        options["response_mime_type"] = JSON_MIME_TYPE
+        options.pop("stop_sequences", None)
+    kwargs: Dict[str, Any] = {"generation_config": options}
+    if profile.get("timeout"):
+        kwargs["request_options"] = {"timeout": profile["timeout"]}
+    return kwargs
+
+
+@lru_cache(maxsize=None)
+def _model_named(model_name: str) -> genai.GenerativeModel:
+    return genai.GenerativeModel(model_name)
+
+
+def model_for(model: genai.GenerativeModel, profile: Dict[str, Any]) -> genai.GenerativeModel:
+    """The profile's model if it routes elsewhere, otherwise the caller's model."""
+    name = profile.get("model")
+    if not name:
+        return model
+    current = getattr(model, "model_name", None)
+    if isinstance(current, str) and current.split("/")[-1] == name.split("/")[-1]:
+        return model
+    return _model_named(name)
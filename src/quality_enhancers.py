@@ -5,6 +5,7 @@ This module implements counter-strategies identified from pattern analysis:
 1. Title Fixer - Enforces [Descriptor] + [Subject] + [Type] pattern
 2. Example Validator - Ensures 9-10 examples per package
 3. Abstract Example Injector - Adds 2+ abstract/mood-based examples
+4. Keyword Matcher - Compiled single-pass vocabulary matching shared by the validators
 
 Following @lint-agent guidelines:
 - Type hints for all function signatures
@@ -16,9 +17,9 @@ Following @lint-agent guidelines:
 import re
 import json
 import logging
-from typing import Dict, Any, List, Optional, Tuple
-
-import google.generativeai as genai
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Iterable
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,81 @@ MAX_TITLE_WORDS = 6
 MIN_EXAMPLES = 8
 RECOMMENDED_EXAMPLES = 9
 MIN_ABSTRACT_EXAMPLES = 2
+BATCH_SIZE = 10
+MAX_WORKERS = 4
+# Every enhancer request expects a JSON object back; ask for raw JSON instead of prose/fences
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+# google.generativeai is imported on the first LLM call, so the local
+# validators (used by `audit`) don't pay for the SDK import
+genai = None
+
+
+def _load_genai():
+    """Returns the google.generativeai module, importing it on first use."""
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+
+# --- Keyword Matching ---
+
+class KeywordMatcher:
+    """
+    Multi-keyword matcher compiled into a single alternation regex.
+    
+    Keywords must start and end on a word boundary. With `prefix=True` a plural
+    suffix ("s"/"es") is allowed before the closing boundary, so "illustration"
+    also matches "illustrations" but "art" does not match "Artisan".
+    Longer keywords are tried first, so "sense of" wins over "sense".
+    """
+    
+    def __init__(self, keywords: Iterable[str], prefix: bool = False):
+        self.keywords = sorted({k.lower() for k in keywords if k}, key=lambda k: (-len(k), k))
+        alternation = "|".join(re.escape(k) for k in self.keywords)
+        suffix = r"(?:s|es)?\b" if prefix else r"\b"
+        self.pattern = re.compile(rf"\b(?:{alternation}){suffix}", re.IGNORECASE) if self.keywords else None
+        self._prefix = prefix
+    
+    def find_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Returns every non-overlapping hit in one pass.
+        
+        Returns:
+            list: (keyword, start, end) tuples in text order; `keyword` is the
+            vocabulary entry, `start`/`end` span the matched text.
+        """
+        if not self.pattern or not text:
+            return []
+        hits = []
+        for match in self.pattern.finditer(text):
+            matched = match.group().lower()
+            keyword = self._keyword_for(matched)
+            hits.append((keyword, match.start(), match.end()))
+        return hits
+    
+    def search(self, text: str) -> bool:
+        """True if any keyword occurs in `text`."""
+        return bool(self.pattern and text and self.pattern.search(text))
+    
+    def _keyword_for(self, matched: str) -> str:
+        if not self._prefix:
+            return matched
+        # Longest vocabulary entry the matched (possibly plural) word starts with
+        return next((k for k in self.keywords if matched.startswith(k)), matched)
+
+
+@lru_cache(maxsize=32)
+def get_matcher(keywords: Tuple[str, ...], prefix: bool = False) -> KeywordMatcher:
+    """Returns the compiled matcher for a vocabulary, building it once per process."""
+    return KeywordMatcher(keywords, prefix=prefix)
+
+
+DESCRIPTOR_MATCHER = get_matcher(tuple(DESCRIPTORS), prefix=True)
+FORMAT_TYPE_MATCHER = get_matcher(tuple(FORMAT_TYPES), prefix=True)
+ABSTRACT_MATCHER = get_matcher(tuple(ABSTRACT_KEYWORDS), prefix=True)
 
 
 # --- Title Validation & Fixing ---
@@ -74,7 +150,6 @@ def validate_title_pattern(title: str) -> Dict[str, Any]:
     title_clean = title.strip().strip('"')
     words = title_clean.split()
     word_count = len(words)
-    title_lower = title_clean.lower()
     
     issues = []
     
@@ -85,12 +160,12 @@ def validate_title_pattern(title: str) -> Dict[str, Any]:
         issues.append("too_long")
     
     # Check for descriptor
-    has_descriptor = any(desc in title_lower for desc in DESCRIPTORS)
+    has_descriptor = DESCRIPTOR_MATCHER.search(title_clean)
     if not has_descriptor:
         issues.append("missing_descriptor")
     
     # Check for format type
-    has_format_type = any(fmt in title_lower for fmt in FORMAT_TYPES)
+    has_format_type = FORMAT_TYPE_MATCHER.search(title_clean)
     if not has_format_type:
         issues.append("missing_format_type")
     
@@ -105,9 +180,10 @@ def validate_title_pattern(title: str) -> Dict[str, Any]:
 
 
 def fix_title(
-    model: genai.GenerativeModel,
+    model: "genai.GenerativeModel",
     title: str,
-    topic_context: Optional[str] = None
+    topic_context: Optional[str] = None,
+    request: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Uses AI to fix a title to match [Descriptor] + [Subject] + [Type] pattern.
@@ -116,6 +192,7 @@ def fix_title(
         model: Configured Gemini GenerativeModel instance.
         title: The original title to fix.
         topic_context: Optional additional context about the prompt.
+        request: Optional `generate_content` kwargs from the agent's generation profile.
         
     Returns:
         dict: Result with keys:
@@ -158,7 +235,7 @@ Return ONLY a JSON object:
 """
 
     try:
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, **(request or {}))
         response_text = response.text if hasattr(response, 'text') else str(response)
         
         # Parse JSON from response
@@ -195,12 +272,12 @@ def _simple_title_fix(title: str) -> str:
         words = words[:MAX_TITLE_WORDS]
     
     # Add descriptor if missing
-    title_lower = " ".join(words).lower()
-    if not any(desc in title_lower for desc in DESCRIPTORS):
+    title_text = " ".join(words)
+    if not DESCRIPTOR_MATCHER.search(title_text):
         words.insert(0, "Cinematic")
     
     # Add format type if missing
-    if not any(fmt in title_lower for fmt in FORMAT_TYPES):
+    if not FORMAT_TYPE_MATCHER.search(title_text):
         words.append("Art")
     
     # Truncate again if needed
@@ -268,10 +345,8 @@ def check_abstract_examples(package: Dict[str, Any]) -> Dict[str, Any]:
         else:
             text = str(example)
         
-        text_lower = text.lower()
-        
         # Check for abstract keywords
-        if any(keyword in text_lower for keyword in ABSTRACT_KEYWORDS):
+        if ABSTRACT_MATCHER.search(text):
             abstract_indices.append(i)
     
     return {
@@ -283,8 +358,9 @@ def check_abstract_examples(package: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def inject_abstract_examples(
-    model: genai.GenerativeModel,
-    package: Dict[str, Any]
+    model: "genai.GenerativeModel",
+    package: Dict[str, Any],
+    request: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Injects abstract/mood-based examples into a package.
@@ -292,6 +368,7 @@ def inject_abstract_examples(
     Args:
         model: Configured Gemini GenerativeModel instance.
         package: The prompt package to enhance.
+        request: Optional `generate_content` kwargs from the agent's generation profile.
         
     Returns:
         dict: Enhanced package with additional abstract examples.
@@ -327,7 +404,7 @@ Return ONLY a JSON object:
 """
 
     try:
-        response = model.generate_content(prompt)
+        response = model.generate_content(prompt, **(request or {}))
         response_text = response.text if hasattr(response, 'text') else str(response)
         
         # Parse JSON
@@ -354,7 +431,8 @@ Return ONLY a JSON object:
 def enhance_package(
     package: Dict[str, Any],
     api_key: Optional[str] = None,
-    model_name: str = "models/gemini-flash-latest"
+    model_name: str = "models/gemini-flash-latest",
+    requests: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> Dict[str, Any]:
     """
     Runs the full enhancement pipeline on a prompt package.
@@ -363,6 +441,8 @@ def enhance_package(
         package: The prompt package to enhance.
         api_key: Optional Gemini API key (uses environment if not provided).
         model_name: The model to use for AI-powered fixes.
+        requests: Optional `generate_content` kwargs per enhancer
+            ('fix_title', 'inject_abstract_examples'), from their generation profiles.
         
     Returns:
         dict: Enhanced package with enhancement_log.
@@ -370,10 +450,11 @@ def enhance_package(
     enhancement_log = []
     
     # Configure API if key provided
+    genai = _load_genai()
     if api_key:
         genai.configure(api_key=api_key)
     
-    model = genai.GenerativeModel(model_name)
+    model = genai.GenerativeModel(model_name, generation_config=JSON_GENERATION_CONFIG)
     
     # Step 1: Title validation and fixing
     title = package.get("topic", "")
@@ -381,7 +462,7 @@ def enhance_package(
     
     if not title_validation["is_valid"]:
         enhancement_log.append(f"Title issues: {title_validation['issues']}")
-        title_result = fix_title(model, title)
+        title_result = fix_title(model, title, request=(requests or {}).get("fix_title"))
         if title_result["was_changed"]:
             package["topic"] = title_result["fixed_title"]
             package["_original_topic"] = title
@@ -407,7 +488,7 @@ def enhance_package(
         enhancement_log.append(
             f"Abstract examples insufficient: {abstract_check['abstract_count']}/{abstract_check['required_count']}"
         )
-        package = inject_abstract_examples(model, package)
+        package = inject_abstract_examples(model, package, request=(requests or {}).get("inject_abstract_examples"))
         if package.get("_abstract_injected"):
             enhancement_log.append(f"Injected {package['_abstract_injected']} abstract examples")
     else:
@@ -420,22 +501,174 @@ def enhance_package(
 
 # --- Batch Processing ---
 
+def _parse_json_object(response_text: str) -> Dict[str, Any]:
+    """Extracts the outermost JSON object from a model response (may contain nested objects)."""
+    start, end = response_text.find("{"), response_text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("No JSON object in response")
+    return json.loads(response_text[start:end + 1])
+
+
+def fix_titles_batch(
+    model: "genai.GenerativeModel",
+    items: List[Dict[str, Any]],
+    request: Optional[Dict[str, Any]] = None
+) -> Dict[int, str]:
+    """
+    Fixes several titles in a single LLM request.
+    
+    Args:
+        model: Configured Gemini GenerativeModel instance.
+        items: List of {'id', 'title', 'issues'} dicts.
+        request: Optional `generate_content` kwargs from the agent's generation profile.
+        
+    Returns:
+        dict: Mapping of item id to fixed title (ids missing from the response are omitted).
+    """
+    listing = "\n".join(
+        f'{item["id"]}. "{item["title"]}" (issues: {", ".join(item["issues"])})' for item in items
+    )
+    prompt = f"""You are a marketplace title optimization expert.
+
+Fix each title below to match the pattern: [Emotional/Visual Descriptor] + [Subject] + [Format/Type]
+
+TITLES:
+{listing}
+
+REQUIREMENTS:
+1. Must be 3-6 words total
+2. Start with a descriptor: {', '.join(DESCRIPTORS[:10])}...
+3. End with a format type: {', '.join(FORMAT_TYPES[:10])}...
+4. Keep the core concept of each title intact
+
+Return ONLY a JSON object keyed by the title number:
+{{"fixed_titles": {{"0": "Your Fixed Title Here"}}}}
+"""
+    response = model.generate_content(prompt, **(request or {}))
+    response_text = response.text if hasattr(response, 'text') else str(response)
+    fixed = _parse_json_object(response_text).get("fixed_titles", {})
+    return {int(k): v for k, v in fixed.items() if str(k).isdigit() and isinstance(v, str) and v.strip()}
+
+
+def inject_abstract_examples_batch(
+    model: "genai.GenerativeModel",
+    items: List[Dict[str, Any]],
+    request: Optional[Dict[str, Any]] = None
+) -> Dict[int, List[str]]:
+    """
+    Generates abstract examples for several templates in a single LLM request.
+    
+    Args:
+        model: Configured Gemini GenerativeModel instance.
+        items: List of {'id', 'topic', 'template'} dicts.
+        request: Optional `generate_content` kwargs from the agent's generation profile.
+        
+    Returns:
+        dict: Mapping of item id to its new abstract examples.
+    """
+    listing = "\n".join(
+        f'{item["id"]}. TOPIC: "{item["topic"]}" TEMPLATE: "{item["template"]}"' for item in items
+    )
+    prompt = f"""You are an expert prompt example creator.
+
+For EACH numbered template below, generate 2 ABSTRACT/CONCEPTUAL examples that focus on mood, emotion, or atmosphere rather than concrete subjects.
+
+TEMPLATES:
+{listing}
+
+REQUIREMENTS:
+1. Must be abstract/conceptual (e.g., "A sense of forgotten history", "The oppressive weight of urban decay")
+2. Must fit each template's variable structure
+3. Must be usable as actual prompts
+
+Return ONLY a JSON object keyed by the template number:
+{{"abstract_examples": {{"0": ["example1", "example2"]}}}}
+"""
+    response = model.generate_content(prompt, **(request or {}))
+    response_text = response.text if hasattr(response, 'text') else str(response)
+    examples = _parse_json_object(response_text).get("abstract_examples", {})
+    return {int(k): v for k, v in examples.items() if str(k).isdigit() and isinstance(v, list)}
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
 def enhance_all_packages(
     packages: List[Dict[str, Any]],
     api_key: str,
-    model_name: str = "models/gemini-flash-latest"
+    model_name: str = "models/gemini-flash-latest",
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    requests: Optional[Dict[str, Dict[str, Any]]] = None
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Enhances multiple packages with summary statistics.
     
+    All local validations run first; packages needing a title fix or abstract
+    examples are then grouped into multi-item LLM requests of `batch_size`,
+    executed concurrently on one shared model. Per-package results match
+    `enhance_package`.
+    
     Args:
         packages: List of prompt packages to enhance.
         api_key: Gemini API key.
         model_name: The model to use.
+        batch_size: Packages per LLM request.
+        max_workers: Concurrent LLM requests.
+        requests: Optional `generate_content` kwargs per enhancer
+            ('fix_titles_batch', 'inject_abstract_examples_batch'), from their generation profiles.
         
     Returns:
         Tuple of (enhanced_packages, summary_stats).
     """
+    genai = _load_genai()
+    if api_key:
+        genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name, generation_config=JSON_GENERATION_CONFIG)
+    
+    # Step 1: Local validations for every package
+    checks = []
+    title_items, abstract_items = [], []
+    for i, package in enumerate(packages):
+        title_validation = validate_title_pattern(package.get("topic", ""))
+        example_validation = validate_examples(package)
+        abstract_check = check_abstract_examples(package)
+        checks.append((title_validation, example_validation, abstract_check))
+        
+        if not title_validation["is_valid"]:
+            title_items.append({"id": i, "title": package.get("topic", ""), "issues": title_validation["issues"]})
+        if not abstract_check["has_abstract"]:
+            abstract_items.append({"id": i, "topic": package.get("topic", ""), "template": package.get("template", "")})
+    
+    # Step 2: Batched LLM fixes, run concurrently on the shared model
+    fixed_titles: Dict[int, str] = {}
+    new_examples: Dict[int, List[str]] = {}
+    errors: Dict[int, str] = {}
+    
+    requests = requests or {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        title_futures = [
+            (chunk, executor.submit(fix_titles_batch, model, chunk, requests.get("fix_titles_batch")))
+            for chunk in _chunks(title_items, batch_size)
+        ]
+        abstract_futures = [
+            (chunk, executor.submit(inject_abstract_examples_batch, model, chunk, requests.get("inject_abstract_examples_batch")))
+            for chunk in _chunks(abstract_items, batch_size)
+        ]
+        for chunk, future in title_futures:
+            try:
+                fixed_titles.update(future.result())
+            except Exception as e:
+                logger.error(f"Batched title fixing failed for {len(chunk)} titles: {e}", exc_info=True)
+        for chunk, future in abstract_futures:
+            try:
+                new_examples.update(future.result())
+            except Exception as e:
+                logger.error(f"Batched abstract injection failed for {len(chunk)} packages: {e}", exc_info=True)
+                errors.update({item["id"]: str(e) for item in chunk})
+    
+    # Step 3: Apply results in the same shape as enhance_package
     enhanced = []
     stats = {
         "total": len(packages),
@@ -444,15 +677,54 @@ def enhance_all_packages(
         "abstract_injected": 0
     }
     
-    for package in packages:
-        result = enhance_package(package, api_key, model_name)
-        enhanced.append(result)
+    for i, package in enumerate(packages):
+        title_validation, example_validation, abstract_check = checks[i]
+        enhancement_log = []
         
-        if result.get("_original_topic"):
+        title = package.get("topic", "")
+        if not title_validation["is_valid"]:
+            enhancement_log.append(f"Title issues: {title_validation['issues']}")
+            fixed_title = fixed_titles.get(i) or _simple_title_fix(title)
+            if fixed_title != title:
+                package["topic"] = fixed_title
+                package["_original_topic"] = title
+                enhancement_log.append(f"Title fixed: '{title}' -> '{fixed_title}'")
+        else:
+            enhancement_log.append("Title validation passed")
+        
+        if not example_validation["is_valid"]:
+            enhancement_log.append(
+                f"Example count insufficient: {example_validation['current_count']}/{example_validation['required_count']}"
+            )
+            package["_needs_more_examples"] = example_validation["deficit"]
+        else:
+            enhancement_log.append(f"Example count OK: {example_validation['current_count']}")
+        
+        if not abstract_check["has_abstract"]:
+            enhancement_log.append(
+                f"Abstract examples insufficient: {abstract_check['abstract_count']}/{abstract_check['required_count']}"
+            )
+            if i in errors:
+                package["_abstract_error"] = errors[i]
+            elif new_examples.get(i):
+                existing = package.get("examples", [])
+                if isinstance(existing, list):
+                    package["examples"] = existing + new_examples[i]
+                package["_abstract_injected"] = len(new_examples[i])
+                enhancement_log.append(f"Injected {package['_abstract_injected']} abstract examples")
+        else:
+            enhancement_log.append(f"Abstract examples OK: {abstract_check['abstract_count']}")
+        
+        package["enhancement_log"] = enhancement_log
+        enhanced.append(package)
+        
+        if package.get("_original_topic"):
             stats["titles_fixed"] += 1
-        if result.get("_needs_more_examples"):
+        if package.get("_needs_more_examples"):
             stats["examples_flagged"] += 1
-        if result.get("_abstract_injected"):
+        if package.get("_abstract_injected"):
             stats["abstract_injected"] += 1
     
+    stats["llm_requests"] = len(title_futures) + len(abstract_futures)
+    
     return enhanced, stats
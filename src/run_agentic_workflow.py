@@ -1,4 +1,3 @@
-import streamlit as st
 import logging
 from typing import Dict, Any, Generator
 import google.generativeai as genai
@@ -8,6 +7,7 @@ from .api_handler import (
     agent_evaluate_compliance,
     agent_refine_prompt,
     agent_generate_examples,
+    agent_manage_examples,
     agent_generate_test_guidance,
     validate_prompt_title,
     agent_generate_description,
@@ -16,6 +16,12 @@ from .api_handler import (
     agent_reverse_engineer_from_image
 )
 from .utils import save_output_to_json
+from .prescreen import resolve_settings, prescreen_package, local_evaluation, log_decision
+from .profiles import resolve_profile, request_kwargs, model_for
+from .policy import policy_stats
+from .keypool import register_key, leased_model
+from . import library_index
+from .diversity import analyze_examples, resolve_settings as resolve_diversity_settings
 
 logger = logging.getLogger(__name__)
 
@@ -32,10 +38,23 @@ def run_workflow(
     """
     try:
         genai.configure(api_key=api_key)
+        register_key("gemini", api_key)
         generator_model = genai.GenerativeModel(generator_model_name)
         evaluator_model = genai.GenerativeModel(evaluator_model_name)
 
         input_mode = user_inputs.get("input_mode", "Generation")
+        database_name = prompts_config.get("database_name")
+        dedup_settings = library_index.resolve_settings(prompts_config)
+
+        # --- Step 0: Library Duplicate Check (request, before any model call) ---
+        if input_mode == "Generation":
+            similar = library_index.check(database_name, "request", user_inputs, dedup_settings)
+            if similar:
+                closest = library_index.describe(similar["matches"])
+                if similar["short_circuit"]:
+                    yield {"status": "error", "step": "Duplicate Check", "output": f"Near-duplicate of library prompt {closest}; skipped.", "duplicate_of": similar["matches"]}
+                    return
+                yield {"status": "running", "step": "Duplicate Check", "output": f"Similar library prompts: {closest}", "similar_prompts": similar["matches"]}
 
         # --- Step 1: Initial Prompt Generation OR Reverse Engineering ---
         if input_mode == "Reverse":
@@ -57,6 +76,9 @@ def run_workflow(
                 image_data=user_inputs.get("image_data"),
                 additional_context=user_inputs.get("user_context", "")
              )
+        elif user_inputs.get("initial_package"):
+            # Generated ahead of time, e.g. by the batched agent_generate_initial_prompts
+            prompt_package = user_inputs["initial_package"]
         else:
             yield {"status": "running", "step": "Initial Generation", "output": "Generating initial prompt..."}
 
@@ -74,6 +96,15 @@ def run_workflow(
         
         yield {"status": "running", "step": "Initial Generation", "output": "Base prompt package defined.", "prompt_package": prompt_package}
 
+        # --- Step 1.1: Library Duplicate Check (template, before the remaining steps) ---
+        similar = library_index.check(database_name, "template", prompt_package, dedup_settings)
+        if similar:
+            closest = library_index.describe(similar["matches"])
+            if similar["short_circuit"]:
+                yield {"status": "error", "step": "Duplicate Check", "output": f"Template nearly duplicates library prompt {closest}; stopped before evaluation.", "duplicate_of": similar["matches"], "prompt_package": prompt_package}
+                return
+            yield {"status": "running", "step": "Duplicate Check", "output": f"Template resembles library prompts: {closest}", "prompt_package": prompt_package}
+
         # --- Step 1.5: Title Validation ---
         yield {"status": "running", "step": "Title Validation", "output": "Validating title against market patterns..."}
         title_validation_results = validate_prompt_title(prompt_package.get("topic", ""))
@@ -85,14 +116,24 @@ def run_workflow(
             yield {"status": "running", "step": "Title Validation", "output": "Title meets quality standards.", "prompt_package": prompt_package}
 
 
-        # --- Step 2: Compliance Evaluation ---
-        yield {"status": "running", "step": "Compliance Evaluation", "output": "Evaluating for PromptBase compliance..."}
-        evaluation = agent_evaluate_compliance(evaluator_model, prompts_config, prompt_package)
-        if 'error' in evaluation:
-            yield {"status": "error", "output": evaluation['error']}
-            return
-        prompt_package['evaluation'] = evaluation
-        yield {"status": "running", "step": "Compliance Evaluation", "output": "Evaluation complete.", "prompt_package": prompt_package}
+        # --- Step 2: Compliance Evaluation (local pre-screen, LLM only when borderline) ---
+        prescreen_settings = resolve_settings(prompts_config)
+        screen = prescreen_package(prompt_package, prescreen_settings) if prescreen_settings["enabled"] else None
+        if screen and not screen["send_to_llm"]:
+            evaluation = local_evaluation(screen)
+            log_decision(screen, prompt_package, log_path=prescreen_settings["log_path"])
+            prompt_package['evaluation'] = evaluation
+            yield {"status": "running", "step": "Compliance Evaluation", "output": f"Local pre-screen: clear {screen['decision']} (score {screen['score']}). LLM evaluation skipped.", "prompt_package": prompt_package}
+        else:
+            yield {"status": "running", "step": "Compliance Evaluation", "output": "Evaluating for PromptBase compliance..."}
+            evaluation = agent_evaluate_compliance(evaluator_model, prompts_config, prompt_package)
+            if 'error' in evaluation:
+                yield {"status": "error", "output": evaluation['error']}
+                return
+            if screen:
+                log_decision(screen, prompt_package, llm_evaluation=evaluation, log_path=prescreen_settings["log_path"])
+            prompt_package['evaluation'] = evaluation
+            yield {"status": "running", "step": "Compliance Evaluation", "output": "Evaluation complete.", "prompt_package": prompt_package}
 
         # --- Step 3: Refinement (Conditional) ---
         total_score = evaluation.get("total_score", 0)
@@ -116,6 +157,20 @@ def run_workflow(
         prompt_package['examples'] = examples
         yield {"status": "running", "step": "Example Generation", "output": "Examples generated.", "prompt_package": prompt_package}
 
+        # --- Step 4.1: Example Diversity (local; one batched request for duplicate slots only) ---
+        diversity_settings = resolve_diversity_settings(prompts_config)
+        diversity = analyze_examples(prompt_package['examples'], prompt_package.get("template", ""), diversity_settings)
+        if diversity["duplicates"] and diversity_settings["regenerate_in_workflow"]:
+            yield {"status": "running", "step": "Example Diversity", "output": f"Diversity {diversity['score']:.2f}: regenerating {len(diversity['duplicates'])} near-duplicate example(s)..."}
+            regenerated = agent_manage_examples(generator_model, prompt_package, action="regenerate_duplicates", example_indexes=diversity["duplicates"])
+            if isinstance(regenerated, list):
+                prompt_package['examples'] = regenerated
+                diversity = analyze_examples(regenerated, prompt_package.get("template", ""), diversity_settings)
+            else:
+                logger.warning(f"Duplicate example regeneration failed: {regenerated.get('error')}")
+        prompt_package['example_diversity'] = diversity
+        yield {"status": "running", "step": "Example Diversity", "output": f"Diversity {diversity['score']:.2f}, {len(diversity['duplicates'])} near-duplicate(s) left.", "prompt_package": prompt_package}
+
         # --- Step 5: Generate Test Guidance ---
         yield {"status": "running", "step": "Test Guidance", "output": "Creating testing guide..."}
         test_guidance = agent_generate_test_guidance(prompt_package)
@@ -150,7 +205,13 @@ def run_workflow(
             # 8a. Title validation and fixing
             title_validation = validate_title_pattern(prompt_package.get("topic", ""))
             if not title_validation["is_valid"]:
-                title_result = fix_title(generator_model, prompt_package.get("topic", ""))
+                title_profile = resolve_profile("fix_title", prompts_config)
+                with leased_model(model_for(generator_model, title_profile)) as title_model:
+                    title_result = fix_title(
+                        title_model,
+                        prompt_package.get("topic", ""),
+                        request=request_kwargs(title_profile, json_mode=True)
+                    )
                 if title_result["was_changed"]:
                     prompt_package["_original_topic"] = prompt_package["topic"]
                     prompt_package["topic"] = title_result["fixed_title"]
@@ -165,7 +226,13 @@ def run_workflow(
             # 8c. Abstract example check and injection
             abstract_check = check_abstract_examples(prompt_package)
             if not abstract_check["has_abstract"]:
-                prompt_package = inject_abstract_examples(generator_model, prompt_package)
+                abstract_profile = resolve_profile("inject_abstract_examples", prompts_config)
+                with leased_model(model_for(generator_model, abstract_profile)) as abstract_model:
+                    prompt_package = inject_abstract_examples(
+                        abstract_model,
+                        prompt_package,
+                        request=request_kwargs(abstract_profile, json_mode=True)
+                    )
                 if prompt_package.get("_abstract_injected"):
                     enhancement_log.append(f"Injected {prompt_package['_abstract_injected']} abstract examples")
             
@@ -180,6 +247,7 @@ def run_workflow(
         # --- Final Step: Save and Complete ---
         output_path = save_output_to_json(prompt_package, f"prompt_package_{user_inputs.get('topic', 'untitled')}")
         final_message = f"Workflow finished. Final prompt package saved to `{output_path}`"
+        logger.info(f"Request policy counters: {policy_stats()['counters']}")
         
         yield {"status": "completed", "step": "Complete", "output": final_message, "prompt_package": prompt_package}
 
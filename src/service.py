@@ -0,0 +1,331 @@
+"""
+HTTP Service Module.
+
+A small local JSON API (stdlib `http.server`) over the generation pipeline:
+1. Jobs - POST /jobs/<kind> queues a workflow, image reverse-engineering or
+   packaging job and returns its id; kinds run on a bounded worker pool and
+   submissions beyond `max_queued` are rejected with 429
+2. Progress - GET /jobs/<id>/events streams the job's step events as
+   server-sent events (resumable with Last-Event-ID)
+3. Results - GET /jobs/<id> returns status, events and the result when done
+4. Health - GET /health reports workers, queue depth and request counters
+
+Job kinds and their JSON bodies:
+- workflow: {"user_inputs": {...}, "generator_model", "evaluator_model", "compliance_threshold"}
+  (`user_inputs.image_path` is loaded for the ReverseImage mode)
+- reverse: {"image_path", "context"}
+- package: {"json_path", "output"}
+
+The service binds to localhost and has no authentication; it is meant for
+internal tools on the same machine.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 500
+MAX_FINISHED_JOBS = 1000
+KEEPALIVE_SECONDS = 15.0
+FINAL_STATUSES = ("completed", "error")
+
+Emit = Callable[[Dict[str, Any]], None]
+Runner = Callable[[Dict[str, Any], Emit], Any]
+
+
+# --- Jobs ---
+
+class Job:
+    """One submitted job: its events so far and, once finished, a result or error."""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.events: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def summary(self, full: bool = False) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "steps": len(self.events),
+            "error": self.error
+        }
+        if full:
+            data["events"] = self.events
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and records their progress.
+
+    Runners are `runner(params, emit)` functions: they call `emit(event)` for
+    each progress step and return the job's result (raising on failure).
+    """
+
+    def __init__(
+        self,
+        runners: Dict[str, Runner],
+        workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED
+    ):
+        self.runners = runners
+        self.workers = workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Job:
+        """
+        Queues a job.
+
+        Raises:
+            KeyError: If `kind` has no runner.
+            OverflowError: If `max_queued` jobs are already waiting.
+        """
+        if kind not in self.runners:
+            raise KeyError(kind)
+        with self._condition:
+            if self._count("queued") >= self.max_queued:
+                raise OverflowError(f"{self.max_queued} jobs already queued")
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+            self._evict()
+        self._executor.submit(self._run, job)
+        return job
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINAL_STATUSES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _emit(self, job: Job, event: Dict[str, Any]):
+        with self._condition:
+            job.events.append(dict(event, time=time.time()))
+            self._condition.notify_all()
+
+    def _run(self, job: Job):
+        with self._condition:
+            job.status, job.started = "running", time.time()
+            self._condition.notify_all()
+        try:
+            result = self.runners[job.kind](job.params, lambda event: self._emit(job, event))
+            status, error = "completed", None
+        except Exception as e:
+            logger.error(f"Service job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+            result, status, error = None, "error", str(e)
+        with self._condition:
+            job.result, job.status, job.error, job.finished = result, status, error, time.time()
+            self._condition.notify_all()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            return [job.summary() for job in self._jobs.values()]
+
+    def wait_for_events(self, job: Job, seen: int, timeout: float) -> List[Dict[str, Any]]:
+        """Events after the first `seen`, waiting up to `timeout` for new ones unless the job is finished."""
+        with self._condition:
+            self._condition.wait_for(lambda: len(job.events) > seen or job.status in FINAL_STATUSES, timeout=timeout)
+            return job.events[seen:]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "queued": self._count("queued"),
+                "running": self._count("running"),
+                "completed": self._count("completed"),
+                "failed": self._count("error")
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Runners ---
+
+def default_runners(config: Dict[str, Any], api_key: str) -> Dict[str, Runner]:
+    """The workflow, reverse and package runners, bound to a loaded config and API key."""
+
+    def run_workflow_job(params: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+        from PIL import Image
+        from .run_agentic_workflow import run_workflow
+
+        user_inputs = dict(params.get("user_inputs") or {})
+        if user_inputs.get("image_path"):
+            user_inputs["image_data"] = Image.open(user_inputs["image_path"])
+        package = None
+        for state in run_workflow(
+            api_key,
+            params.get("generator_model") or config.get("default_model", "models/gemini-flash-latest"),
+            params.get("evaluator_model") or config.get("evaluator_model_name", "models/gemini-flash-latest"),
+            config,
+            user_inputs,
+            compliance_threshold=params.get("compliance_threshold", 35)
+        ):
+            package = state.get("prompt_package", package)
+            emit({k: v for k, v in state.items() if k != "prompt_package"})
+            if state["status"] == "error":
+                raise RuntimeError(state["output"])
+        return package
+
+    def run_reverse_job(params: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+        import google.generativeai as genai
+        from PIL import Image
+        from .api_handler import agent_reverse_engineer_from_image
+        from .utils import save_output_to_json
+
+        emit({"status": "running", "step": "Image Analysis", "output": f"Analyzing {params['image_path']}..."})
+        result = agent_reverse_engineer_from_image(
+            model=genai.GenerativeModel(params.get("model") or config.get("default_model", "models/gemini-flash-latest")),
+            prompts_config=config,
+            image_data=Image.open(params["image_path"]),
+            additional_context=params.get("context", "")
+        )
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        result["source_image_path"] = os.path.abspath(params["image_path"])
+        output_path = save_output_to_json(result, f"reverse_{os.path.splitext(os.path.basename(params['image_path']))[0]}")
+        emit({"status": "completed", "step": "Complete", "output": f"Saved to {output_path}"})
+        return dict(result, output_path=output_path)
+
+    def run_package_job(params: Dict[str, Any], emit: Emit) -> Dict[str, Any]:
+        from .packager import package_file
+
+        emit({"status": "running", "step": "Packaging", "output": f"Packaging {params['json_path']}..."})
+        item = package_file(params["json_path"], params.get("output", "dist"))
+        emit({"status": "completed", "step": "Complete", "output": f"Zipped to {item['zip_path']}"})
+        return item
+
+    return {"workflow": run_workflow_job, "reverse": run_reverse_job, "package": run_package_job}
+
+
+# --- HTTP ---
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PBTService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def log_message(self, format: str, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+    def _json(self, status: int, data: Any):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self) -> List[str]:
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def do_GET(self):
+        parts = self._parts()
+        if parts == ["health"]:
+            from .policy import policy_stats
+            return self._json(200, {"status": "ok", "jobs": self.manager.stats(), "requests": policy_stats()["counters"]})
+        if parts == ["jobs"]:
+            return self._json(200, {"jobs": self.manager.list()})
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.manager.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": f"Unknown job '{parts[1]}'"})
+            if len(parts) == 2:
+                return self._json(200, job.summary(full=True))
+            if parts[2] == "events":
+                return self._stream_events(job)
+        self._json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            return self._json(400, {"error": f"Invalid JSON body: {e}"})
+        try:
+            job = self.manager.submit(parts[1], params)
+        except KeyError:
+            return self._json(404, {"error": f"Unknown job kind '{parts[1]}'", "kinds": sorted(self.manager.runners)})
+        except OverflowError as e:
+            return self._json(429, {"error": f"Queue full: {e}"})
+        self._json(202, {"id": job.id, "status": job.status, "events": f"/jobs/{job.id}/events", "result": f"/jobs/{job.id}"})
+
+    def _stream_events(self, job: Job):
+        """Server-sent events: one `step` event per workflow step, then an `end` event with the outcome."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        seen = int(self.headers.get("Last-Event-ID") or 0)
+        try:
+            while True:
+                events = self.manager.wait_for_events(job, seen, KEEPALIVE_SECONDS)
+                for event in events:
+                    seen += 1
+                    self.wfile.write(f"id: {seen}\nevent: step\ndata: {json.dumps(event, default=str)}\n\n".encode("utf-8"))
+                if not events:
+                    if job.status in FINAL_STATUSES:
+                        end = {"status": job.status, "error": job.error, "result": f"/jobs/{job.id}"}
+                        self.wfile.write(f"event: end\ndata: {json.dumps(end)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        return
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def create_server(
+    manager: JobManager,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT
+) -> ThreadingHTTPServer:
+    """An HTTP server exposing `manager` (call serve_forever() to run it)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.manager = manager
+    return server
@@ -0,0 +1,395 @@
+"""
+Structured Output Module.
+
+Keeps agent replies machine-readable without extra round trips:
+1. Schemas - one response schema per JSON agent, in the OpenAPI subset Gemini accepts
+2. Validation - replies are checked against their schema locally
+3. Repair - fences, trailing commas, Python literals and truncated replies are
+   fixed locally before a malformed reply costs a re-request
+
+Schemas whose objects all declare their properties are sent to the model as
+`response_schema`; schemas with free-form objects (e.g. variable explanations
+keyed by variable name) only switch the reply to JSON and are validated here.
+"""
+
+import re
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+# --- Constants ---
+
+JSON_MIME_TYPE = "application/json"
+
+_STRING = {"type": "string"}
+_STRINGS = {"type": "array", "items": _STRING}
+_FREE_OBJECT = {"type": "object"}
+
+_SELF_EVALUATION = {
+    "type": "object",
+    "properties": {
+        "style_fidelity": {"type": "number"},
+        "variable_quality": {"type": "number"},
+        "completeness": {"type": "number"},
+        "overall_score": {"type": "number"}
+    }
+}
+
+_INITIAL_PROMPT_PROPERTIES = {
+    "template": _STRING,
+    "description": _STRING,
+    "variables_explanation": _FREE_OBJECT,
+    "example_prompts": _STRINGS,
+    "technical_tips": _STRINGS,
+    "instructions": _STRING,
+    "prompt_metadata": _FREE_OBJECT
+}
+
+RESPONSE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "market_analysis": {
+        "type": "object",
+        "properties": {
+            "popular_categories": _STRINGS,
+            "trending_styles": _STRINGS,
+            "dominant_models": _STRINGS,
+            "summary": _STRING
+        },
+        "required": ["summary"]
+    },
+    "concepts": {
+        "type": "object",
+        "properties": {
+            "concepts": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "topic": _STRING,
+                        "description": _STRING,
+                        "content_type": {"type": "string", "format": "enum", "enum": ["Image", "Text", "Video"]},
+                        "style_descriptors": _STRINGS,
+                        "use_cases": _STRINGS,
+                        "unique_angle": _STRING
+                    },
+                    "required": ["topic", "description"]
+                }
+            }
+        },
+        "required": ["concepts"]
+    },
+    "initial_prompt": {
+        "type": "object",
+        "properties": _INITIAL_PROMPT_PROPERTIES,
+        "required": ["template", "example_prompts"]
+    },
+    "initial_prompts": {
+        "type": "object",
+        "properties": {
+            "packages": {
+                "type": "array",
+                # Same keys as "initial_prompt" (so this is never sent as a strict response_schema either),
+                # but only "index" is required: entries are validated one by one so one bad item doesn't sink the batch
+                "items": {
+                    "type": "object",
+                    "properties": dict(_INITIAL_PROMPT_PROPERTIES, index={"type": "integer"}),
+                    "required": ["index"]
+                }
+            }
+        },
+        "required": ["packages"]
+    },
+    "template_analysis": {
+        "type": "object",
+        "properties": {
+            "topic": _STRING,
+            "content_type": _STRING,
+            "platform": _STRING,
+            "style": {},
+            "use_case": _STRING,
+            "aspect_ratio": _STRING,
+            "template": _STRING,
+            "original_template": _STRING,
+            "variables_explanation": _FREE_OBJECT,
+            "description": _STRING,
+            "technical_tips": _STRINGS,
+            "example_prompts": _STRINGS,
+            "self_evaluation": _SELF_EVALUATION
+        },
+        "required": ["topic", "template"]
+    },
+    "image_analysis": {
+        "type": "object",
+        "properties": {
+            "topic": _STRING,
+            "style": {},
+            "use_case": _STRING,
+            "aspect_ratio": _STRING,
+            "template": _STRING,
+            "variables_explanation": _FREE_OBJECT,
+            "description": _STRING,
+            "technical_tips": _STRINGS,
+            "example_prompts": _STRINGS,
+            "self_evaluation": _SELF_EVALUATION,
+            "improved_template": _STRING
+        },
+        "required": ["topic", "template"]
+    },
+    "normalized_items": {
+        "type": "object",
+        "properties": {"items": {"type": "array", "items": _FREE_OBJECT}},
+        "required": ["items"]
+    },
+    "compliance_evaluation": {
+        "type": "object",
+        "properties": {
+            "scores": _FREE_OBJECT,
+            "total_score": {"type": "number"},
+            "feedback": _FREE_OBJECT,
+            "priority_improvements": _STRINGS
+        },
+        "required": ["total_score"]
+    },
+    "refined_template": {
+        "type": "object",
+        "properties": {"improved_template": _STRING},
+        "required": ["improved_template"]
+    },
+    "examples": {
+        "type": "object",
+        "properties": {
+            "examples": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"variables": _FREE_OBJECT, "prompt": _STRING},
+                    "required": ["prompt"]
+                }
+            }
+        },
+        "required": ["examples"]
+    },
+    "new_examples": {
+        "type": "object",
+        "properties": {"new_examples": _STRINGS},
+        "required": ["new_examples"]
+    },
+    "new_example": {
+        "type": "object",
+        "properties": {"new_example": _STRING},
+        "required": ["new_example"]
+    },
+    "trends": {
+        "type": "object",
+        "properties": {
+            "trends": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "topic": _STRING,
+                        "style": _STRING,
+                        "use_case": _STRING,
+                        "reasoning": _STRING
+                    },
+                    "required": ["topic"]
+                }
+            }
+        },
+        "required": ["trends"]
+    },
+    "extracted_variables": _FREE_OBJECT
+}
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+# --- Schemas ---
+
+def is_static(schema: Dict[str, Any]) -> bool:
+    """True when every object in the schema declares its properties (Gemini rejects free-form objects)."""
+    if not schema.get("type"):
+        return False
+    if schema["type"] == "object":
+        properties = schema.get("properties")
+        return bool(properties) and all(is_static(p) for p in properties.values())
+    if schema["type"] == "array":
+        return is_static(schema.get("items", {}))
+    return True
+
+
+def request_schema(name: str) -> Optional[Dict[str, Any]]:
+    """The schema to send as `response_schema` for an agent, or None for JSON mode only."""
+    schema = RESPONSE_SCHEMAS[name]
+    return schema if is_static(schema) else None
+
+
+# --- Validation ---
+
+def _type_matches(value: Any, expected: str) -> bool:
+    if expected == "object":
+        return isinstance(value, dict)
+    if expected == "array":
+        return isinstance(value, list)
+    if expected == "string":
+        return isinstance(value, str)
+    if expected == "boolean":
+        return isinstance(value, bool)
+    if expected == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if expected == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return True
+
+
+def validate_json(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Checks `data` against a schema (type, properties, required, items, enum).
+    Keys the schema does not mention are allowed.
+
+    Returns:
+        list: Human-readable errors; empty when the data is valid.
+    """
+    expected = schema.get("type")
+    if expected and not _type_matches(data, expected):
+        return [f"{path}: expected {expected}, got {type(data).__name__}"]
+    if "enum" in schema and data not in schema["enum"]:
+        return [f"{path}: {data!r} is not one of {schema['enum']}"]
+
+    errors = []
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing required key '{key}'")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in data and data[key] is not None:
+                errors.extend(validate_json(data[key], subschema, f"{path}.{key}"))
+    elif isinstance(data, list) and "items" in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate_json(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+# --- Repair ---
+
+def _strip_fences(text: str) -> str:
+    fenced = re.search(r"```(?:json)?\s*([\s\S]*?)(?:```|$)", text)
+    return fenced.group(1) if fenced else text
+
+
+def _close(text: str, stack: List[str], in_string: bool) -> str:
+    """Terminates a truncated reply: closes the open string, drops a dangling comma, closes brackets."""
+    if in_string:
+        if text.endswith("\\") and not text.endswith("\\\\"):
+            text = text[:-1]
+        text += '"'
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _scan(text: str) -> Tuple[str, List[str], bool, List[Tuple[int, List[str]]]]:
+    """
+    Single pass over the reply outside-of-string aware: rewrites Python literals,
+    drops trailing commas, escapes raw newlines in strings and stops at the end of
+    the top-level value. Returns (output, open brackets, in_string, comma checkpoints).
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    commas: List[Tuple[int, List[str]]] = []
+    in_string = escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                ch = "\\n"
+            out.append(ch)
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in _CLOSERS:
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack and _CLOSERS[stack[-1]] == ch:
+                stack.pop()
+                out.append(ch)
+                if not stack:
+                    break
+        elif ch == ",":
+            commas.append((len(out), list(stack)))
+            out.append(ch)
+        elif ch.isalpha():
+            word = re.match(r"[A-Za-z_]+", text[i:]).group()
+            out.append(_PY_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out), stack, in_string, commas
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort local repair of a model's JSON reply.
+
+    Handles markdown fences, prose around the value, trailing commas,
+    Python literals (True/False/None), raw newlines inside strings and
+    replies cut off mid-value (by closing them, falling back to the last
+    complete element). The result is not guaranteed to parse.
+    """
+    text = _strip_fences(text)
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    if not starts:
+        return text.strip()
+
+    output, stack, in_string, commas = _scan(text[min(starts):])
+    if not stack and not in_string:
+        return output
+
+    candidate = _close(output, stack, in_string)
+    try:
+        json.loads(candidate)
+        return candidate
+    except json.JSONDecodeError:
+        pass
+    for position, comma_stack in reversed(commas):
+        fallback = _close(output[:position], comma_stack, False)
+        try:
+            json.loads(fallback)
+            return fallback
+        except json.JSONDecodeError:
+            continue
+    return candidate
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parses a JSON reply, repairing it locally if it does not parse as-is.
+
+    Raises:
+        ValueError: If the reply cannot be parsed even after repair.
+    """
+    stripped = _strip_fences(text).strip()
+    try:
+        return json.loads(stripped)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"No valid JSON structure found in the response ({e}).") from e
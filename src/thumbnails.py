@@ -0,0 +1,195 @@
+"""
+Thumbnail & Contact Sheet Module.
+
+Makes packages reviewable without opening full-size previews:
+1. Thumbnails - downscaled with Pillow's `draft` (JPEG) and `reduce` fast paths,
+   cached under .cache/thumbnails keyed by path, size and mtime
+2. Contact sheets - one grid image per package (source image + previews),
+   and optionally one per batch with a tile per package
+3. Parallel rendering across packages in a process pool
+"""
+
+import os
+import json
+import math
+import hashlib
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from .previews import list_previews
+
+logger = logging.getLogger(__name__)
+
+# --- Constants ---
+
+THUMB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "thumbnails")
+THUMB_SIZE = (256, 256)
+SHEET_COLUMNS = 4
+SHEET_PADDING = 8
+LABEL_HEIGHT = 18
+SHEET_SUFFIX = "_contact_sheet.jpg"
+BACKGROUND = (255, 255, 255)
+
+
+# --- Thumbnails ---
+
+def _thumb_path(image_path: str, size: Tuple[int, int], cache_dir: str) -> str:
+    stat = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{size[0]}x{size[1]}"
+    return os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".jpg")
+
+
+def load_reduced(image_path: str, size: Tuple[int, int] = THUMB_SIZE) -> Image.Image:
+    """
+    Decodes an image at (roughly) the target size.
+    JPEGs are decoded at reduced scale via `draft`; other formats are shrunk by
+    the largest integer factor with `reduce` before the final resample.
+    """
+    with Image.open(image_path) as img:
+        img.draft("RGB", size)
+        img = img.convert("RGB")
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    img.thumbnail(size)
+    return img
+
+
+def make_thumbnail(
+    image_path: str,
+    size: Tuple[int, int] = THUMB_SIZE,
+    cache_dir: Optional[str] = None
+) -> str:
+    """Returns the cached thumbnail for an image, rendering it on first use."""
+    cache_dir = cache_dir or THUMB_DIR
+    thumb_path = _thumb_path(image_path, size, cache_dir)
+    if os.path.exists(thumb_path):
+        return thumb_path
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{thumb_path}.{os.getpid()}.tmp"
+    load_reduced(image_path, size).save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, thumb_path)
+    return thumb_path
+
+
+# --- Contact Sheets ---
+
+def render_contact_sheet(
+    image_paths: List[str],
+    output_path: str,
+    labels: Optional[List[str]] = None,
+    columns: int = SHEET_COLUMNS,
+    cell: Tuple[int, int] = THUMB_SIZE,
+    cache_dir: Optional[str] = None
+) -> str:
+    """Tiles cached thumbnails of `image_paths` into one grid image."""
+    columns = max(1, min(columns, len(image_paths)))
+    rows = math.ceil(len(image_paths) / columns)
+    label_height = LABEL_HEIGHT if labels else 0
+    cell_w, cell_h = cell[0] + SHEET_PADDING, cell[1] + SHEET_PADDING + label_height
+    sheet = Image.new("RGB", (columns * cell_w + SHEET_PADDING, rows * cell_h + SHEET_PADDING), BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+
+    for i, image_path in enumerate(image_paths):
+        x = SHEET_PADDING + (i % columns) * cell_w
+        y = SHEET_PADDING + (i // columns) * cell_h
+        try:
+            with Image.open(make_thumbnail(image_path, cell, cache_dir)) as thumb:
+                sheet.paste(thumb, (x + (cell[0] - thumb.width) // 2, y + (cell[1] - thumb.height) // 2))
+        except OSError as e:
+            logger.warning(f"Skipping unreadable image {image_path}: {e}")
+        if labels:
+            draw.text((x, y + cell[1] + 2), labels[i][:40], fill=(0, 0, 0))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    sheet.save(tmp_path, "JPEG", quality=85)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def package_images(json_path: str, source_image_path: Optional[str] = None) -> List[str]:
+    """The source image (if present) followed by the package's final previews."""
+    images = [source_image_path] if source_image_path and os.path.exists(source_image_path) else []
+    images += [str(p) for p in list_previews(json_path)]
+    return images
+
+
+def sheet_path_for(json_path: str) -> str:
+    json_file = Path(json_path)
+    return str(json_file.parent / f"{json_file.stem}{SHEET_SUFFIX}")
+
+
+def build_package_sheet(
+    json_path: str,
+    source_image_path: Optional[str] = None,
+    cache_dir: Optional[str] = None
+) -> Optional[str]:
+    """
+    Writes `{json_stem}_contact_sheet.jpg` next to the JSON.
+    Skipped when there are no images or the sheet is newer than all of them.
+    """
+    images = package_images(json_path, source_image_path)
+    if not images:
+        return None
+    sheet_path = sheet_path_for(json_path)
+    if os.path.exists(sheet_path):
+        newest = max(os.path.getmtime(p) for p in images)
+        if os.path.getmtime(sheet_path) >= newest:
+            return sheet_path
+    return render_contact_sheet(images, sheet_path, labels=[Path(p).stem for p in images], cache_dir=cache_dir)
+
+
+def _batch_tile(json_path: str) -> Optional[Tuple[str, str]]:
+    """Worker: builds a package's sheet and returns (tile image, label) for the batch sheet."""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    source = data.get("source_image_path")
+    build_package_sheet(json_path, source)
+    images = package_images(json_path, source)
+    if not images:
+        return None
+    return images[-1], data.get("topic", Path(json_path).stem)
+
+
+def build_batch_sheet(
+    json_paths: List[str],
+    output_path: str,
+    workers: Optional[int] = None
+) -> Optional[str]:
+    """
+    Builds every package's contact sheet in parallel, then one batch sheet
+    with a labelled tile (latest preview, else source image) per package.
+    """
+    workers = workers or os.cpu_count() or 1
+    tiles: Optional[List[Optional[Tuple[str, str]]]] = None
+    if workers > 1 and len(json_paths) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(json_paths))) as executor:
+                tiles = list(executor.map(_batch_tile, json_paths))
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Parallel contact sheets unavailable ({e}); continuing sequentially.")
+    if tiles is None:
+        tiles = [_batch_tile(p) for p in json_paths]
+
+    tiles = [t for t in tiles if t]
+    if not tiles:
+        return None
+    return render_contact_sheet([t[0] for t in tiles], output_path, labels=[t[1] for t in tiles])
+
+
+def package_thumbnail(json_path: str, source_image_path: Optional[str] = None) -> Optional[str]:
+    """Cached thumbnail of a package's contact sheet (or first image), for library views."""
+    sheet_path = sheet_path_for(json_path)
+    if os.path.exists(sheet_path):
+        return make_thumbnail(sheet_path)
+    images = package_images(json_path, source_image_path)
+    return make_thumbnail(images[0]) if images else None
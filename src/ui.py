@@ -1,16 +1,23 @@
 # ui.py
 
 import streamlit as st
+import os
 import json
 import random
 from typing import Dict, Any, Callable
 import google.generativeai as genai
-from pypdf import PdfReader
 from PIL import Image
 
-from .utils import save_prompt_to_db, get_all_prompts_from_db, save_output_to_json, update_prompt_in_db, save_market_data, get_all_market_data, delete_market_data, parse_csv_to_text, parse_json_to_text
+from .utils import save_prompt_to_db, get_all_prompts_from_db, save_output_to_json, update_prompt_in_db, save_market_data, save_market_data_bulk, get_all_market_data, delete_market_data, OUTPUT_DIR
+from .dedup import DUPLICATE_THRESHOLD
+from .ingestion import read_file_text, ingest_file
+from .catalog import scan_directory, query_catalog, catalog_facets
+from .thumbnails import package_thumbnail
 from .run_agentic_workflow import run_workflow
-from .api_handler import agent_analyze_market, agent_generate_concepts, agent_manage_examples, agent_analyze_trends, agent_normalize_data
+from .fanout import fan_out, concepts_to_inputs, read_topics_csv, library_saver, resolve_settings as resolve_fanout_settings
+from .diversity import analyze_examples, resolve_settings as resolve_diversity_settings
+from .library_index import split_duplicates, describe as describe_matches, resolve_settings as resolve_library_dedup
+from .api_handler import agent_analyze_market, agent_generate_concepts, agent_generate_initial_prompts, agent_manage_examples, agent_analyze_trends, agent_normalize_data
 
 
 def initialize_session_state():
@@ -58,7 +65,7 @@ def create_ui(database_name: str, prompts_config: Dict[str, Any]):
 
     # "Create" tab is the new starting point, containing the enhanced Idea Lab
     with tab_create:
-        render_idea_lab(prompts_config)
+        render_idea_lab(prompts_config, database_name)
 
     with tab_trends:
         render_trend_engine(prompts_config, database_name)
@@ -69,6 +76,7 @@ def create_ui(database_name: str, prompts_config: Dict[str, Any]):
 
     with tab_library:
         render_prompt_library(database_name, prompts_config)
+        render_published_catalog()
 
     with tab_guides:
         render_guidelines()
@@ -90,7 +98,7 @@ def load_trend_into_state(trend: Dict[str, Any]):
     # We can also set a flag to show a success message on the next run if needed
     st.session_state["trend_loaded"] = True
 
-def render_idea_lab(prompts_config: Dict[str, Any]):
+def render_idea_lab(prompts_config: Dict[str, Any], database_name: str):
     st.header("💡 Idea Lab")
     st.markdown("Define your prompt concept. Our AI agents will research the market, analyze trends, and generate a complete marketplace-ready template.")
 
@@ -99,7 +107,7 @@ def render_idea_lab(prompts_config: Dict[str, Any]):
         return
 
     # Simplified input form with Tabs for Mode Selection
-    mode_tab1, mode_tab2, mode_tab3 = st.tabs(["✨ Generation Mode", "🛠️ Reverse Engineer", "🖼️ Image to Prompt"])
+    mode_tab1, mode_tab2, mode_tab3, mode_tab4 = st.tabs(["✨ Generation Mode", "🛠️ Reverse Engineer", "🖼️ Image to Prompt", "🌱 Concept Fan-out"])
 
     with mode_tab1:
         content_type = st.selectbox("Content Type", ["Image", "Text", "Video"], key="content_type_idea")
@@ -176,6 +184,76 @@ def render_idea_lab(prompts_config: Dict[str, Any]):
                 except Exception as e:
                     st.error(f"Error processing image: {e}")
 
+    with mode_tab4:
+        render_concept_fanout(prompts_config, database_name)
+
+
+def render_concept_fanout(prompts_config: Dict[str, Any], database_name: str):
+    """Generates concepts for a theme (or reads topics from a CSV) and builds a package for each concurrently."""
+    settings = resolve_fanout_settings(prompts_config)
+    st.info("Build many packages at once: generate concepts for a theme or upload a CSV of topics. Finished packages are saved to the library as they complete.")
+
+    col_theme, col_csv = st.columns(2)
+    with col_theme:
+        theme = st.text_input("Theme", placeholder="e.g., cozy autumn interiors", key="fanout_theme")
+        if st.button("💡 Generate Concepts", use_container_width=True, disabled=not theme):
+            with st.spinner("Generating concepts..."):
+                model = genai.GenerativeModel(st.session_state.generator_model)
+                concepts = agent_generate_concepts(model, prompts_config, theme, st.session_state.get("market_analysis") or {})
+            if "error" in concepts:
+                st.error(f"Concept generation failed: {concepts['error']}")
+            else:
+                st.session_state.concepts = concepts.get("concepts", [])
+    with col_csv:
+        topics_file = st.file_uploader("...or upload topics (CSV)", type=["csv"], key="fanout_csv")
+
+    platform = st.selectbox("AI Platform", ["Midjourney", "DALL-E 3", "Imagen 3 (Gemini)", "Stable Diffusion", "Sora", "Veo 3.1"], key="fanout_platform")
+    defaults = {"model_platform": platform}
+    if topics_file is not None:
+        inputs = read_topics_csv(topics_file.getvalue().decode("utf-8-sig"), defaults)
+    else:
+        concepts = st.session_state.get("concepts") or []
+        for i, concept in enumerate(concepts):
+            st.checkbox(f"**{concept.get('topic')}** — {concept.get('description', '')}", value=True, key=f"fanout_pick_{i}")
+            if st.button("✏️ Edit in Create form", key=f"fanout_edit_{i}"):
+                handle_concept_selection(concept)
+        picked = [c for i, c in enumerate(concepts) if st.session_state.get(f"fanout_pick_{i}", True)]
+        inputs = concepts_to_inputs(picked, defaults)
+
+    skip_duplicates = st.checkbox("Skip topics that nearly duplicate a library prompt", value=bool(resolve_library_dedup(prompts_config)["short_circuit"]), key="fanout_skip_duplicates")
+    col_conc, col_budget = st.columns(2)
+    concurrency = col_conc.slider("Workflows in parallel", 1, max(1, settings["global_max_concurrency"]), min(settings["max_concurrency"], settings["global_max_concurrency"]))
+    budget = col_budget.number_input("Request budget (0 = unlimited)", min_value=0, value=settings["max_requests"] or 0, step=10)
+
+    if st.button(f"🌱 Build {len(inputs)} Package(s)", type="primary", use_container_width=True, disabled=not inputs):
+        run_settings = resolve_fanout_settings(prompts_config, {"max_concurrency": concurrency, "max_requests": budget or None})
+        prompts_config = dict(prompts_config, library_dedup=resolve_library_dedup(prompts_config, {"short_circuit": skip_duplicates}))
+        inputs, duplicates = split_duplicates(database_name, inputs, prompts_config["library_dedup"])
+        for user_inputs, similar in duplicates:
+            st.warning(f"⏭️ {user_inputs['topic']}: near-duplicate of {describe_matches(similar['matches'])}")
+        if not inputs:
+            return
+        api_key = st.session_state.gemini_api_key
+        generator, evaluator = st.session_state.generator_model, st.session_state.evaluator_model
+
+        def workflow(user_inputs):
+            return run_workflow(api_key, generator, evaluator, prompts_config, user_inputs)
+
+        def generate_initial(items, size):
+            return agent_generate_initial_prompts(genai.GenerativeModel(generator), prompts_config, items, batch_size=size)
+
+        progress = st.progress(0.0, text=f"Generating initial packages ({run_settings['initial_batch_size']} per request)...")
+        results = fan_out(workflow, inputs, run_settings, on_result=library_saver(database_name), generate_initial=generate_initial)
+        for n, result in enumerate(results, start=1):
+            topic = result["user_inputs"]["topic"]
+            progress.progress(n / len(inputs), text=f"{n}/{len(inputs)} finished")
+            if result["status"] == "completed":
+                st.success(f"✅ {result['prompt_package'].get('topic', topic)}{' — saved to library' if result.get('saved') else ''}")
+            elif result["status"] == "skipped":
+                st.warning(f"⏭️ {topic}: {result['error']}")
+            else:
+                st.error(f"❌ {topic}: {result['error']}")
+
 
 def render_trend_engine(prompts_config: Dict[str, Any], database_name: str):
     st.header("📈 Trend Engine & Knowledge Base")
@@ -185,6 +263,8 @@ def render_trend_engine(prompts_config: Dict[str, Any], database_name: str):
         st.warning("Please enter your Gemini API Key in the sidebar to use the Trend Engine.")
         return
 
+    duplicate_threshold = prompts_config.get("kb_duplicate_threshold", DUPLICATE_THRESHOLD)
+
     # --- Section: Knowledge Base Status ---
     stored_data = get_all_market_data(database_name)
     with st.expander(f"📚 Manage Knowledge Base ({len(stored_data)} items saved)", expanded=False):
@@ -223,13 +303,13 @@ def render_trend_engine(prompts_config: Dict[str, Any], database_name: str):
             with col_d1:
                 # Save directly to KB
                 if st.button("💾 Save All to Knowledge Base", key="save_norm_kb"):
-                    count = 0 
-                    for item in st.session_state.normalized_data:
-                        # Convert item back to string format for storage 'content'
-                        content_str = f"Item: {item.get('content')} | Tags: {item.get('tags')}"
-                        save_market_data(database_name, content_str, source=item.get('source', 'Data Helper'))
-                        count += 1
-                    st.success(f"Saved {count} items to Knowledge Base!")
+                    # Convert items back to string format for storage 'content'
+                    items = [
+                        {"content": f"Item: {item.get('content')} | Tags: {item.get('tags')}", "source": item.get('source', 'Data Helper')}
+                        for item in st.session_state.normalized_data
+                    ]
+                    stats = save_market_data_bulk(database_name, items, threshold=duplicate_threshold)
+                    st.success(f"Saved {stats['inserted']} items to Knowledge Base! ({stats['merged']} near-duplicates merged, {stats['skipped']} skipped)")
                     st.session_state.normalized_data = None # Clear after save
                     st.rerun()
             with col_d2:
@@ -246,27 +326,22 @@ def render_trend_engine(prompts_config: Dict[str, Any], database_name: str):
     market_data_input = st.text_area("Paste Market Data / Trends Text", height=150, placeholder="Paste text here...", key="market_input")
     uploaded_file = st.file_uploader("Or upload file (TXT, MD, PDF, CSV, JSON)", type=["txt", "md", "pdf", "csv", "json"], key="market_file")
 
+    with st.expander("⚙️ Large File Options", expanded=False):
+        row_limit = st.number_input("Max pages / rows to read (0 = all)", min_value=0, value=0, step=100, key="ingest_row_limit")
+        sample_pct = st.slider("Sample % of pages / rows", min_value=1, max_value=100, value=100, key="ingest_sample_pct")
+    ingest_options = {
+        "row_limit": int(row_limit) or None,
+        "sample_rate": sample_pct / 100 if sample_pct < 100 else None
+    }
+
     current_text = market_data_input
     source_name = "Manual Input"
 
     if uploaded_file:
         source_name = uploaded_file.name
         try:
-            if uploaded_file.type == "application/pdf":
-                reader = PdfReader(uploaded_file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                current_text = text
-            elif uploaded_file.type == "text/csv" or uploaded_file.name.endswith('.csv'):
-                content = uploaded_file.read().decode("utf-8")
-                current_text = parse_csv_to_text(content)
-            elif uploaded_file.type == "application/json" or uploaded_file.name.endswith('.json'):
-                content = uploaded_file.read().decode("utf-8")
-                current_text = parse_json_to_text(content)
-            else:
-                # Fallback for txt/md
-                current_text = uploaded_file.read().decode("utf-8")
+            # Streamed and capped; the full file goes to the KB in chunks on save
+            current_text = read_file_text(uploaded_file, uploaded_file.name, uploaded_file.type, **ingest_options)
         except Exception as e:
             st.error(f"Error reading file: {e}")
             current_text = ""
@@ -275,12 +350,26 @@ def render_trend_engine(prompts_config: Dict[str, Any], database_name: str):
 
     with col_save:
         if st.button("💾 Save to Knowledge Base", use_container_width=True):
-            if not current_text:
+            if uploaded_file:
+                try:
+                    with st.spinner(f"Ingesting {uploaded_file.name}..."):
+                        result = ingest_file(database_name, uploaded_file, uploaded_file.name, uploaded_file.type, threshold=duplicate_threshold, **ingest_options)
+                    if result["skipped"]:
+                        st.info("This file is already in the Knowledge Base.")
+                    else:
+                        st.success(f"✅ Saved {result['chunks']} chunks ({result['unit']}) to Knowledge Base!")
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"Error ingesting file: {e}")
+            elif not current_text:
                 st.error("No content to save.")
             else:
-                save_market_data(database_name, current_text, source=source_name)
-                st.success("✅ Saved to Knowledge Base!")
-                st.rerun()
+                result = save_market_data(database_name, current_text, source=source_name, threshold=duplicate_threshold)
+                if result["status"] == "inserted":
+                    st.success("✅ Saved to Knowledge Base!")
+                    st.rerun()
+                else:
+                    st.info(f"Near-duplicate of an existing entry ({result['similarity']:.0%} similar) — merged its source instead of saving a copy.")
 
     with col_analyze:
         analyze_btn = st.button("🔮 Analyze Trends", type="primary", use_container_width=True)
@@ -486,6 +575,16 @@ def render_prompt_package(prompt: Dict[str, Any], database_name: str, show_save_
     else:
         st.info("No examples were generated for this prompt.")
 
+    if examples:
+        diversity = analyze_examples(examples, prompt.get("template", ""), resolve_diversity_settings(prompts_config))
+        st.caption(f"Example diversity: {diversity['score']:.2f} (1.00 = no shared wording)")
+        if diversity["duplicates"]:
+            st.warning(f"Examples {', '.join(str(i + 1) for i in diversity['duplicates'])} nearly duplicate earlier ones.")
+            if is_in_library and st.button(f"♻️ Regenerate {len(diversity['duplicates'])} near-duplicate example(s)", key=f"regen_duplicates_{prompt.get('id')}"):
+                st.session_state.updating_examples_prompt_id = prompt["id"]
+                st.session_state.update_action = ("regenerate_duplicates", diversity["duplicates"])
+                st.rerun()
+
     # --- Final Action Buttons ---
     if show_save_button:
         st.divider()
@@ -577,6 +676,8 @@ def render_prompt_library(database_name: str, prompts_config: Dict[str, Any]):
                 elif action == "complete":
                     target_total = detail
                     new_examples = agent_manage_examples(model, prompt_to_update, action="complete", target_total=target_total)
+                elif action == "regenerate_duplicates":
+                    new_examples = agent_manage_examples(model, prompt_to_update, action="regenerate_duplicates", example_indexes=detail)
                 
                 if isinstance(new_examples, list):
                     update_prompt_in_db(database_name, prompt_id_to_update, {"examples": new_examples})
@@ -597,6 +698,46 @@ def render_prompt_library(database_name: str, prompts_config: Dict[str, Any]):
         with st.expander(f"**{prompt['topic']}** ({prompt['content_type']} for {prompt['platform']})"):
             render_prompt_package(prompt, database_name, is_in_library=True, prompts_config=prompts_config)
 
+def render_published_catalog(page_size: int = 25):
+    """Browses the JSON packages in published/ through the indexed catalog."""
+    st.markdown("---")
+    st.subheader("📂 Published Files")
+    scan_directory()
+    facets = catalog_facets()
+
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+    search = col1.text_input("Search published files by topic...", "", key="catalog_search")
+    platform = col2.selectbox("Platform", [""] + facets["platform"], key="catalog_platform")
+    category = col3.selectbox("Category", [""] + facets["category"], key="catalog_category")
+    sort = col4.selectbox("Sort by", ["mtime", "topic", "variables", "size"], key="catalog_sort")
+
+    _, total = query_catalog(search=search, platform=platform, category=category, limit=0)
+    if not total:
+        st.info("No published files match.")
+        return
+    pages = (total + page_size - 1) // page_size
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="catalog_page")
+    rows, _ = query_catalog(
+        search=search, platform=platform, category=category, sort=sort,
+        descending=sort in ("mtime", "variables", "size"), limit=page_size, offset=(page - 1) * page_size
+    )
+    st.markdown(f"Showing **{len(rows)}** of **{total}** published files.")
+    st.dataframe(
+        [{k: r[k] for k in ("topic", "platform", "category", "variable_count", "size", "path")} for r in rows],
+        use_container_width=True
+    )
+
+    # Thumbnails come from the cache; full-size previews are never decoded here
+    if st.checkbox("Show thumbnails", key="catalog_thumbnails"):
+        columns = st.columns(5)
+        for i, row in enumerate(rows):
+            thumb = package_thumbnail(os.path.join(OUTPUT_DIR, row["path"]))
+            with columns[i % 5]:
+                if thumb:
+                    st.image(thumb, caption=row["topic"], use_container_width=True)
+                else:
+                    st.caption(f"{row['topic']} (no images)")
+
 def render_guidelines():
     st.header("📄 PromptBase Submission Guidelines")
     st.markdown("""
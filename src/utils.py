@@ -1,18 +1,49 @@
 import sqlite3
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import copy
 import json
-import streamlit as st
 import logging
 import yaml
 import os
 from datetime import datetime
 
+from .dedup import (
+    DUPLICATE_THRESHOLD,
+    text_signature,
+    content_hash,
+    estimate_similarity,
+    lsh_buckets,
+    pack_signature,
+    unpack_signature
+)
+from . import library_index
+
 logger = logging.getLogger(__name__)
 import io
 import csv
 
 # --- Parsing Utils ---
 
+def format_csv_row(index: int, row: Dict[str, Any]) -> str:
+    """Formats a single CSV row (0-based index) as a compact 'Entry N' line."""
+    # e.g. "Entry 1: Title='Foo', Category='Bar'"
+    row_str = ", ".join(f"{k}='{v}'" for k, v in row.items() if v)
+    return f"Entry {index + 1}: {row_str}"
+
+def format_json_item(index: int, item: Any) -> str:
+    """Formats a single element of a top-level JSON list as an 'Item N' line."""
+    if isinstance(item, dict):
+        # Flat string for dict items
+        item_str = ", ".join(f"{k}='{v}'" for k, v in item.items() if isinstance(v, (str, int, float, bool)))
+        return f"Item {index + 1}: {item_str}"
+    return f"Item {index + 1}: {str(item)}"
+
+def format_json_field(key: str, value: Any) -> str:
+    """Formats a single key/value pair of a top-level JSON object."""
+    if isinstance(value, list):
+        return f"Category '{key}': {', '.join(map(str, value))}"
+    return f"{key}: {value}"
+
 def parse_csv_to_text(file_content: str) -> str:
     """
     Parses a CSV string into a readable text format for LLM context.
@@ -28,10 +59,7 @@ def parse_csv_to_text(file_content: str) -> str:
              return "Error: CSV appears empty or malformed."
 
         for i, row in enumerate(reader):
-            # Create a compact string representation of the row
-            # e.g. "Item 1: Title='Foo', Category='Bar'"
-            row_str = ", ".join(f"{k}='{v}'" for k, v in row.items() if v)
-            output_lines.append(f"Entry {i+1}: {row_str}")
+            output_lines.append(format_csv_row(i, row))
         
         return "\n".join(output_lines)
     except Exception as e:
@@ -49,18 +77,10 @@ def parse_json_to_text(file_content: str) -> str:
 
         if isinstance(data, list):
             for i, item in enumerate(data):
-                if isinstance(item, dict):
-                    # Flat string for dict items
-                    item_str = ", ".join(f"{k}='{v}'" for k, v in item.items() if isinstance(v, (str, int, float, bool)))
-                    output_lines.append(f"Item {i+1}: {item_str}")
-                else:
-                    output_lines.append(f"Item {i+1}: {str(item)}")
+                output_lines.append(format_json_item(i, item))
         elif isinstance(data, dict):
             for k, v in data.items():
-                if isinstance(v, list):
-                    output_lines.append(f"Category '{k}': {', '.join(map(str, v))}")
-                else:
-                    output_lines.append(f"{k}: {v}")
+                output_lines.append(format_json_field(k, v))
         else:
             return str(data)
 
@@ -90,15 +110,21 @@ def save_output_to_json(data: Dict[str, Any], prefix: str) -> str:
         logger.error(f"Failed to save output to JSON file: {e}", exc_info=True)
         return ""
 
+_config_cache: Dict[Tuple[Tuple[str, float], ...], Dict[str, Any]] = {}
+
 def load_config(config_files: List[str]) -> Dict[str, Any]:
-    """Load configuration from multiple YAML files."""
+    """Load configuration from multiple YAML files (parsed once per file modification)."""
     config = {}
     try:
+        cache_key = tuple((os.path.abspath(file), os.path.getmtime(file)) for file in config_files)
+        if cache_key in _config_cache:
+            return copy.deepcopy(_config_cache[cache_key])
         for file in config_files:
             with open(file, 'r', encoding='utf-8') as f:
                 config_data = yaml.safe_load(f)
                 if config_data:
                     config.update(config_data)
+        _config_cache[cache_key] = copy.deepcopy(config)
         logger.info(f"Configuration loaded successfully from: {', '.join(config_files)}")
         return config
     except FileNotFoundError as e:
@@ -111,6 +137,13 @@ def load_config(config_files: List[str]) -> Dict[str, Any]:
         logger.error(f"Unexpected error loading configuration: {e}")
         raise
 
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """Adds a column to an existing table if it is missing (lightweight migration)."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added column '{column}' to table '{table}'.")
+
 def initialize_database(database_name: str):
     """Initializes the database and creates the prompts table if it doesn't exist."""
     try:
@@ -134,6 +167,15 @@ def initialize_database(database_name: str):
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            # Labels and listing copy used to train the local categorizer
+            _ensure_column(cursor, "prompts", "category", "TEXT")
+            _ensure_column(cursor, "prompts", "description", "TEXT")
+
+            # Library similarity index: request/template signatures + LSH band index
+            _ensure_column(cursor, "prompts", "request_signature", "BLOB")
+            _ensure_column(cursor, "prompts", "template_signature", "BLOB")
+            library_index.create_tables(cursor)
+            library_index.backfill(cursor)
             
             # New table for Market Data Knowledge Base
             cursor.execute("""
@@ -145,31 +187,282 @@ def initialize_database(database_name: str):
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            # Chunks ingested from uploaded files point back to their source file
+            _ensure_column(cursor, "market_data", "file_hash", "TEXT")
+
+            # Near-duplicate detection: MinHash signature + LSH band index
+            _ensure_column(cursor, "market_data", "content_hash", "TEXT")
+            _ensure_column(cursor, "market_data", "signature", "BLOB")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS market_data_lsh (
+                    band INTEGER NOT NULL,
+                    bucket TEXT NOT NULL,
+                    content_hash TEXT NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_data_lsh ON market_data_lsh (band, bucket)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_data_content_hash ON market_data (content_hash)")
+            _backfill_market_signatures(cursor)
+
+            # Registry of uploaded files already streamed into the Knowledge Base
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ingested_files (
+                    file_hash TEXT PRIMARY KEY,
+                    filename TEXT,
+                    chunk_count INTEGER,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
             conn.commit()
             logger.info("Database initialized successfully.")
     except sqlite3.Error as e:
         logger.error(f"Database initialization error: {e}", exc_info=True)
         raise
 
-def save_market_data(database_name: str, content: str, source: str = "manual", tags: str = ""):
-    """Saves market trend data to the Knowledge Base."""
+def _backfill_market_signatures(cursor: sqlite3.Cursor):
+    """Signs Knowledge Base rows stored before near-duplicate detection existed."""
+    cursor.execute("SELECT id, content FROM market_data WHERE signature IS NULL")
+    rows = cursor.fetchall()
+    for row_id, content in rows:
+        signature = text_signature(content)
+        chash = content_hash(content)
+        cursor.execute(
+            "UPDATE market_data SET content_hash = ?, signature = ? WHERE id = ?",
+            (chash, pack_signature(signature), row_id)
+        )
+        cursor.executemany(
+            "INSERT INTO market_data_lsh (band, bucket, content_hash) VALUES (?, ?, ?)",
+            [(band, bucket, chash) for band, bucket in lsh_buckets(signature)]
+        )
+    if rows:
+        logger.info(f"Backfilled signatures for {len(rows)} market data entries.")
+
+def _find_near_duplicate(cursor: sqlite3.Cursor, signature: List[int], chash: str, threshold: float) -> Optional[Tuple[int, float]]:
+    """Returns (id, similarity) of the closest stored entry at or above `threshold`, if any."""
+    cursor.execute("SELECT id FROM market_data WHERE content_hash = ? LIMIT 1", (chash,))
+    exact = cursor.fetchone()
+    if exact:
+        return exact[0], 1.0
+
+    buckets = lsh_buckets(signature)
+    clause = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+    cursor.execute(f"""
+        SELECT id, signature FROM market_data
+        WHERE content_hash IN (SELECT content_hash FROM market_data_lsh WHERE {clause})
+    """, [value for pair in buckets for value in pair])
+
+    best = None
+    for row_id, blob in cursor.fetchall():
+        if not blob:
+            continue
+        similarity = estimate_similarity(signature, unpack_signature(blob))
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (row_id, similarity)
+    return best
+
+def _merge_labels(existing: Optional[str], new: Optional[str], separator: str) -> str:
+    """Appends labels from `new` that are not already present in `existing`."""
+    labels = [label.strip() for label in (existing or "").split(separator) if label.strip()]
+    for label in (new or "").split(separator):
+        if label.strip() and label.strip() not in labels:
+            labels.append(label.strip())
+    return separator.join(labels)
+
+def _merge_market_data(cursor: sqlite3.Cursor, data_id: int, source: str, tags: str):
+    """Folds the source/tags of a rejected near-duplicate into the stored entry."""
+    cursor.execute("SELECT source, tags FROM market_data WHERE id = ?", (data_id,))
+    old_source, old_tags = cursor.fetchone()
+    cursor.execute(
+        "UPDATE market_data SET source = ?, tags = ? WHERE id = ?",
+        (_merge_labels(old_source, source, "; "), _merge_labels(old_tags, tags, ", "), data_id)
+    )
+
+def _insert_market_data(cursor: sqlite3.Cursor, content: str, source: str, tags: str, signature: List[int], chash: str, file_hash: Optional[str] = None) -> int:
+    cursor.execute(
+        "INSERT INTO market_data (content, source, tags, file_hash, content_hash, signature) VALUES (?, ?, ?, ?, ?, ?)",
+        (content, source, tags, file_hash, chash, pack_signature(signature))
+    )
+    cursor.executemany(
+        "INSERT INTO market_data_lsh (band, bucket, content_hash) VALUES (?, ?, ?)",
+        [(band, bucket, chash) for band, bucket in lsh_buckets(signature)]
+    )
+    return cursor.lastrowid
+
+def save_market_data(
+    database_name: str,
+    content: str,
+    source: str = "manual",
+    tags: str = "",
+    on_duplicate: str = "merge",
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Dict[str, Any]:
+    """
+    Saves market trend data to the Knowledge Base, rejecting near-duplicates.
+
+    Args:
+        on_duplicate: 'merge' folds source/tags into the existing entry,
+            'skip' drops the new entry, 'insert' stores it anyway.
+        threshold: Estimated Jaccard similarity at which entries count as duplicates.
+
+    Returns:
+        dict: {'status': 'inserted'|'merged'|'skipped', 'id': int, 'similarity': float}
+    """
+    signature = text_signature(content)
+    chash = content_hash(content)
     try:
         with sqlite3.connect(database_name) as conn:
             cursor = conn.cursor()
-            cursor.execute("INSERT INTO market_data (content, source, tags) VALUES (?, ?, ?)", (content, source, tags))
+            duplicate = None if on_duplicate == "insert" else _find_near_duplicate(cursor, signature, chash, threshold)
+            if duplicate:
+                data_id, similarity = duplicate
+                if on_duplicate == "merge":
+                    _merge_market_data(cursor, data_id, source, tags)
+                conn.commit()
+                status = "merged" if on_duplicate == "merge" else "skipped"
+                logger.info(f"Market data from '{source}' {status} as near-duplicate of ID {data_id} ({similarity:.2f})")
+                return {"status": status, "id": data_id, "similarity": similarity}
+
+            data_id = _insert_market_data(cursor, content, source, tags, signature, chash)
             conn.commit()
             logger.info(f"Market data saved from source: {source}")
+            return {"status": "inserted", "id": data_id, "similarity": 0.0}
     except sqlite3.Error as e:
         logger.error(f"Error saving market data: {e}", exc_info=True)
         raise
 
+def save_market_data_bulk(
+    database_name: str,
+    items: List[Dict[str, Any]],
+    on_duplicate: str = "merge",
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Dict[str, int]:
+    """
+    Saves many Knowledge Base entries in one transaction with `executemany`.
+    Near-duplicates are detected against stored entries and within the batch itself.
+
+    Args:
+        items: Dicts with 'content' and optional 'source' / 'tags'.
+        on_duplicate: 'merge' or 'skip' (see `save_market_data`).
+
+    Returns:
+        dict: Counts of 'inserted', 'merged' and 'skipped' items.
+    """
+    stats = {"inserted": 0, "merged": 0, "skipped": 0}
+    rows: List[list] = []
+    lsh_rows: List[Tuple[int, str, str]] = []
+    batch_signatures: List[List[int]] = []
+    batch_buckets: Dict[Tuple[int, str], List[int]] = {}
+
+    try:
+        with sqlite3.connect(database_name) as conn:
+            cursor = conn.cursor()
+            for item in items:
+                content = item.get("content")
+                if not content:
+                    stats["skipped"] += 1
+                    continue
+                source = item.get("source", "manual")
+                tags = item.get("tags", "")
+                signature = text_signature(content)
+                chash = content_hash(content)
+                buckets = lsh_buckets(signature)
+
+                # Duplicate of an earlier item in this same batch?
+                candidates = {i for key in buckets for i in batch_buckets.get(key, [])}
+                in_batch = next((i for i in sorted(candidates) if estimate_similarity(signature, batch_signatures[i]) >= threshold), None)
+                if in_batch is not None:
+                    if on_duplicate == "merge":
+                        rows[in_batch][1] = _merge_labels(rows[in_batch][1], source, "; ")
+                        rows[in_batch][2] = _merge_labels(rows[in_batch][2], tags, ", ")
+                        stats["merged"] += 1
+                    else:
+                        stats["skipped"] += 1
+                    continue
+
+                duplicate = _find_near_duplicate(cursor, signature, chash, threshold)
+                if duplicate:
+                    if on_duplicate == "merge":
+                        _merge_market_data(cursor, duplicate[0], source, tags)
+                        stats["merged"] += 1
+                    else:
+                        stats["skipped"] += 1
+                    continue
+
+                for key in buckets:
+                    batch_buckets.setdefault(key, []).append(len(rows))
+                batch_signatures.append(signature)
+                rows.append([content, source, tags, chash, pack_signature(signature)])
+                lsh_rows.extend((band, bucket, chash) for band, bucket in buckets)
+
+            cursor.executemany(
+                "INSERT INTO market_data (content, source, tags, content_hash, signature) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            cursor.executemany(
+                "INSERT INTO market_data_lsh (band, bucket, content_hash) VALUES (?, ?, ?)",
+                lsh_rows
+            )
+            conn.commit()
+            stats["inserted"] = len(rows)
+            logger.info(f"Bulk market data save: {stats}")
+            return stats
+    except sqlite3.Error as e:
+        logger.error(f"Error bulk saving market data: {e}", exc_info=True)
+        raise
+
+def is_file_ingested(database_name: str, file_hash: str) -> bool:
+    """Checks whether an uploaded file (by content hash) is already in the Knowledge Base."""
+    try:
+        with sqlite3.connect(database_name) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM ingested_files WHERE file_hash = ?", (file_hash,))
+            return cursor.fetchone() is not None
+    except sqlite3.Error as e:
+        logger.error(f"Error checking ingested files: {e}", exc_info=True)
+        return False
+
+def save_market_data_chunks(database_name: str, chunks: Iterable[Dict[str, Any]], filename: str, file_hash: str, threshold: float = DUPLICATE_THRESHOLD, register: bool = True) -> int:
+    """
+    Streams chunk records into the Knowledge Base over a single connection and
+    registers the source file so it is not ingested twice (`register=False` for
+    partial ingests, which must not block a later full one).
+    Each chunk is a dict with 'content', 'unit' ('pages'/'rows'/'items'), 'start' and 'end'.
+    Chunks that near-duplicate stored entries are skipped.
+    Returns the number of chunks written.
+    """
+    count = 0
+    skipped = 0
+    try:
+        with sqlite3.connect(database_name) as conn:
+            cursor = conn.cursor()
+            for chunk in chunks:
+                source = f"{filename} ({chunk['unit']} {chunk['start']}-{chunk['end']})"
+                signature = text_signature(chunk["content"])
+                chash = content_hash(chunk["content"])
+                if _find_near_duplicate(cursor, signature, chash, threshold):
+                    skipped += 1
+                    continue
+                _insert_market_data(cursor, chunk["content"], source, chunk["unit"], signature, chash, file_hash)
+                count += 1
+            if register:
+                cursor.execute(
+                    "INSERT OR REPLACE INTO ingested_files (file_hash, filename, chunk_count) VALUES (?, ?, ?)",
+                    (file_hash, filename, count)
+                )
+            conn.commit()
+            logger.info(f"Ingested {count} chunks from file: {filename} ({skipped} near-duplicates skipped)")
+            return count
+    except sqlite3.Error as e:
+        logger.error(f"Error saving market data chunks: {e}", exc_info=True)
+        raise
+
 def get_all_market_data(database_name: str) -> List[Dict[str, Any]]:
     """Fetches all market data entries."""
     try:
         with sqlite3.connect(database_name) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM market_data ORDER BY created_at DESC")
+            cursor.execute("SELECT id, content, source, tags, file_hash, created_at FROM market_data ORDER BY created_at DESC")
             return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         logger.error(f"Error fetching market data: {e}", exc_info=True)
@@ -181,6 +474,15 @@ def delete_market_data(database_name: str, data_id: int):
         with sqlite3.connect(database_name) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM market_data WHERE id = ?", (data_id,))
+            # Forget files whose chunks are all gone so they can be uploaded again
+            cursor.execute("""
+                DELETE FROM ingested_files
+                WHERE file_hash NOT IN (SELECT file_hash FROM market_data WHERE file_hash IS NOT NULL)
+            """)
+            cursor.execute("""
+                DELETE FROM market_data_lsh
+                WHERE content_hash NOT IN (SELECT content_hash FROM market_data WHERE content_hash IS NOT NULL)
+            """)
             conn.commit()
             logger.info(f"Deleted market data ID: {data_id}")
     except sqlite3.Error as e:
@@ -201,7 +503,9 @@ def save_prompt_to_db(database_name: str, prompt_data: Dict[str, Any]):
         "examples": prompt_data.get("examples", []),
         "tips": prompt_data.get("tips", []),
         "validation": prompt_data.get("validation", {}),
-        "test_guidance": prompt_data.get("test_guidance", {})
+        "test_guidance": prompt_data.get("test_guidance", {}),
+        "category": prompt_data.get("category"),
+        "description": prompt_data.get("commercial_description") or prompt_data.get("description", "")
     }
     try:
         with sqlite3.connect(database_name) as conn:
@@ -209,8 +513,9 @@ def save_prompt_to_db(database_name: str, prompt_data: Dict[str, Any]):
             cursor.execute("""
                 INSERT INTO prompts (
                     topic, content_type, platform, style, use_case, template,
-                    variables, variable_explanations, examples, tips, validation, test_guidance
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    variables, variable_explanations, examples, tips, validation, test_guidance,
+                    category, description
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 prompt_data_with_defaults["topic"],
                 prompt_data_with_defaults["content_type"],
@@ -223,8 +528,11 @@ def save_prompt_to_db(database_name: str, prompt_data: Dict[str, Any]):
                 json.dumps(prompt_data_with_defaults["examples"]),
                 json.dumps(prompt_data_with_defaults["tips"]),
                 json.dumps(prompt_data_with_defaults["validation"]),
-                json.dumps(prompt_data_with_defaults["test_guidance"])
+                json.dumps(prompt_data_with_defaults["test_guidance"]),
+                prompt_data_with_defaults["category"],
+                prompt_data_with_defaults["description"]
             ))
+            library_index.index_prompt(cursor, cursor.lastrowid, prompt_data_with_defaults)
             conn.commit()
             logger.info("Prompt saved successfully.")
     except sqlite3.Error as e:
@@ -256,12 +564,33 @@ def update_prompt_in_db(database_name: str, prompt_id: int, updates: Dict[str, A
             sql = f"UPDATE prompts SET {', '.join(set_clause)} WHERE id = ?"
             
             cursor.execute(sql, tuple(values))
+            if set(updates) & set(library_index.REQUEST_FIELDS + ("template",)):
+                cursor.execute("SELECT topic, style, use_case, template FROM prompts WHERE id = ?", (prompt_id,))
+                row = cursor.fetchone()
+                if row:
+                    library_index.index_prompt(cursor, prompt_id, dict(zip(("topic", "style", "use_case", "template"), row)))
             conn.commit()
             logger.info(f"Prompt ID {prompt_id} updated successfully with keys: {list(updates.keys())}")
     except sqlite3.Error as e:
         logger.error(f"Database update error for prompt ID {prompt_id}: {e}", exc_info=True)
         raise
 
+def get_categorized_prompts(database_name: str) -> List[Dict[str, Any]]:
+    """Fetches the text fields and category label of every categorized prompt."""
+    try:
+        with sqlite3.connect(database_name) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, topic, style, use_case, template, description, category FROM prompts
+                WHERE category IS NOT NULL AND category != '' AND category != 'Uncategorized'
+                ORDER BY id
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error fetching categorized prompts: {e}", exc_info=True)
+        return []
+
 def get_all_prompts_from_db(database_name: str) -> List[Dict[str, Any]]:
     """Fetches all prompts from the SQLite database and deserializes JSON fields."""
     try:
@@ -273,6 +602,9 @@ def get_all_prompts_from_db(database_name: str) -> List[Dict[str, Any]]:
             prompts = []
             for row in rows:
                 prompt_dict = dict(row)
+                # Similarity index internals, not part of the package
+                prompt_dict.pop("request_signature", None)
+                prompt_dict.pop("template_signature", None)
                 # Deserialize JSON fields
                 for key in ["variables", "variable_explanations", "examples", "tips", "validation", "test_guidance"]:
                     if prompt_dict[key] and isinstance(prompt_dict[key], str):
@@ -284,6 +616,5 @@ def get_all_prompts_from_db(database_name: str) -> List[Dict[str, Any]]:
                 prompts.append(prompt_dict)
             return prompts
     except sqlite3.Error as e:
-        st.error(f"Error fetching prompts from database: {e}")
-        logger.error(f"Database Error: {e}", exc_info=True)
+        logger.error(f"Error fetching prompts from database: {e}", exc_info=True)
         return []
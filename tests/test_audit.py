@@ -0,0 +1,83 @@
+"""
+Test suite for the library-wide audit.
+
+Following @test-agent guidelines:
+- Use temporary directories and databases, never the real library
+- No API calls (the audit is local only)
+"""
+
+import json
+import os
+
+import pytest
+
+GOOD = {
+    "topic": "Cinematic Neon Portrait Art",
+    "template": "A [SUBJECT] in [SETTING] with [LIGHTING] and [PALETTE]",
+    "variables": ["SUBJECT", "SETTING", "LIGHTING", "PALETTE"],
+    "examples": [f"Example {i}" for i in range(7)] + ["A sense of forgotten history", "The weight of time"]
+}
+BAD = {"topic": "Cat", "template": "A [CAT] photo", "variables": ["DOG"], "examples": ["one"]}
+
+
+@pytest.fixture
+def library(tmp_path):
+    """A published/ directory with one passing and one failing package."""
+    directory = tmp_path / "published"
+    directory.mkdir()
+    (directory / "good.json").write_text(json.dumps(GOOD), encoding="utf-8")
+    (directory / "bad.json").write_text(json.dumps(BAD), encoding="utf-8")
+    (directory / "notes.txt").write_text("ignored", encoding="utf-8")
+    return directory
+
+
+class TestAudit:
+    """Test suite for audit checks and incremental runs."""
+
+    def test_audit_package_checks(self):
+        """Each validator should surface as a named finding."""
+        from src.audit import audit_package
+
+        assert audit_package(GOOD) == []
+        checks = {f["check"] for f in audit_package(BAD)}
+        assert checks == {"title_pattern", "example_count", "abstract_examples", "variable_count", "variable_consistency"}
+
+    def test_run_audit_and_incremental(self, library, tmp_path):
+        """Second run should skip unchanged files but keep them in the summary."""
+        from src.audit import run_audit
+
+        state = str(tmp_path / "state.json")
+        output = str(tmp_path / "findings.jsonl")
+
+        first = run_audit(str(library), output, workers=2, state_path=state)
+        records = [json.loads(line) for line in open(output, encoding="utf-8")]
+        assert first["total"] == 2 and first["audited"] == 2
+        assert first["passed"] == 1 and first["by_check"]["variable_count"] == 1
+        assert {os.path.basename(r["key"]): r["ok"] for r in records} == {"good.json": True, "bad.json": False}
+
+        (library / "bad.json").write_text(json.dumps(dict(BAD, topic="Cat v2")), encoding="utf-8")
+        second = run_audit(str(library), output, workers=1, state_path=state)
+        assert second["audited"] == 1 and second["skipped_unchanged"] == 1
+        assert second["failed"] == 1 and second["total"] == 2
+
+    def test_audit_database(self, tmp_path):
+        """Rows of the prompts table should be audited with JSON fields decoded."""
+        from src.audit import run_audit
+        from src.utils import initialize_database, save_prompt_to_db
+
+        db = str(tmp_path / "library.db")
+        initialize_database(db)
+        save_prompt_to_db(db, GOOD)
+
+        summary = run_audit(db, str(tmp_path / "out.jsonl"), workers=1, state_path=str(tmp_path / "s.json"))
+        assert summary == dict(summary, total=1, passed=1, failed=0)
+
+    def test_rules_version_tracks_vocabularies(self, monkeypatch):
+        """Editing a title/abstract vocabulary should invalidate audit state; reordering it should not."""
+        from src import audit
+
+        monkeypatch.setattr(audit, "FORMAT_TYPES", list(reversed(audit.FORMAT_TYPES)))
+        assert audit.rules_version() == audit.RULES_VERSION
+
+        monkeypatch.setattr(audit, "DESCRIPTORS", audit.DESCRIPTORS + ["gritty"])
+        assert audit.rules_version() != audit.RULES_VERSION
@@ -0,0 +1,77 @@
+"""
+Test suite for the published package catalog.
+
+Following @test-agent guidelines:
+- Use temporary directories, never the real published/ folder
+"""
+
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def published(tmp_path):
+    """A published/ directory with three packages."""
+    packages = {
+        "a.json": {"topic": "Cinematic Portraits", "platform": "Midjourney", "category": "Portraits", "variables": ["A", "B", "C", "D"]},
+        "b.json": {"topic": "Vintage Travel Posters", "platform": "DALL-E 3", "template": "A [CITY] poster in [STYLE]"},
+        "c.json": {"topic": "Kawaii Stickers", "platform": "Midjourney", "category": "Stickers", "variables": ["X"]},
+    }
+    for i, (name, data) in enumerate(packages.items()):
+        path = tmp_path / name
+        path.write_text(json.dumps(data), encoding="utf-8")
+        os.utime(path, (1000 + i, 1000 + i))
+    return tmp_path
+
+
+class TestCatalog:
+    """Test suite for incremental scanning and catalog queries."""
+
+    def test_incremental_scan(self, published):
+        """Only changed files should be re-read; deletions should be removed."""
+        from src.catalog import scan_directory
+
+        assert scan_directory(str(published)) == {"added": 3, "updated": 0, "unchanged": 0, "removed": 0}
+        assert scan_directory(str(published))["unchanged"] == 3
+
+        # Touched but identical content counts as unchanged
+        os.utime(published / "a.json", (5000, 5000))
+        (published / "b.json").write_text(json.dumps({"topic": "Retro Travel Posters"}), encoding="utf-8")
+        os.remove(published / "c.json")
+        assert scan_directory(str(published)) == {"added": 0, "updated": 1, "unchanged": 1, "removed": 1}
+
+    def test_query_filter_sort_paginate(self, published):
+        """Filtering, sorting and pagination should be answered by the catalog."""
+        from src.catalog import scan_directory, query_catalog
+
+        scan_directory(str(published))
+
+        rows, total = query_catalog(str(published), limit=2)
+        assert total == 3 and [r["path"] for r in rows] == ["c.json", "b.json"]
+
+        rows, _ = query_catalog(str(published), limit=2, offset=2)
+        assert [r["path"] for r in rows] == ["a.json"]
+
+        rows, total = query_catalog(str(published), platform="midjourney", sort="topic", descending=False)
+        assert total == 2 and [r["topic"] for r in rows] == ["Cinematic Portraits", "Kawaii Stickers"]
+
+        rows, _ = query_catalog(str(published), search="travel")
+        assert rows[0]["variable_count"] == 2
+
+        _, total = query_catalog(str(published), min_variables=2)
+        assert total == 2
+
+        with pytest.raises(ValueError):
+            query_catalog(str(published), sort="path; DROP TABLE packages")
+
+    def test_missing_directory_is_an_empty_catalog(self, tmp_path):
+        """Before anything is published, scans, queries and facets return nothing instead of failing."""
+        from src.catalog import scan_directory, query_catalog, catalog_facets
+
+        missing = str(tmp_path / "published")
+        assert scan_directory(missing) == {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        assert query_catalog(missing) == ([], 0)
+        assert catalog_facets(missing) == {"platform": [], "category": []}
+        assert not os.path.exists(missing)
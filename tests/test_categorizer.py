@@ -0,0 +1,95 @@
+"""
+Test suite for the local category classifier.
+
+Following @test-agent guidelines:
+- Train on small synthetic libraries, no real database
+- Mock external API calls (Gemini) in unit tests
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+CATEGORIES = ["Logos & Icons", "Portraits", "Landscapes"]
+
+
+def _rows():
+    subjects = {
+        "Logos & Icons": ["minimal logo mark vector icon brand emblem", "flat icon set badge logo monogram"],
+        "Portraits": ["cinematic portrait face headshot lighting", "character portrait close-up face expression"],
+        "Landscapes": ["mountain landscape valley sunrise scenery", "coastal landscape cliffs ocean horizon scenery"],
+    }
+    rows = []
+    for category, texts in subjects.items():
+        for i in range(6):
+            rows.append({
+                "topic": f"{texts[i % 2]} {i}",
+                "template": f"A [STYLE] {texts[(i + 1) % 2]} with [COLOR] and [MOOD]",
+                "category": category
+            })
+    return rows
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """Train on the synthetic library and save the model to a temp file."""
+    from src.categorizer import train_from_rows
+
+    result = train_from_rows(_rows(), holdout=0.25)
+    path = str(tmp_path / "classifier.npz")
+    result["classifier"].save(path)
+    return path
+
+
+class TestCategorizer:
+    """Test suite for the naive Bayes categorizer."""
+
+    def test_training_report(self):
+        """Training should report per-category counts and accuracies."""
+        from src.categorizer import train_from_rows
+
+        result = train_from_rows(_rows(), holdout=0.25)
+
+        assert result["samples"] == 18
+        assert result["label_counts"] == {c: 6 for c in CATEGORIES}
+        assert result["training_accuracy"] == 1.0
+        assert 0.0 <= result["holdout_accuracy"] <= 1.0
+
+    def test_classify_confident(self, model_path):
+        """Saved model should predict the matching category with a confidence."""
+        from src.categorizer import classify_package
+
+        category, confidence = classify_package(
+            {"topic": "Geometric Logo Icon Pack", "template": "A vector [SUBJECT] logo emblem"},
+            CATEGORIES,
+            path=model_path
+        )
+
+        assert category == "Logos & Icons"
+        assert 0.5 < confidence <= 1.0
+
+    def test_unknown_label_or_missing_model(self, model_path, tmp_path):
+        """Predictions outside the category list and untrained models return None."""
+        from src.categorizer import classify_package
+
+        assert classify_package({"topic": "logo icon"}, ["Portraits", "Landscapes"], path=model_path) is None
+        assert classify_package({"topic": "logo icon"}, CATEGORIES, path=str(tmp_path / "missing.npz")) is None
+
+    def test_agent_falls_back_to_llm(self, monkeypatch):
+        """Below the confidence threshold the agent should ask the LLM."""
+        import src.api_handler as api_handler
+
+        config = {
+            "agent_categorize_prompt": "{prompt_title}{prompt_description}{prompt_template}{category_list}",
+            "prompt_categories": CATEGORIES,
+            "categorizer": {"confidence_threshold": 0.9}
+        }
+        model = MagicMock()
+
+        monkeypatch.setattr(api_handler, "classify_package", lambda package, categories: ("Portraits", 0.95))
+        assert api_handler.agent_categorize_prompt(model, config, {"topic": "x"}) == "Portraits"
+        model.generate_content.assert_not_called()
+
+        monkeypatch.setattr(api_handler, "classify_package", lambda package, categories: ("Portraits", 0.5))
+        monkeypatch.setattr(api_handler, "_generate_response", lambda m, p, **kwargs: {"text": "Landscapes"})
+        assert api_handler.agent_categorize_prompt(model, config, {"topic": "x"}) == "Landscapes"
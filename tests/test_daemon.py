@@ -0,0 +1,89 @@
+"""
+Test suite for the warm CLI daemon.
+
+Following @test-agent guidelines:
+- A throwaway click group on a temporary socket; no real commands run
+- The daemon thread is always stopped, even when an assertion fails
+"""
+
+import os
+import threading
+
+import click
+import pytest
+
+
+@click.group()
+def fake_cli():
+    pass
+
+
+@fake_cli.command()
+@click.argument("name")
+def greet(name):
+    click.echo(f"hello {name}")
+    click.echo("careful", err=True)
+
+
+@fake_cli.command()
+def fail():
+    raise click.ClickException("boom")
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """A daemon serving fake_cli, running on a background thread."""
+    from src.daemon import Daemon, stop
+
+    server = Daemon(fake_cli, path=str(tmp_path / "d.sock"))
+    ready = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"ready": ready.set}, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield server
+    stop(server.path)
+    thread.join(5)
+
+
+class TestDaemon:
+    """Test suite for forwarding commands to the daemon."""
+
+    def test_forward_relays_output_and_exit_code(self, daemon, capsys):
+        """Forwarded commands stream stdout/stderr back and return the command's exit code."""
+        from src.daemon import forward, status
+
+        assert forward(["greet", "ada"], daemon.path) == 0
+        captured = capsys.readouterr()
+        assert captured.out == "hello ada\n"
+        assert "careful" in captured.err
+
+        assert forward(["fail"], daemon.path) == 1
+        assert "boom" in capsys.readouterr().err
+        assert status(daemon.path)["requests"] == 2
+
+    def test_other_working_directory_falls_back(self, daemon, tmp_path, monkeypatch):
+        """Requests from another cwd are declined so relative paths stay correct."""
+        from src.daemon import forward
+
+        monkeypatch.chdir(tmp_path)
+        assert forward(["greet", "ada"], daemon.path) is None
+
+    def test_no_daemon_runs_in_process(self, tmp_path, monkeypatch):
+        """Without a listening daemon (or with it disabled) the CLI runs the command itself."""
+        from src.daemon import forward, DISABLE_ENV
+
+        assert forward(["greet", "ada"], str(tmp_path / "missing.sock")) is None
+        monkeypatch.setenv(DISABLE_ENV, "1")
+        assert forward(["greet", "ada"], str(tmp_path / "missing.sock")) is None
+
+    def test_stop_removes_socket(self, daemon):
+        """Stopping the daemon shuts it down and removes its socket file."""
+        from src.daemon import stop, status
+
+        assert stop(daemon.path)
+        for _ in range(50):
+            if not os.path.exists(daemon.path):
+                break
+            threading.Event().wait(0.05)
+        assert not os.path.exists(daemon.path)
+        assert status(daemon.path) is None
@@ -0,0 +1,91 @@
+"""
+Test suite for Knowledge Base near-duplicate detection.
+
+Following @test-agent guidelines:
+- Use pytest.fixture for test setup/teardown
+- Isolate database state with a temporary SQLite file
+"""
+
+import pytest
+
+REPORT = (
+    "Top selling prompts this week include vintage travel posters, kawaii sticker sheets, "
+    "watercolor botanical illustrations and cyberpunk city wallpapers. Buyers favour bold "
+    "colour palettes and templates that work for print on demand products."
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Provide an initialized temporary database."""
+    from src.utils import initialize_database
+
+    db_path = str(tmp_path / "test.db")
+    initialize_database(db_path)
+    return db_path
+
+
+class TestSignatures:
+    """Test suite for MinHash signatures."""
+
+    def test_near_copies_score_high(self):
+        """Small edits should keep estimated similarity high; unrelated text low."""
+        from src.dedup import text_signature, estimate_similarity
+
+        edited = REPORT.replace("this week", "this month")
+        unrelated = "Quarterly revenue grew in the enterprise segment while churn declined slightly."
+
+        assert estimate_similarity(text_signature(REPORT), text_signature(edited)) > 0.7
+        assert estimate_similarity(text_signature(REPORT), text_signature(unrelated)) < 0.2
+
+    def test_signature_roundtrip(self):
+        """Signatures should survive BLOB packing unchanged."""
+        from src.dedup import text_signature, pack_signature, unpack_signature
+
+        signature = text_signature(REPORT)
+        assert unpack_signature(pack_signature(signature)) == signature
+
+
+class TestKnowledgeBaseDedup:
+    """Test suite for duplicate-aware Knowledge Base inserts."""
+
+    def test_reformatted_copy_is_merged(self, database):
+        """An exact copy with different formatting should merge its source."""
+        from src.utils import save_market_data, get_all_market_data
+
+        first = save_market_data(database, REPORT, source="report.pdf")
+        second = save_market_data(database, REPORT.upper() + "\n\n", source="newsletter")
+
+        assert first["status"] == "inserted"
+        assert second["status"] == "merged" and second["id"] == first["id"]
+        rows = get_all_market_data(database)
+        assert len(rows) == 1
+        assert rows[0]["source"] == "report.pdf; newsletter"
+
+    def test_skip_policy_leaves_entry_untouched(self, database):
+        """on_duplicate='skip' should neither insert nor merge."""
+        from src.utils import save_market_data, get_all_market_data
+
+        save_market_data(database, REPORT, source="a")
+        result = save_market_data(database, REPORT, source="b", on_duplicate="skip")
+
+        assert result["status"] == "skipped"
+        assert get_all_market_data(database)[0]["source"] == "a"
+
+    def test_bulk_insert_dedups_within_batch_and_store(self, database):
+        """Bulk saves should catch duplicates both in the batch and in the database."""
+        from src.utils import save_market_data, save_market_data_bulk, get_all_market_data
+
+        save_market_data(database, REPORT, source="stored")
+        items = [
+            {"content": "Minimalist line art logos are trending for small coffee brands.", "source": "x"},
+            {"content": "Minimalist line art logos are trending for small coffee brands!", "source": "y"},
+            {"content": REPORT, "source": "z"},
+            {"content": "", "source": "empty"},
+        ]
+
+        stats = save_market_data_bulk(database, items)
+
+        assert stats == {"inserted": 1, "merged": 2, "skipped": 1}
+        sources = sorted(row["source"] for row in get_all_market_data(database))
+        assert sources == ["stored; z", "x; y"]
@@ -0,0 +1,71 @@
+"""
+Test suite for example diversity scoring.
+
+Following @test-agent guidelines:
+- Pure NumPy scoring, checked on small hand-made example sets
+- Mock external API calls (Gemini) in unit tests
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+TEMPLATE = "[SUBJECT] as a moody watercolor painting, soft washes, muted palette, paper texture"
+
+
+def filled(subject):
+    return {"variables": {"SUBJECT": subject}, "prompt": TEMPLATE.replace("[SUBJECT]", subject)}
+
+
+class TestDiversity:
+    """Test suite for the local diversity analyzer and batched regeneration."""
+
+    def test_similarity_matrices(self):
+        """Jaccard and TF-IDF cosine agree on identical, partial and disjoint token sets."""
+        from src.diversity import jaccard_matrix, tfidf_cosine_matrix
+
+        tokens = [["red", "fox"], ["red", "fox"], ["red", "owl"], ["blue", "whale"], []]
+        jaccard = jaccard_matrix(tokens)
+        cosine = tfidf_cosine_matrix(tokens)
+
+        assert jaccard[0, 1] == pytest.approx(1.0) and cosine[0, 1] == pytest.approx(1.0)
+        assert jaccard[0, 2] == pytest.approx(1 / 3) and 0 < cosine[0, 2] < 1
+        assert jaccard[0, 3] == 0 and cosine[0, 3] == pytest.approx(0.0)
+        assert jaccard[4, 4] == 0 and cosine[4, 0] == 0
+
+    def test_flags_duplicates_by_filled_values_not_template(self):
+        """Shared template wording is ignored; later copies of an earlier example are flagged."""
+        from src.diversity import analyze_examples
+
+        examples = [filled("a lighthouse in a storm"), filled("a fox in snowy woods"),
+                    filled("a lighthouse in a violent storm"), filled("city rooftops at dusk"), filled("a fox in the snowy woods")]
+        result = analyze_examples(examples, TEMPLATE)
+
+        assert result["duplicates"] == [2, 4]
+        assert [(p["a"], p["b"]) for p in result["pairs"]] == [(0, 2), (1, 4)]
+        assert 0 < result["score"] < 1
+
+        strings = [example["prompt"] for example in examples]
+        assert analyze_examples(strings, TEMPLATE)["duplicates"] == [2, 4]
+        assert analyze_examples(strings[:2] + strings[3:4], TEMPLATE)["duplicates"] == []
+
+    def test_regenerates_duplicate_slots_in_one_request(self, monkeypatch):
+        """Only duplicate slots are replaced, and only the kept examples are sent."""
+        import src.api_handler as api_handler
+
+        prompts = []
+
+        def respond(model, prompt, json_mode=False, response_schema=None, profile=None):
+            prompts.append(prompt)
+            return {"text": json.dumps({"examples": [filled("a koi pond at noon"), filled("desert dunes under stars")]})}
+
+        monkeypatch.setattr(api_handler, "_generate_response", respond)
+        examples = [filled("a lighthouse in a storm"), filled("a lighthouse during a storm"), filled("a fox"), filled("a fox in woods")]
+        package = {"template": TEMPLATE, "variables": ["SUBJECT"], "examples": examples}
+        updated = api_handler.agent_manage_examples(MagicMock(), package, action="regenerate_duplicates", example_indexes=[3, 1])
+
+        assert len(prompts) == 1
+        assert "a lighthouse during a storm" not in prompts[0] and "a lighthouse in a storm" in prompts[0]
+        assert [e["variables"]["SUBJECT"] for e in updated] == ["a lighthouse in a storm", "a koi pond at noon", "a fox", "desert dunes under stars"]
+        assert package["examples"] is examples and examples[1]["variables"]["SUBJECT"] == "a lighthouse during a storm"
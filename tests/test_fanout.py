@@ -0,0 +1,144 @@
+"""
+Test suite for concept fan-out.
+
+Following @test-agent guidelines:
+- Fake workflows (generators of step states); no API calls
+- Temporary databases only
+"""
+
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_global_limit(monkeypatch):
+    """Each test sizes its own process-wide concurrency limit."""
+    import src.fanout as fanout
+    monkeypatch.setattr(fanout, "_global_slots", None)
+
+
+def fake_workflow(tracker=None, fail=(), on_call=None):
+    peak = {"current": 0, "max": 0}
+    lock = threading.Lock()
+
+    def workflow(user_inputs):
+        with lock:
+            peak["current"] += 1
+            peak["max"] = max(peak["max"], peak["current"])
+        if on_call:
+            on_call()
+        yield {"status": "running", "step": "Initial Generation", "output": "..."}
+        time.sleep(0.02)
+        with lock:
+            peak["current"] -= 1
+        if user_inputs["topic"] in fail:
+            yield {"status": "error", "output": "quota exceeded"}
+            return
+        yield {"status": "completed", "step": "Complete", "output": "saved", "prompt_package": {"topic": user_inputs["topic"].title()}}
+
+    return workflow, peak
+
+
+def topics(*names):
+    return [{"topic": name} for name in names]
+
+
+class TestFanOut:
+    """Test suite for fan_out, inputs and library streaming."""
+
+    def test_results_stream_with_concurrency_cap(self):
+        """All items finish, at most max_concurrency at a time, with failures reported per item."""
+        from src.fanout import fan_out, resolve_settings
+
+        workflow, peak = fake_workflow(fail={"c"})
+        seen = []
+        results = list(fan_out(workflow, topics("a", "b", "c", "d", "e"),
+                               resolve_settings(overrides={"max_concurrency": 2}), on_result=seen.append))
+
+        assert peak["max"] == 2
+        assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4] and seen == results
+        failed = [r for r in results if r["status"] == "error"]
+        assert len(failed) == 1 and failed[0]["user_inputs"]["topic"] == "c" and failed[0]["error"] == "quota exceeded"
+        assert {r["prompt_package"]["topic"] for r in results if r["status"] == "completed"} == {"A", "B", "D", "E"}
+
+    def test_global_limit_caps_per_fanout_setting(self):
+        """The process-wide limit applies even when a fan-out asks for more."""
+        from src.fanout import fan_out, resolve_settings
+
+        workflow, peak = fake_workflow()
+        list(fan_out(workflow, topics("a", "b", "c", "d"),
+                     resolve_settings(overrides={"max_concurrency": 4, "global_max_concurrency": 1})))
+
+        assert peak["max"] == 1
+
+    def test_budget_stops_new_items(self):
+        """Once the request budget is used, remaining items are skipped rather than started."""
+        from src.fanout import fan_out, resolve_settings
+
+        made = {"n": 100}
+        workflow, _ = fake_workflow(on_call=lambda: made.__setitem__("n", made["n"] + 3))
+        results = list(fan_out(workflow, topics("a", "b", "c", "d"),
+                               resolve_settings(overrides={"max_concurrency": 1, "max_requests": 5}),
+                               requests_made=lambda: made["n"]))
+
+        assert [r["status"] for r in results] == ["completed", "completed", "skipped", "skipped"]
+        assert "budget" in results[-1]["error"]
+
+    def test_budget_counts_only_this_fanouts_requests(self):
+        """Requests made elsewhere in the process (other sessions, other fan-outs) don't use up the budget."""
+        from src.fanout import fan_out, resolve_settings
+        from src.policy import get_policy
+
+        def call():
+            get_policy().execute(lambda model: {"text": "ok"}, None, "test-fanout-budget")
+
+        def busy_neighbour():
+            for _ in range(10):
+                call()
+
+        def on_call():
+            # Another session's requests, made from a thread outside this fan-out
+            neighbour = threading.Thread(target=busy_neighbour)
+            neighbour.start()
+            neighbour.join()
+            call()
+            call()
+
+        workflow, _ = fake_workflow(on_call=on_call)
+        results = list(fan_out(workflow, topics("a", "b", "c", "d"),
+                               resolve_settings(overrides={"max_concurrency": 1, "max_requests": 5})))
+
+        assert [r["status"] for r in results] == ["completed", "completed", "completed", "skipped"]
+
+    def test_topic_inputs_from_csv_and_concepts(self):
+        """CSV rows (with or without a header) and generated concepts become workflow inputs."""
+        from src.fanout import read_topics_csv, concepts_to_inputs
+
+        rows = read_topics_csv("Topic,Style,Platform\nretro robots,pixel art,DALL-E 3\n\nfoggy harbors,,\n", {"model_platform": "Midjourney"})
+        assert [(r["topic"], r["style"], r["model_platform"]) for r in rows] == [
+            ("retro robots", "pixel art", "DALL-E 3"), ("foggy harbors", "", "Midjourney")
+        ]
+        assert [r["topic"] for r in read_topics_csv("koi ponds\nneon diners\n")] == ["koi ponds", "neon diners"]
+
+        inputs = concepts_to_inputs([
+            {"topic": "Lunar gardens", "content_type": "Image", "style_descriptors": ["soft", "dreamy"], "use_cases": ["posters"]},
+            {"description": "no topic"}
+        ])
+        assert len(inputs) == 1 and inputs[0]["style"] == "soft, dreamy" and inputs[0]["use_case"] == "posters"
+
+    def test_completed_packages_stream_into_library(self, tmp_path):
+        """library_saver stores each completed package as soon as it finishes."""
+        from src.fanout import fan_out, library_saver, resolve_settings
+        from src.utils import initialize_database, get_all_prompts_from_db
+
+        db = str(tmp_path / "library.db")
+        initialize_database(db)
+        workflow, _ = fake_workflow(fail={"b"})
+        inputs = [{"topic": "a", "content_type": "Image", "model_platform": "Midjourney"}, {"topic": "b"}]
+        results = list(fan_out(workflow, inputs, resolve_settings(), on_result=library_saver(db)))
+
+        assert [r.get("saved") for r in sorted(results, key=lambda r: r["index"])] == [True, None]
+        saved = get_all_prompts_from_db(db)
+        assert [(p["topic"], p["platform"]) for p in saved] == [("A", "Midjourney")]
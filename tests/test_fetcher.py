@@ -0,0 +1,112 @@
+"""
+Test suite for the market page fetch layer.
+
+Following @test-agent guidelines:
+- Use a local HTTP server instead of the real marketplace
+- Mock external API calls (Gemini) in unit tests
+"""
+
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest.mock import MagicMock
+
+import pytest
+
+PAGE = """<html><head><title>Shop</title><style>.x { color: red }</style>
+<script>var tracking = "do not include";</script></head>
+<body><nav>Home | Login</nav>
+<main><h1>Trending Prompts</h1><p>Vintage travel posters</p><p>Kawaii sticker sheets</p>
+<p>""" + "Watercolor botanical illustration bundles are selling well. " * 5 + """</p></main>
+<footer>Copyright</footer></body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {"200": 0, "304": 0}
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            _Handler.hits["304"] += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        _Handler.hits["200"] += 1
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Serve PAGE on a local port with ETag support."""
+    _Handler.hits = {"200": 0, "304": 0}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestFetcher:
+    """Test suite for cached, HTML-stripped fetches."""
+
+    def test_extracts_main_text_only(self):
+        """Scripts, styles, navigation and markup should be removed."""
+        from src.fetcher import extract_main_text
+
+        text = extract_main_text(PAGE)
+
+        assert "Trending Prompts" in text
+        assert "Kawaii sticker sheets" in text
+        assert "tracking" not in text and "red }" not in text
+        assert "Login" not in text and "<p>" not in text
+
+    def test_token_cap(self):
+        """Extracted text should respect the token budget."""
+        from src.fetcher import extract_main_text, CHARS_PER_TOKEN
+
+        text = extract_main_text(PAGE, max_tokens=20)
+        assert len(text) <= 20 * CHARS_PER_TOKEN + len("\n[... truncated]")
+
+    def test_conditional_cache(self, server, tmp_path):
+        """Second fetch should revalidate with ETag and reuse the cached body."""
+        from src.fetcher import fetch_page_text
+
+        first = fetch_page_text(server + "/", cache_dir=str(tmp_path))
+        second = fetch_page_text(server + "/", cache_dir=str(tmp_path))
+
+        assert not first["from_cache"] and second["from_cache"]
+        assert first["text"] == second["text"]
+        assert _Handler.hits == {"200": 1, "304": 1}
+
+        uncached = fetch_page_text(server + "/", use_cache=False)
+        assert not uncached["from_cache"] and _Handler.hits == {"200": 2, "304": 1}
+
+    def test_analyze_markets_concurrently(self, server, tmp_path, monkeypatch):
+        """Each URL should be analyzed with page text, not raw HTML."""
+        import src.fetcher as fetcher
+        from src.api_handler import agent_analyze_markets
+
+        monkeypatch.setattr(fetcher, "CACHE_DIR", str(tmp_path))
+        model = MagicMock()
+        candidate = model.generate_content.return_value.candidates[0]
+        candidate.finish_reason = 1
+        candidate.content.parts[0].text = '{"summary": "ok"}'
+        config = {"market_analysis_prompt": "PAGE:\n{html_content}"}
+
+        urls = [f"{server}/page{i}" for i in range(3)] + ["http://127.0.0.1:1/unreachable"]
+        results = agent_analyze_markets(model, config, urls, max_workers=4)
+
+        assert list(results) == urls
+        assert all(results[u] == {"summary": "ok"} for u in urls[:3])
+        assert "error" in results[urls[3]]
+        sent_prompt = model.generate_content.call_args[0][0]
+        assert "<script>" not in sent_prompt and "Trending Prompts" in sent_prompt
+        assert len(list(tmp_path.glob("*.json"))) == 3  # cached under the patched CACHE_DIR
@@ -0,0 +1,144 @@
+"""
+Test suite for the streaming ingestion module.
+
+Following @test-agent guidelines:
+- Use pytest.fixture for test setup/teardown
+- Isolate database state with a temporary SQLite file
+- Test structure and counts, not exact content
+"""
+
+import io
+import json
+import pytest
+from pypdf import PdfWriter
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Provide an initialized temporary database."""
+    from src.utils import initialize_database
+
+    db_path = str(tmp_path / "test.db")
+    initialize_database(db_path)
+    return db_path
+
+
+def _csv_upload(rows: int) -> io.BytesIO:
+    lines = ["title,category"] + [f"Item {i},Cat {i % 3}" for i in range(rows)]
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+class TestRecordGenerators:
+    """Test suite for page/row/item generators."""
+
+    def test_csv_rows_match_parse_csv_to_text(self):
+        """Streamed CSV rows should be formatted exactly like the legacy parser."""
+        from src.ingestion import iter_csv_rows
+        from src.utils import parse_csv_to_text
+
+        upload = _csv_upload(5)
+        streamed = [text for _, text in iter_csv_rows(upload)]
+
+        assert "\n".join(streamed) == parse_csv_to_text(upload.getvalue().decode("utf-8"))
+        assert not upload.closed
+
+    def test_json_list_streams_across_buffer_boundaries(self):
+        """Values split between reads (including numbers) should decode correctly."""
+        from src.ingestion import _JsonStreamReader
+
+        data = [{"topic": f"Trend {i}", "score": 123456789 + i} for i in range(50)]
+        text = io.StringIO(json.dumps(data))
+        reader = _JsonStreamReader(text, buffer_size=7)
+
+        reader.expect("[")
+        values = [reader.value()]
+        while reader.peek() == ",":
+            reader.expect(",")
+            values.append(reader.value())
+        reader.expect("]")
+
+        assert values == data
+
+    def test_json_entries_match_parse_json_to_text(self):
+        """Both list and object top-level JSON should match the legacy parser."""
+        from src.ingestion import iter_json_entries
+        from src.utils import parse_json_to_text
+
+        for payload in ([{"a": 1, "b": "x"}, "plain", 3], {"styles": ["retro", "neon"], "count": 2}):
+            raw = json.dumps(payload)
+            streamed = [text for _, text in iter_json_entries(io.BytesIO(raw.encode("utf-8")))]
+            assert "\n".join(streamed) == parse_json_to_text(raw)
+
+    def test_row_limit_and_sampling(self):
+        """row_limit caps kept rows; sample_rate keeps a subset."""
+        from src.ingestion import iter_file_records
+
+        _, limited = iter_file_records(_csv_upload(1000), "data.csv", row_limit=25)
+        assert len(list(limited)) == 25
+
+        _, sampled = iter_file_records(_csv_upload(1000), "data.csv", sample_rate=0.1)
+        assert 50 < len(list(sampled)) < 150
+
+    def test_pdf_pages_in_order_with_process_pool(self, tmp_path):
+        """Parallel extraction should yield every page exactly once, in order."""
+        from src.ingestion import iter_pdf_pages
+
+        writer = PdfWriter()
+        for _ in range(20):
+            writer.add_blank_page(width=72, height=72)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+
+        pages = list(iter_pdf_pages(buffer, workers=2))
+
+        assert [number for number, _ in pages] == list(range(1, 21))
+        assert len(list(iter_pdf_pages(buffer, workers=1, page_limit=5))) == 5
+
+
+class TestIngestion:
+    """Test suite for chunked Knowledge Base ingestion."""
+
+    def test_chunks_carry_ranges(self):
+        """Chunks should cover contiguous record ranges."""
+        from src.ingestion import iter_chunks
+
+        chunks = list(iter_chunks(((i, f"row {i}") for i in range(1, 451)), "rows", chunk_size=200))
+
+        assert [(c["start"], c["end"]) for c in chunks] == [(1, 200), (201, 400), (401, 450)]
+
+    def test_ingest_file_skips_known_hash(self, database):
+        """The same file content should only be ingested once."""
+        from src.ingestion import ingest_file
+        from src.utils import get_all_market_data
+
+        first = ingest_file(database, _csv_upload(450), "report.csv")
+        second = ingest_file(database, _csv_upload(450), "copy_of_report.csv")
+
+        assert first["chunks"] == 3 and not first["skipped"]
+        assert second["skipped"]
+        sources = [row["source"] for row in get_all_market_data(database)]
+        assert "report.csv (rows 1-200)" in sources
+        assert len(sources) == 3
+
+    def test_partial_ingest_does_not_block_full_ingest(self, database):
+        """A row-limited ingest shouldn't register the file; the full ingest adds the remaining rows."""
+        from src.ingestion import ingest_file
+
+        partial = ingest_file(database, _csv_upload(450), "report.csv", row_limit=200)
+        full = ingest_file(database, _csv_upload(450), "report.csv")
+        again = ingest_file(database, _csv_upload(450), "report.csv")
+
+        assert partial["chunks"] == 1 and not partial["skipped"]
+        assert full["chunks"] == 2 and not full["skipped"]  # rows 1-200 are already stored
+        assert again["skipped"]
+
+    def test_deleting_all_chunks_allows_reingest(self, database):
+        """Once every chunk of a file is deleted, the file can be uploaded again."""
+        from src.ingestion import ingest_file
+        from src.utils import get_all_market_data, delete_market_data
+
+        ingest_file(database, _csv_upload(10), "small.csv")
+        for row in get_all_market_data(database):
+            delete_market_data(database, row["id"])
+
+        assert not ingest_file(database, _csv_upload(10), "small.csv")["skipped"]
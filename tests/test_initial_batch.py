@@ -0,0 +1,121 @@
+"""
+Test suite for batched initial generation.
+
+Following @test-agent guidelines:
+- Mock external API calls (Gemini) in unit tests
+- Check per-item validation and single-item fallback
+"""
+
+import json
+from unittest.mock import MagicMock
+
+
+CONFIG = {
+    "image_meta_prompt": "Create an image prompt for {topic} in {style} style for {use_case} on {model_platform}. {reference_examples}",
+    "text_meta_prompt": "Create a text prompt for {topic} in {style} style for {use_case} on {model_platform}. {reference_examples}",
+    "batch_initial_prompt_meta_prompt": "{count} ITEMS:\n{items}\nINSTRUCTIONS:\n{instructions}"
+}
+
+
+def item(topic, content_type="Image"):
+    return {"topic": topic, "content_type": content_type, "style": "ink", "use_case": "posters", "model_platform": "Midjourney"}
+
+
+def package_json(topic, **extra):
+    return dict({"template": f"[SUBJECT] {topic}, ink wash", "example_prompts": [f"{topic} one", f"{topic} two"]}, **extra)
+
+
+class TestBatchedInitialGeneration:
+    """Test suite for agent_generate_initial_prompts."""
+
+    def test_one_request_per_content_type_with_single_item_fallback(self, monkeypatch):
+        """Valid batch entries are used; invalid or missing ones are regenerated one at a time."""
+        import src.api_handler as api_handler
+
+        prompts = []
+
+        def respond(model, prompt, json_mode=False, response_schema=None, profile=None):
+            prompts.append(prompt)
+            if prompt.startswith("3 ITEMS"):
+                return {"text": json.dumps({"packages": [
+                    dict(package_json("koi"), index=0),
+                    {"index": 1, "template": "missing examples"},
+                    dict(package_json("bogus"), index=7)
+                ]})}
+            if prompt.startswith("2 ITEMS"):
+                return {"text": json.dumps({"packages": [dict(package_json("essay"), index=1), dict(package_json("poem"), index=0)]})}
+            topic = prompt.split("prompt for ")[1].split(" in ")[0]
+            return {"text": json.dumps(package_json(f"{topic} solo"))}
+
+        monkeypatch.setattr(api_handler, "_generate_response", respond)
+        items = [item("koi"), item("poem", "Text"), item("fog"), item("essay", "Text"), item("lanterns")]
+        results = api_handler.agent_generate_initial_prompts(MagicMock(), CONFIG, items, batch_size=4)
+
+        batch_prompts = [p for p in prompts if "ITEMS" in p]
+        assert len(batch_prompts) == 2
+        assert batch_prompts[0].count("Create an image prompt") == 1 and "the item's topic" in batch_prompts[0]
+        assert "2. platform: Midjourney | topic: lanterns" in batch_prompts[0]
+
+        assert [r["topic"] for r in results] == ["koi", "poem", "fog", "essay", "lanterns"]
+        assert results[0]["template"] == "[SUBJECT] koi, ink wash" and results[0]["variables"] == ["SUBJECT"]
+        assert results[1]["template"] == "[SUBJECT] poem, ink wash" and results[1]["content_type"] == "Text"
+        assert results[2]["template"] == "[SUBJECT] fog solo, ink wash"
+        assert results[4]["template"] == "[SUBJECT] lanterns solo, ink wash"
+        assert len(prompts) == 4
+
+    def test_batch_request_uses_json_mode_without_strict_schema(self, monkeypatch):
+        """Constrained decoding would reduce entries to their declared keys, so no response_schema is sent."""
+        import src.api_handler as api_handler
+        from src.structured import request_schema
+
+        sent = []
+
+        def call(model, prompt, kwargs):
+            sent.append(kwargs)
+            return {"text": json.dumps({"packages": [dict(package_json("a"), index=0), dict(package_json("b"), index=1)]})}
+
+        monkeypatch.setattr(api_handler, "_call_model", call)
+        results = api_handler.agent_generate_initial_prompts(MagicMock(), CONFIG, [item("a"), item("b")])
+
+        assert request_schema("initial_prompts") is None
+        assert len(sent) == 1
+        assert sent[0]["generation_config"]["response_mime_type"] == "application/json"
+        assert "response_schema" not in sent[0]["generation_config"]
+        assert [r["template"] for r in results] == ["[SUBJECT] a, ink wash", "[SUBJECT] b, ink wash"]
+
+    def test_failed_batch_and_unknown_content_type(self, monkeypatch):
+        """A failed batch request falls back per item; unknown content types report an error."""
+        import src.api_handler as api_handler
+
+        def respond(model, prompt, json_mode=False, response_schema=None, profile=None):
+            if "ITEMS" in prompt:
+                return {"error": "503 overloaded"}
+            return {"text": json.dumps(package_json("solo"))}
+
+        monkeypatch.setattr(api_handler, "_generate_response", respond)
+        results = api_handler.agent_generate_initial_prompts(MagicMock(), CONFIG, [item("a"), item("b"), item("c", "Video")])
+
+        assert [r.get("template") for r in results[:2]] == ["[SUBJECT] solo, ink wash"] * 2
+        assert "Video" in results[2]["error"]
+
+    def test_fan_out_starts_workflows_from_batched_packages(self, monkeypatch):
+        """fan_out hands each workflow its pre-generated initial package."""
+        from src.fanout import fan_out, resolve_settings
+        import src.fanout as fanout
+
+        monkeypatch.setattr(fanout, "_global_slots", None)
+        batches = []
+
+        def generate(items, size):
+            batches.append((len(items), size))
+            return [{"topic": i["topic"].upper(), "template": "[X]"} for i in items]
+
+        def workflow(user_inputs):
+            yield {"status": "completed", "output": "done", "prompt_package": user_inputs["initial_package"]}
+
+        inputs = [{"topic": "a"}, {"topic": "b"}, {"topic": "c"}]
+        results = list(fan_out(workflow, inputs, resolve_settings(overrides={"initial_batch_size": 2}), generate_initial=generate))
+
+        assert batches == [(3, 2)]
+        assert sorted(r["prompt_package"]["topic"] for r in results) == ["A", "B", "C"]
+        assert "initial_package" not in inputs[0]
@@ -0,0 +1,124 @@
+"""
+Test suite for the durable job queue.
+
+Following @test-agent guidelines:
+- Temporary SQLite databases only
+- Fake handlers; leases shortened by editing rows rather than sleeping
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+def expire_lease(db, job_id):
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+
+
+class TestJobQueue:
+    """Test suite for claiming, leases, retries and lanes."""
+
+    def test_interactive_lane_preempts_batch(self, db):
+        """Interactive jobs are claimed before older batch jobs."""
+        from src.jobqueue import enqueue, claim
+
+        batch = enqueue(db, "image", {"n": 1})
+        interactive = enqueue(db, "workflow", {"n": 2}, lane="interactive")
+
+        assert claim(db, "w1")["id"] == interactive
+        assert claim(db, "w1")["id"] == batch
+        assert claim(db, "w1") is None
+
+    def test_dedupe_key_skips_resubmission(self, db):
+        """Re-submitting the same dedupe key does not add a second job."""
+        from src.jobqueue import enqueue
+
+        assert enqueue(db, "image", {}, dedupe_key="image:a.json") is not None
+        assert enqueue(db, "image", {}, dedupe_key="image:a.json") is None
+
+    def test_expired_lease_is_retried_elsewhere(self, db):
+        """A crashed worker's job goes to another worker; the old worker can no longer complete it."""
+        from src.jobqueue import enqueue, claim, complete, heartbeat, get_job
+
+        job_id = enqueue(db, "image", {"path": "x.png"}, max_attempts=2)
+        assert claim(db, "crashed")["id"] == job_id
+        assert claim(db, "w2") is None  # lease still valid
+
+        expire_lease(db, job_id)
+        retried = claim(db, "w2")
+        assert retried["id"] == job_id and retried["attempts"] == 2
+
+        assert not heartbeat(db, job_id, "crashed")
+        assert not complete(db, job_id, "crashed", {"late": True})
+        assert complete(db, job_id, "w2", {"ok": True})
+        assert get_job(db, job_id)["result"] == {"ok": True}
+
+    def test_attempts_exhausted_marks_failed(self, db):
+        """Failures requeue with a delay until max_attempts, then the job is failed."""
+        from src.jobqueue import enqueue, claim, fail, get_job, retry_failed
+
+        job_id = enqueue(db, "image", {}, max_attempts=2)
+        claim(db, "w1")
+        assert fail(db, job_id, "w1", "boom")
+        assert get_job(db, job_id)["status"] == "queued"
+        assert claim(db, "w1") is None  # retry delay not over yet
+
+        with sqlite3.connect(db) as conn:
+            conn.execute("UPDATE jobs SET available_at = 0")
+        claim(db, "w1")
+        expire_lease(db, job_id)
+        assert claim(db, "w1") is None
+        job = get_job(db, job_id)
+        assert job["status"] == "failed" and "Lease expired" in job["error"]
+
+        assert retry_failed(db) == 1
+        assert claim(db, "w1")["attempts"] == 1
+
+    def test_concurrent_workers_claim_each_job_once(self, db):
+        """Workers racing on one database never run the same job twice."""
+        from src.jobqueue import enqueue, Worker, queue_status
+
+        for n in range(20):
+            enqueue(db, "echo", {"n": n})
+        seen, lock = [], threading.Lock()
+
+        def echo(payload, emit):
+            with lock:
+                seen.append(payload["n"])
+            return payload
+
+        workers = [Worker(db, {"echo": echo}, name=f"w{i}") for i in range(4)]
+        threads = [threading.Thread(target=w.run, kwargs={"exit_when_idle": True}) for w in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        assert sorted(seen) == list(range(20))
+        status = queue_status(db)
+        assert status["lanes"]["batch"] == {"done": 20}
+        assert status["completed_recent"] == 20 and status["workers"] == 0
+
+    def test_handler_errors_are_recorded(self, db):
+        """A raising handler fails the attempt and the error is kept on the job."""
+        from src.jobqueue import enqueue, Worker, get_job
+
+        job_id = enqueue(db, "broken", {}, max_attempts=1)
+
+        def broken(payload, emit):
+            emit({"step": "Start"})
+            raise RuntimeError("model unavailable")
+
+        events = []
+        job = Worker(db, {"broken": broken}).run_one(on_event=lambda job, event: events.append(event))
+
+        assert job["status"] == "failed" and events == [{"step": "Start"}]
+        stored = get_job(db, job_id)
+        assert stored["status"] == "failed" and stored["error"] == "model unavailable"
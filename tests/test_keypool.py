@@ -0,0 +1,92 @@
+"""
+Test suite for the API key pool.
+
+Following @test-agent guidelines:
+- Fake keys only; no client ever sends a request
+- Mock external API calls (Gemini) in unit tests
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestKeyPool:
+    """Test suite for KeyPool scheduling, limits and benching."""
+
+    def test_least_loaded_key(self):
+        """Concurrent leases spread across keys before doubling up."""
+        from src.keypool import KeyPool
+
+        pool = KeyPool(["key-aaaa", "key-bbbb", "key-cccc"])
+        with pool.lease() as a, pool.lease() as b, pool.lease() as c:
+            assert {a.value, b.value, c.value} == {"key-aaaa", "key-bbbb", "key-cccc"}
+            with pool.lease() as d:
+                assert d.in_flight == 2
+        assert all(entry["in_flight"] == 0 for entry in pool.snapshot())
+
+    def test_benched_key_is_skipped(self):
+        """A benched key leaves rotation until its cool-down ends."""
+        from src.keypool import KeyPool
+
+        pool = KeyPool(["key-aaaa", "key-bbbb"], bench_seconds=60)
+        with pool.lease() as first:
+            pool.bench(first)
+        for _ in range(3):
+            with pool.lease() as key:
+                assert key.value != first.value
+
+        pool.bench(key)
+        with pytest.raises(RuntimeError):
+            with pool.lease(timeout=0.05):
+                pass
+
+    def test_rate_limit_blocks_until_refill(self):
+        """Per-key limits make leases wait instead of exceeding the quota."""
+        from src.keypool import KeyPool
+
+        pool = KeyPool(["key-aaaa"], requests_per_minute=1)
+        with pool.lease():
+            pass
+        with pytest.raises(RuntimeError):
+            with pool.lease(timeout=0.05):
+                pass
+
+    def test_keys_from_env_and_config(self, monkeypatch):
+        """Keys are collected from the multi-key and single-key variables and config, without blanks."""
+        from src.keypool import load_keys
+
+        monkeypatch.setenv("GEMINI_API_KEYS", "k1, k2,")
+        monkeypatch.setenv("GEMINI_API_KEY", "k3")
+        assert load_keys("gemini", {"api_keys": {"gemini": ["k4"]}}) == ["k1", "k2", "k3", "k4"]
+
+    def test_quota_error_benches_pooled_key(self, monkeypatch):
+        """A Gemini quota error benches the key it happened on and is retried on another."""
+        from google.api_core import exceptions
+        import src.api_handler as api_handler
+        from src.keypool import KeyPool
+        from src.policy import resolve_policy
+
+        pool = KeyPool(["key-aaaa", "key-bbbb"])
+        monkeypatch.setattr(api_handler, "get_pool", lambda service: pool)
+        used = []
+
+        def bound(model, key):
+            def generate(prompt, **kwargs):
+                used.append(key.value)
+                if len(used) == 1:
+                    raise exceptions.ResourceExhausted("quota")
+                response = MagicMock()
+                response.candidates[0].finish_reason = 1
+                response.candidates[0].content.parts[0].text = "ok"
+                return response
+
+            return MagicMock(generate_content=MagicMock(side_effect=generate))
+
+        monkeypatch.setattr(api_handler, "bind_client", bound)
+        profile = {"name": "t", "model": None, "policy": resolve_policy(overrides={"backoff_base": 0.001})}
+
+        assert api_handler._generate_response(MagicMock(), "prompt", profile=profile) == {"text": "ok"}
+        assert used[0] != used[1]
+        benched = [entry for entry in pool.snapshot() if entry["quota_errors"]]
+        assert len(benched) == 1 and benched[0]["key"] == f"...{used[0][-4:]}"
@@ -0,0 +1,95 @@
+"""
+Test suite for the library similarity index.
+
+Following @test-agent guidelines:
+- Isolate database state with a temporary SQLite file
+- Fake workflows' model calls are never reached for short-circuited runs
+"""
+
+import sqlite3
+
+import pytest
+
+TEMPLATE = (
+    "[SUBJECT] rendered as a vintage travel poster, bold flat colour blocks, art deco typography, "
+    "sun-bleached palette of [COLOR] and cream, grainy lithograph texture, [LOCATION] skyline in the distance"
+)
+
+
+def package(topic, template=TEMPLATE, style="art deco", use_case="wall art", content_type="Image"):
+    return {"topic": topic, "style": style, "use_case": use_case, "template": template,
+            "content_type": content_type, "platform": "Midjourney"}
+
+
+@pytest.fixture
+def library(tmp_path):
+    """A temporary library with two saved prompts."""
+    from src.utils import initialize_database, save_prompt_to_db
+
+    db_path = str(tmp_path / "library.db")
+    initialize_database(db_path)
+    save_prompt_to_db(db_path, package("Vintage Travel Poster Cities"))
+    save_prompt_to_db(db_path, package("Kawaii Sticker Sheet Animals", template="[ANIMAL] kawaii sticker, thick white outline, pastel [COLOR], glossy vinyl finish",
+                                       style="kawaii", use_case="stickers"))
+    return db_path
+
+
+class TestLibraryIndex:
+    """Test suite for request/template checks against the prompt library."""
+
+    def test_request_and_template_checks_report_closest(self, library):
+        """Near-identical requests/templates are duplicates; unrelated ones find nothing."""
+        from src import library_index
+
+        request = library_index.check(library, "request", {"topic": "vintage travel poster cities", "style": "art deco", "use_case": "wall art", "content_type": "Image"})
+        assert request["duplicate"] and not request["short_circuit"]
+        assert request["matches"][0]["topic"] == "Vintage Travel Poster Cities" and request["matches"][0]["similarity"] >= 0.7
+
+        template = library_index.check(library, "template", {"template": TEMPLATE.replace("cream", "ivory"), "content_type": "Image"})
+        assert template["duplicate"] and template["matches"][0]["id"] == 1
+        assert "'Vintage Travel Poster Cities' (#1" in library_index.describe(template["matches"])
+
+        assert library_index.check(library, "request", {"topic": "noir detective monologue", "style": "hardboiled", "use_case": "fiction"}) is None
+        assert library_index.check(library, "request", {"topic": "vintage travel poster cities", "style": "art deco", "use_case": "wall art", "content_type": "Text"}) is None
+
+    def test_split_duplicates_with_short_circuit(self, library):
+        """With short_circuit on, duplicate inputs are held back and the rest kept."""
+        from src import library_index
+
+        settings = library_index.resolve_settings(overrides={"short_circuit": True})
+        inputs = [{"topic": "Kawaii sticker sheet animals", "style": "kawaii", "use_case": "stickers"}, {"topic": "foggy harbor at dawn"}]
+        keep, duplicates = library_index.split_duplicates(library, inputs, settings)
+
+        assert keep == inputs[1:]
+        assert duplicates[0][0] is inputs[0] and duplicates[0][1]["matches"][0]["id"] == 2
+
+    def test_existing_prompts_are_backfilled_and_updates_reindexed(self, library):
+        """Rows saved before the index get signed on initialization; edits re-sign."""
+        from src import library_index
+        from src.utils import initialize_database, update_prompt_in_db, get_all_prompts_from_db
+
+        with sqlite3.connect(library) as conn:
+            conn.execute("UPDATE prompts SET request_signature = NULL, template_signature = NULL")
+            conn.execute("DELETE FROM prompts_lsh")
+        initialize_database(library)
+        assert library_index.check(library, "template", {"template": TEMPLATE})["matches"][0]["id"] == 1
+
+        update_prompt_in_db(library, 1, {"template": "[DISH] food photography, overhead flat lay, rustic wooden table, soft window light"})
+        assert library_index.check(library, "template", {"template": TEMPLATE}) is None
+        assert "template_signature" not in get_all_prompts_from_db(library)[0]
+
+    def test_workflow_short_circuits_before_model_calls(self, library, monkeypatch):
+        """A duplicate request stops run_workflow before the initial generation call."""
+        import src.run_agentic_workflow as workflow
+
+        def no_model_calls(**kwargs):
+            raise AssertionError("initial generation should not run")
+
+        monkeypatch.setattr(workflow, "agent_generate_initial_prompt", no_model_calls)
+        config = {"database_name": library, "library_dedup": {"short_circuit": True}}
+        user_inputs = {"topic": "Vintage travel poster cities", "style": "art deco", "use_case": "wall art",
+                       "content_type": "Image", "model_platform": "Midjourney"}
+        states = list(workflow.run_workflow("key", "models/x", "models/x", config, user_inputs))
+
+        assert states[-1]["status"] == "error" and states[-1]["step"] == "Duplicate Check"
+        assert states[-1]["duplicate_of"][0]["id"] == 1
@@ -0,0 +1,87 @@
+"""
+Test suite for submission packaging.
+
+Following @test-agent guidelines:
+- Use temporary directories only
+"""
+
+import json
+import os
+import zipfile
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture(autouse=True)
+def thumb_cache(tmp_path, monkeypatch):
+    """Keep rendered thumbnails out of the project cache."""
+    import src.thumbnails as thumbnails
+    monkeypatch.setattr(thumbnails, "THUMB_DIR", str(tmp_path / "thumbs"))
+
+
+@pytest.fixture
+def processed(tmp_path):
+    """Two processed JSONs, one with a source image and a preview."""
+    src = tmp_path / "processed"
+    src.mkdir()
+    image = tmp_path / "source.png"
+    Image.new("RGB", (8, 8), "red").save(image)
+    (src / "reverse_a.json").write_text(json.dumps({
+        "topic": "Neon Portraits", "template": "A [X]", "examples": ["one"], "source_image_path": str(image)
+    }), encoding="utf-8")
+    Image.new("RGB", (8, 8), "blue").save(src / "reverse_a_preview_1.png")
+    (src / "reverse_b.json").write_text(json.dumps({"topic": "Neon Portraits", "template": "B"}), encoding="utf-8")
+    return src
+
+
+class TestPackager:
+    """Test suite for direct-to-ZIP bulk packaging."""
+
+    def test_package_file_layout_and_compression(self, processed, tmp_path):
+        """Images should be stored, text deflated, with no staging directory left behind."""
+        from src.packager import package_file
+
+        out = tmp_path / "dist"
+        result = package_file(str(processed / "reverse_a.json"), str(out))
+
+        assert result["source_image"] and result["previews"] == 1
+        assert os.listdir(out) == [os.path.basename(result["zip_path"])]
+        with zipfile.ZipFile(result["zip_path"]) as zf:
+            info = {i.filename.split("/", 1)[1]: i.compress_type for i in zf.infolist()}
+            assert "TITLE" in zf.read(next(n for n in zf.namelist() if n.endswith("submission.txt"))).decode()
+        assert info == {
+            "data.json": zipfile.ZIP_DEFLATED,
+            "source_image.png": zipfile.ZIP_STORED,
+            "previews/reverse_a_preview_1.png": zipfile.ZIP_STORED,
+            "contact_sheet.jpg": zipfile.ZIP_STORED,
+            "submission.txt": zipfile.ZIP_DEFLATED,
+        }
+
+    def test_package_directory_skips_unchanged(self, processed, tmp_path):
+        """Second run should skip packages whose inputs did not change."""
+        from src.packager import package_directory
+
+        out = str(tmp_path / "dist")
+        first = package_directory(str(processed), out, workers=2)
+        assert len(first["packaged"]) == 2 and not first["failed"]
+        assert len({r["zip_path"] for r in first["packaged"]}) == 2
+
+        second = package_directory(str(processed), out, workers=1)
+        assert not second["packaged"] and len(second["skipped"]) == 2
+
+        os.utime(processed / "reverse_a_preview_1.png", (1_700_000_000, 1_700_000_000))
+        third = package_directory(str(processed), out, workers=1)
+        assert [os.path.basename(r["json_path"]) for r in third["packaged"]] == ["reverse_a.json"]
+        assert len([f for f in os.listdir(out) if f.endswith(".zip")]) == 2
+
+    def test_draft_previews_not_packaged(self, processed, tmp_path):
+        """Draft previews next to the JSON should stay out of the ZIP."""
+        from src.packager import package_file
+
+        Image.new("RGB", (8, 8), "green").save(processed / "reverse_a_preview_draft_1.png")
+        result = package_file(str(processed / "reverse_a.json"), str(tmp_path / "dist"))
+
+        with zipfile.ZipFile(result["zip_path"]) as zf:
+            assert not any("draft" in name for name in zf.namelist())
+        assert result["previews"] == 1
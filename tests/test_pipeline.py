@@ -0,0 +1,121 @@
+"""
+Test suite for the streaming stage pipeline.
+
+Following @test-agent guidelines:
+- Fake stage functions with tiny sleeps; no API calls
+- Resume state in temporary directories only
+"""
+
+import threading
+import time
+
+
+def items(n):
+    return ({"id": f"img{i}"} for i in range(n))
+
+
+class Concurrency:
+    """Tracks the peak number of concurrent calls."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+class TestPipeline:
+    """Test suite for Pipeline and PipelineState."""
+
+    def test_items_flow_through_all_stages(self):
+        """Every item passes every stage in order and collects each stage's outputs."""
+        from src.pipeline import Pipeline, Stage
+
+        stages = [
+            Stage("reverse", lambda item: {"json_path": f"{item['id']}.json"}, workers=2),
+            Stage("package", lambda item: {"zip_path": item["json_path"].replace(".json", ".zip")})
+        ]
+        summary = Pipeline(stages).run(items(5))
+
+        assert sorted(item["zip_path"] for item in summary["completed"]) == [f"img{i}.zip" for i in range(5)]
+        assert summary["stages"]["reverse"]["processed"] == 5
+        assert summary["stages"]["package"]["items_per_minute"] > 0
+
+    def test_per_stage_concurrency_limits(self):
+        """Each stage runs at most its own worker count at once."""
+        from src.pipeline import Pipeline, Stage
+
+        gemini, cpu = Concurrency(), Concurrency()
+
+        def slow(tracker):
+            def run(item):
+                with tracker:
+                    time.sleep(0.01)
+                return {}
+            return run
+
+        Pipeline([Stage("api", slow(gemini), workers=3), Stage("zip", slow(cpu), workers=1)]).run(items(12))
+
+        assert gemini.peak <= 3 and cpu.peak == 1
+        assert gemini.peak > 1
+
+    def test_backpressure_bounds_work_in_flight(self):
+        """A slow downstream stage makes upstream stages wait instead of racing ahead."""
+        from src.pipeline import Pipeline, Stage
+
+        started, finished = [], []
+
+        def fast(item):
+            started.append(item["id"])
+            return {}
+
+        def slow(item):
+            time.sleep(0.01)
+            finished.append(item["id"])
+            lead = len(started) - len(finished)
+            assert lead <= 4, lead  # in the slow stage, queued for it, blocked in fast, plus one of slack
+            return {}
+
+        summary = Pipeline([Stage("fast", fast), Stage("slow", slow)], queue_size=1).run(items(10))
+
+        assert len(summary["completed"]) == 10 and not summary["failed"]
+        assert summary["stages"]["fast"]["blocked_seconds"] > 0
+        assert summary["stages"]["slow"]["max_queue"] == 1
+
+    def test_resume_skips_finished_stages_and_retries_failures(self, tmp_path):
+        """A re-run skips recorded stages and retries items from the stage where they failed."""
+        from src.pipeline import Pipeline, PipelineState, Stage
+
+        path = str(tmp_path / "state.json")
+        calls = []
+        broken = {"img1"}
+
+        def reverse(item):
+            calls.append(("reverse", item["id"]))
+            return {"json_path": f"{item['id']}.json"}
+
+        def preview(item):
+            calls.append(("preview", item["id"]))
+            if item["id"] in broken:
+                raise RuntimeError("HF quota")
+            return {"previews": 1}
+
+        stages = lambda: [Stage("reverse", reverse), Stage("preview", preview)]
+        first = Pipeline(stages(), PipelineState(path)).run(items(2))
+        assert first["failed"] == {"img1": {"stage": "preview", "error": "HF quota"}}
+
+        broken.clear()
+        calls.clear()
+        second = Pipeline(stages(), PipelineState(path)).run(items(2))
+
+        assert calls == [("preview", "img1")]
+        assert second["stages"]["reverse"]["skipped"] == 2
+        assert sorted(item["id"] for item in second["completed"]) == ["img0", "img1"]
+        assert all(item["json_path"] for item in second["completed"])
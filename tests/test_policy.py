@@ -0,0 +1,117 @@
+"""
+Test suite for the request policy (deadlines, hedging, retries).
+
+Following @test-agent guidelines:
+- Fake model calls with controllable latency, no real API
+- Keep timings short so the suite stays fast
+"""
+
+import time
+import threading
+
+import pytest
+
+FAST = {"backoff_base": 0.001, "backoff_max": 0.002, "hedge_min_samples": 3}
+
+
+@pytest.fixture
+def policy():
+    from src.policy import RequestPolicy
+
+    return RequestPolicy(max_workers=4)
+
+
+class TestRequestPolicy:
+    """Test suite for RequestPolicy.execute."""
+
+    def test_hedge_after_p95_wins(self, policy):
+        """A call outliving the p95 latency should be hedged, on the fallback model if given."""
+        from src.policy import resolve_policy
+
+        for _ in range(5):
+            policy.record_latency("k", 0.01)
+        release = threading.Event()
+
+        def call(model):
+            if model == "primary":
+                release.wait(2)
+                return {"text": "slow"}
+            return {"text": "fast"}
+
+        result = policy.execute(call, "primary", "k", resolve_policy(overrides=FAST), fallback_model="fallback")
+        release.set()
+
+        assert result == {"text": "fast"}
+        counters = policy.snapshot()["counters"]
+        assert counters["hedges"] == 1 and counters["hedge_wins"] == 1
+
+    def test_no_hedge_without_history(self, policy):
+        """Hedging waits for hedge_min_samples observations."""
+        from src.policy import resolve_policy
+
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            time.sleep(0.05)
+            return {"text": "ok"}
+
+        assert policy.execute(call, "m", "k", resolve_policy(overrides=FAST)) == {"text": "ok"}
+        assert calls == ["m"]
+        assert "hedges" not in policy.snapshot()["counters"]
+
+    def test_transient_errors_are_retried(self, policy):
+        """Transient errors retry up to max_retries; the transient flag never leaks to callers."""
+        from src.policy import resolve_policy
+
+        replies = iter([
+            {"error": "503 unavailable", "transient": True},
+            {"error": "429 quota", "transient": True},
+            {"text": "ok"}
+        ])
+        assert policy.execute(lambda m: next(replies), "m", "k", resolve_policy(overrides=FAST)) == {"text": "ok"}
+        assert policy.snapshot()["counters"]["retries"] == 2
+
+        replies = iter([{"error": "503", "transient": True}] * 3)
+        result = policy.execute(lambda m: next(replies), "m", "k", resolve_policy(overrides=dict(FAST, max_retries=1)))
+        assert result == {"error": "503"}
+
+    def test_permanent_errors_are_not_retried(self, policy):
+        """Non-transient errors return immediately."""
+        from src.policy import resolve_policy
+
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            return {"error": "blocked for safety"}
+
+        assert policy.execute(call, "m", "k", resolve_policy(overrides=FAST)) == {"error": "blocked for safety"}
+        assert len(calls) == 1
+
+    def test_deadline(self, policy):
+        """Calls still running at the deadline return an error without waiting for them."""
+        from src.policy import resolve_policy
+
+        release = threading.Event()
+
+        def call(model):
+            release.wait(2)
+            return {"text": "late"}
+
+        started = time.monotonic()
+        result = policy.execute(call, "m", "k", resolve_policy(overrides=dict(FAST, deadline=0.1, hedge=False)))
+        release.set()
+
+        assert "deadline" in result["error"]
+        assert time.monotonic() - started < 1
+        assert policy.snapshot()["counters"]["deadline_exceeded"] == 1
+
+    def test_transient_classification(self):
+        """Rate limits and 5xx are transient; bad requests are not."""
+        from google.api_core import exceptions
+        from src.policy import is_transient
+
+        assert is_transient(exceptions.TooManyRequests("quota"))
+        assert is_transient(exceptions.ServiceUnavailable("down"))
+        assert not is_transient(exceptions.InvalidArgument("bad schema"))
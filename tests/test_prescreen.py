@@ -0,0 +1,99 @@
+"""
+Test suite for the local compliance pre-screen.
+
+Following @test-agent guidelines:
+- Test for structure and decisions, not exact scores
+- No real API calls
+"""
+
+import random
+import pytest
+
+
+@pytest.fixture
+def strong_package():
+    """A package that satisfies every local rule."""
+    template = (
+        "A cinematic [SUBJECT] portrait in [SETTING], lit by [LIGHTING], rendered in [PALETTE] tones, "
+        "shallow depth of field, 85mm lens, soft film grain, dramatic rim light, rich textures, "
+        "editorial composition, high dynamic range, subtle haze, elegant negative space, "
+        "magazine cover quality, balanced framing"
+    )
+    return {
+        "topic": "Cinematic Neon Portrait Art",
+        "template": template,
+        "variables": ["SUBJECT", "SETTING", "LIGHTING", "PALETTE"],
+        "examples": [f"Example {i}" for i in range(7)] + ["A sense of forgotten history", "The melancholic weight of time"],
+        "description": "Premium portrait template. " * 10,
+        "use_case": "Album covers",
+        "style": "Cinematic",
+        "tips": ["Use --ar 2:3"]
+    }
+
+
+class TestPrescreen:
+    """Test suite for pre-screen decisions."""
+
+    def test_clear_pass_skips_llm(self, strong_package):
+        from src.prescreen import prescreen_package, DEFAULT_SETTINGS
+
+        settings = dict(DEFAULT_SETTINGS, audit_rate=0.0)
+        result = prescreen_package(strong_package, settings)
+
+        assert result["decision"] == "pass"
+        assert not result["send_to_llm"]
+
+    def test_clear_fail_skips_llm_with_reasons(self):
+        from src.prescreen import prescreen_package, local_evaluation, DEFAULT_SETTINGS
+
+        settings = dict(DEFAULT_SETTINGS, audit_rate=0.0)
+        result = prescreen_package({"topic": "Stuff", "template": "a cat"}, settings)
+        evaluation = local_evaluation(result)
+
+        assert result["decision"] == "fail" and not result["send_to_llm"]
+        assert evaluation["total_score"] == result["score"]
+        assert evaluation["priority_improvements"]
+
+    def test_borderline_goes_to_llm(self, strong_package):
+        from src.prescreen import prescreen_package, DEFAULT_SETTINGS
+
+        strong_package["examples"] = strong_package["examples"][:3]
+        strong_package["description"] = ""
+        result = prescreen_package(strong_package, DEFAULT_SETTINGS)
+
+        assert result["decision"] == "borderline"
+        assert result["send_to_llm"]
+
+    def test_audit_sample_sends_clear_cases(self, strong_package):
+        from src.prescreen import prescreen_package, DEFAULT_SETTINGS
+
+        settings = dict(DEFAULT_SETTINGS, audit_rate=1.0)
+        result = prescreen_package(strong_package, settings, rng=random.Random(0))
+
+        assert result["decision"] == "pass" and result["audited"] and result["send_to_llm"]
+
+
+class TestCalibration:
+    """Test suite for calibration from the decision log."""
+
+    def test_fit_recovers_linear_mapping(self, tmp_path):
+        from src.prescreen import log_decision, load_decisions, fit_calibration
+
+        log_path = str(tmp_path / "decisions.jsonl")
+        for raw in (20, 40, 60, 80):
+            screen = {"decision": "borderline", "audited": False, "score": raw, "raw_score": raw, "features": {}}
+            log_decision(screen, {"topic": "t"}, {"total_score": 0.5 * raw + 30}, log_path=log_path)
+
+        calibration = fit_calibration(load_decisions(log_path))
+
+        assert calibration["samples"] == 4
+        assert calibration["slope"] == pytest.approx(0.5)
+        assert calibration["intercept"] == pytest.approx(30)
+
+    def test_threshold_replay_counts_errors(self):
+        from src.prescreen import evaluate_thresholds
+
+        records = [{"raw_score": 90, "llm_score": 20}, {"raw_score": 10, "llm_score": 80}, {"raw_score": 50, "llm_score": 50}]
+        stats = evaluate_thresholds(records, {"slope": 1.0, "intercept": 0.0}, 85, 25, 35)
+
+        assert stats == {"samples": 3, "skipped_llm": 2, "false_pass": 1, "false_fail": 1}
@@ -0,0 +1,37 @@
+"""
+Test suite for preview tiers and naming.
+
+Following @test-agent guidelines:
+- No real HuggingFace calls
+"""
+
+import pytest
+
+
+class TestPreviewTiers:
+    """Test suite for draft/final preview handling."""
+
+    def test_tier_parameters(self):
+        """Drafts reduce resolution and steps; finals keep model defaults."""
+        from src.previews import tier_parameters
+
+        draft = tier_parameters("draft", "black-forest-labs/FLUX.1-schnell")
+        assert draft == {"width": 512, "height": 512, "num_inference_steps": 2}
+        assert tier_parameters("final", "black-forest-labs/FLUX.1-schnell") == {}
+        with pytest.raises(ValueError):
+            tier_parameters("huge", "any")
+
+    def test_drafts_are_never_listed_for_packaging(self, tmp_path):
+        """Only final previews should be picked up for packages."""
+        from src.previews import preview_filename, list_previews
+
+        json_path = tmp_path / "reverse_cat.json"
+        json_path.write_text("{}")
+        names = [preview_filename("reverse_cat", 1), preview_filename("reverse_cat", 1, "draft"), "reverse_cat_v2_preview_2.png"]
+        for name in names:
+            (tmp_path / name).write_bytes(b"")
+
+        assert names[1] == "reverse_cat_preview_draft_1.png"
+        assert [p.name for p in list_previews(str(json_path))] == ["reverse_cat_preview_1.png", "reverse_cat_v2_preview_2.png"]
+        assert [p.name for p in list_previews(str(json_path), "draft")] == ["reverse_cat_preview_draft_1.png"]
+        assert len(list_previews(str(json_path), None)) == 3
@@ -0,0 +1,85 @@
+"""
+Test suite for per-agent generation profiles.
+
+Following @test-agent guidelines:
+- Resolve profiles from in-memory configs, no real config.yaml edits
+- Mock external API calls (Gemini) in unit tests
+"""
+
+from unittest.mock import MagicMock
+
+CONFIG = {
+    "generation_profiles": {
+        "default": {"temperature": 0.6, "max_output_tokens": 4096, "timeout": 60},
+        "label": {"model": "gemini-2.5-flash-lite", "temperature": 0.0, "max_output_tokens": 32, "stop_sequences": ["\n"]}
+    },
+    "agent_profiles": {"categorize_prompt": "label", "broken": "missing"}
+}
+
+
+class TestProfiles:
+    """Test suite for profile resolution and request building."""
+
+    def test_named_profile_inherits_default(self):
+        """Named profiles override only the fields they set."""
+        from src.profiles import resolve_profile
+
+        profile = resolve_profile("categorize_prompt", CONFIG)
+
+        assert profile["name"] == "label"
+        assert profile["model"] == "gemini-2.5-flash-lite"
+        assert profile["max_output_tokens"] == 32
+        assert profile["timeout"] == 60
+        assert profile["top_k"] == 40  # built-in default
+
+    def test_unlisted_and_unknown_profiles_use_default(self):
+        """Unlisted agents and dangling profile names resolve to the default profile's settings."""
+        from src.profiles import resolve_profile
+
+        assert resolve_profile("generate_examples", CONFIG)["max_output_tokens"] == 4096
+        assert resolve_profile("broken", CONFIG)["temperature"] == 0.6
+
+    def test_config_without_profiles_reads_config_file(self, tmp_path, monkeypatch):
+        """Configs without profile blocks fall back to config.yaml."""
+        import src.profiles as profiles
+
+        path = tmp_path / "config.yaml"
+        path.write_text("generation_profiles:\n  default:\n    max_output_tokens: 100\n", encoding="utf-8")
+        monkeypatch.setattr(profiles, "CONFIG_PATH", str(path))
+
+        assert profiles.resolve_profile("refine_prompt", {"database_name": "x.db"})["max_output_tokens"] == 100
+
+    def test_request_kwargs(self):
+        """JSON mode drops stop sequences; timeouts become request options."""
+        from src.profiles import resolve_profile, request_kwargs
+
+        profile = resolve_profile("categorize_prompt", CONFIG)
+
+        plain = request_kwargs(profile)
+        assert plain["generation_config"]["stop_sequences"] == ["\n"]
+        assert plain["request_options"] == {"timeout": 60}
+
+        structured = request_kwargs(profile, json_mode=True)
+        assert structured["generation_config"]["response_mime_type"] == "application/json"
+        assert "stop_sequences" not in structured["generation_config"]
+
+    def test_agent_routes_to_profile_model(self, monkeypatch):
+        """An agent whose profile names another model is sent to that model with its limits."""
+        import src.api_handler as api_handler
+        import src.profiles as profiles
+
+        lite = MagicMock()
+        lite.generate_content.return_value.candidates[0].finish_reason = 1
+        lite.generate_content.return_value.candidates[0].content.parts[0].text = "Portraits"
+        monkeypatch.setattr(profiles, "_model_named", lambda name: lite)
+        monkeypatch.setattr(api_handler, "classify_package", lambda package, categories: None)
+
+        caller_model = MagicMock()
+        config = dict(CONFIG, agent_categorize_prompt="{prompt_title}{prompt_description}{prompt_template}{category_list}",
+                      prompt_categories=["Portraits", "Landscapes"])
+
+        assert api_handler.agent_categorize_prompt(caller_model, config, {"topic": "x"}) == "Portraits"
+        caller_model.generate_content.assert_not_called()
+        kwargs = lite.generate_content.call_args.kwargs
+        assert kwargs["generation_config"]["max_output_tokens"] == 32
+        assert kwargs["request_options"] == {"timeout": 60}
@@ -234,3 +234,76 @@ class TestIntegration:
             # Should return enhanced package
             assert 'topic' in result
             assert 'enhancement_log' in result
+
+    def test_enhance_all_packages_batches_requests(self):
+        """Title fixes and abstract injection should be grouped into one request each."""
+        from quality_enhancers import enhance_all_packages
+
+        packages = [
+            {'topic': f'Product Mockups {i}', 'template': 'A [SUBJECT]', 'examples': [f'Example {j}' for j in range(9)]}
+            for i in range(3)
+        ]
+
+        def respond(prompt):
+            response = MagicMock()
+            if "fixed_titles" in prompt:
+                response.text = '{"fixed_titles": {"0": "Minimal Product Mockups", "1": "Bold Product Mockups"}}'
+            else:
+                response.text = '{"abstract_examples": {"0": ["A sense of calm", "The weight of time"], "1": [], "2": ["A haunting mood"]}}'
+            return response
+
+        with patch('quality_enhancers.genai') as mock_genai:
+            mock_model = MagicMock()
+            mock_model.generate_content.side_effect = respond
+            mock_genai.GenerativeModel.return_value = mock_model
+
+            enhanced, stats = enhance_all_packages(packages, api_key="test_key")
+
+        assert mock_genai.GenerativeModel.call_count == 1
+        assert mock_model.generate_content.call_count == 2
+        assert [p['topic'] for p in enhanced[:2]] == ['Minimal Product Mockups', 'Bold Product Mockups']
+        assert enhanced[2]['topic'] != 'Product Mockups 2'  # local fallback fix
+        assert enhanced[0]['_abstract_injected'] == 2 and '_abstract_injected' not in enhanced[1]
+        assert stats == {'total': 3, 'titles_fixed': 3, 'examples_flagged': 0, 'abstract_injected': 2, 'llm_requests': 2}
+
+
+class TestKeywordMatcher:
+    """Tests for the compiled multi-keyword matcher."""
+
+    def test_find_all_returns_hits_with_positions(self):
+        """All hits should be returned in order with their spans."""
+        from quality_enhancers import KeywordMatcher
+
+        matcher = KeywordMatcher(["sense of", "mood", "art"])
+        text = "A sense of calm, party mood and Art"
+
+        hits = matcher.find_all(text)
+
+        assert hits == [("sense of", 2, 10), ("mood", 23, 27), ("art", 32, 35)]
+        assert all(text[s:e].lower() == k for k, s, e in hits)
+
+    def test_word_boundaries(self):
+        """Keywords inside other words should not match; prefix mode allows suffixes."""
+        from quality_enhancers import KeywordMatcher
+
+        assert not KeywordMatcher(["art"]).search("Smart party")
+        assert not KeywordMatcher(["portrait"]).search("Portraits")
+        assert KeywordMatcher(["portrait"], prefix=True).find_all("Moody Portraits") == [("portrait", 6, 15)]
+
+    def test_prefix_mode_allows_only_plural_suffixes(self):
+        """Words that merely start with a keyword ('Artisan', 'Epicurean') should not match."""
+        from quality_enhancers import KeywordMatcher
+
+        matcher = KeywordMatcher(["art", "epic", "sketch"], prefix=True)
+        assert not matcher.search("Artisan Artificial Articles")
+        assert not matcher.search("Epicurean")
+        assert [k for k, _, _ in matcher.find_all("Arts and Sketches")] == ["art", "sketch"]
+
+    def test_validators_use_word_boundaries(self):
+        """'art' inside another word should no longer count as a format type."""
+        from quality_enhancers import validate_title_pattern
+
+        assert "missing_format_type" in validate_title_pattern("Cinematic Party Favors Set")["issues"]
+        assert validate_title_pattern("Cinematic Party Favor Illustrations")["is_valid"]
+        assert "missing_format_type" in validate_title_pattern("Cinematic Artisan Bread Recipes")["issues"]
+        assert not validate_title_pattern("Epicurean Artificial Intelligence Articles")["is_valid"]
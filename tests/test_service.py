@@ -0,0 +1,116 @@
+"""
+Test suite for the local HTTP service.
+
+Following @test-agent guidelines:
+- Fake job runners; no model calls
+- Real HTTP on an ephemeral localhost port
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+
+def fake_runners(release):
+    def steps(params, emit):
+        for name in ("First", "Second"):
+            emit({"status": "running", "step": name, "output": f"{name} done"})
+        return {"topic": params["topic"]}
+
+    def blocked(params, emit):
+        release.wait(5)
+        return "unblocked"
+
+    def broken(params, emit):
+        emit({"status": "running", "step": "Start", "output": "starting"})
+        raise RuntimeError("model unavailable")
+
+    return {"steps": steps, "blocked": blocked, "broken": broken}
+
+
+@pytest.fixture
+def service():
+    """A running service with one worker and a queue of two; yields (base_url, release_event)."""
+    from src.service import JobManager, create_server
+
+    release = threading.Event()
+    manager = JobManager(fake_runners(release), workers=1, max_queued=2)
+    server = create_server(manager, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", release
+    release.set()
+    server.shutdown()
+    server.server_close()
+    manager.shutdown()
+
+
+def call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def read_events(url):
+    """Parses an SSE stream into (event, data) pairs."""
+    status, text = call(url)
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestService:
+    """Test suite for job submission, SSE progress and results."""
+
+    def test_job_streams_steps_then_result(self, service):
+        """A job's step events stream over SSE, followed by an end event; the result is retrievable."""
+        base, _ = service
+        status, body = call(f"{base}/jobs/steps", {"topic": "owls"})
+        assert status == 202
+        job_id = json.loads(body)["id"]
+
+        events = read_events(f"{base}/jobs/{job_id}/events")
+        assert [data.get("step") for kind, data in events if kind == "step"] == ["First", "Second"]
+        assert events[-1] == ("end", {"status": "completed", "error": None, "result": f"/jobs/{job_id}"})
+
+        job = json.loads(call(f"{base}/jobs/{job_id}")[1])
+        assert job["result"] == {"topic": "owls"} and len(job["events"]) == 2
+
+    def test_failed_job_reports_error(self, service):
+        """Runner exceptions mark the job as failed with the error message."""
+        base, _ = service
+        job_id = json.loads(call(f"{base}/jobs/broken", {})[1])["id"]
+
+        kind, end = read_events(f"{base}/jobs/{job_id}/events")[-1]
+        assert kind == "end" and end["status"] == "error" and "model unavailable" in end["error"]
+
+    def test_bounded_queue_rejects_overflow(self, service):
+        """With the worker busy and the queue full, submissions get 429 until capacity frees up."""
+        base, release = service
+        first = json.loads(call(f"{base}/jobs/blocked", {})[1])["id"]
+        for _ in range(50):
+            if json.loads(call(f"{base}/jobs/{first}")[1])["status"] == "running":
+                break
+            threading.Event().wait(0.02)
+        assert call(f"{base}/jobs/blocked", {})[0] == 202
+        assert call(f"{base}/jobs/blocked", {})[0] == 202
+        assert call(f"{base}/jobs/blocked", {})[0] == 429
+
+        health = json.loads(call(f"{base}/health")[1])
+        assert health["jobs"]["running"] == 1 and health["jobs"]["queued"] == 2
+        release.set()
+
+    def test_unknown_kind_and_job(self, service):
+        """Unknown job kinds and ids return 404."""
+        base, _ = service
+        assert call(f"{base}/jobs/nope", {})[0] == 404
+        assert call(f"{base}/jobs/missing")[0] == 404
@@ -0,0 +1,57 @@
+"""
+Test suite for CLI startup cost.
+
+Following @test-agent guidelines:
+- Measure imports in a fresh interpreter (`python -X importtime`)
+- Generous budgets; the module checks are what catch regressions
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("google.generativeai", "PIL", "streamlit", "src.api_handler", "huggingface_hub")
+IMPORT_BUDGET_US = 500_000
+
+
+def import_times(statement):
+    """Cumulative import time in microseconds per module for `statement`, run in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, timeout=60
+    )
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    """Test suite for lazy imports on lightweight commands."""
+
+    def test_cli_import_skips_heavy_dependencies(self):
+        """Importing the CLI must not load the Gemini SDK, PIL, Streamlit or the agents."""
+        times = import_times("import cli")
+
+        assert not [m for m in HEAVY_MODULES if m in times]
+        assert times["cli"] < IMPORT_BUDGET_US
+
+    def test_list_command_path_is_light(self):
+        """The catalog, utils and audit modules used by `list` and `audit` stay free of heavy imports."""
+        times = import_times("import src.catalog, src.utils, src.audit")
+
+        assert not [m for m in HEAVY_MODULES if m in times]
+
+    def test_package_exports_resolve_lazily(self):
+        """`from src import ...` still reaches agents and utils, loading them on first use."""
+        import src
+
+        from src import agent_generate_initial_prompt, load_config
+        assert callable(agent_generate_initial_prompt) and callable(load_config)
+        assert src.enhance_package.__module__ == "src.quality_enhancers"
@@ -0,0 +1,118 @@
+"""
+Test suite for structured (schema-validated) JSON output.
+
+Following @test-agent guidelines:
+- Exercise repair and validation on realistic malformed replies
+- Mock external API calls (Gemini) in unit tests
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestRepair:
+    """Test suite for local JSON repair."""
+
+    @pytest.mark.parametrize("reply, expected", [
+        ('```json\n{"a": [1, 2,],}\n```', {"a": [1, 2]}),
+        ('Here you go: {"a": True, "b": None} Enjoy!', {"a": True, "b": None}),
+        ('{"text": "line one\nline two"}', {"text": "line one\nline two"}),
+        ('{"a": ["x", "y', {"a": ["x", "y"]}),
+        ('{"a": "x", "b', {"a": "x"}),
+        ('{"a": {"b": 1}, "c": [1, {"d"', {"a": {"b": 1}, "c": [1]}),
+    ])
+    def test_parse_repairs_reply(self, reply, expected):
+        """Fences, prose, trailing commas, literals and truncation should be repaired."""
+        from src.structured import parse_json
+
+        assert parse_json(reply) == expected
+
+    def test_strings_are_left_alone(self):
+        """Brackets, commas and literal-like words inside strings must not be rewritten."""
+        from src.structured import parse_json
+
+        reply = '{"tip": "Use [SUBJECT], then None of the {extras},]", "ok": True}'
+        assert parse_json(reply) == {"tip": "Use [SUBJECT], then None of the {extras},]", "ok": True}
+
+    def test_unparseable_raises(self):
+        """Replies without any JSON should raise ValueError."""
+        from src.structured import parse_json
+
+        with pytest.raises(ValueError):
+            parse_json("I cannot help with that.")
+
+
+class TestSchemas:
+    """Test suite for schema validation and request schemas."""
+
+    def test_validation_errors(self):
+        """Type mismatches, missing keys and enum violations should all be reported."""
+        from src.structured import RESPONSE_SCHEMAS, validate_json
+
+        errors = validate_json(
+            {"concepts": [{"topic": 1, "content_type": "Audio"}]},
+            RESPONSE_SCHEMAS["concepts"]
+        )
+
+        assert "$.concepts[0]: missing required key 'description'" in errors
+        assert "$.concepts[0].topic: expected string, got int" in errors
+        assert any("content_type" in e and "Audio" in e for e in errors)
+        assert validate_json({"trends": [{"topic": "x"}]}, RESPONSE_SCHEMAS["trends"]) == []
+
+    def test_free_form_objects_are_not_sent(self):
+        """Only schemas whose objects all declare properties are sent as response_schema."""
+        from src.structured import request_schema
+
+        assert request_schema("trends") is not None
+        assert request_schema("initial_prompt") is None
+        assert request_schema("extracted_variables") is None
+
+
+class TestGenerateJson:
+    """Test suite for the api_handler JSON request path."""
+
+    def test_repairs_before_re_requesting(self, monkeypatch):
+        """A repairable reply should not cost a second request."""
+        import src.api_handler as api_handler
+
+        calls = []
+
+        def respond(model, prompt, json_mode=False, response_schema=None, profile=None):
+            calls.append((json_mode, response_schema))
+            return {"text": '```json\n{"trends": [{"topic": "Neon Noir",}],}'}
+
+        monkeypatch.setattr(api_handler, "_generate_response", respond)
+        result = api_handler._generate_json(MagicMock(), "prompt", "trends")
+
+        assert result["data"] == {"trends": [{"topic": "Neon Noir"}]}
+        assert len(calls) == 1
+        assert calls[0][0] is True and calls[0][1]["required"] == ["trends"]
+
+    def test_invalid_reply_is_re_requested(self, monkeypatch):
+        """Replies that fail validation should be re-requested up to JSON_ATTEMPTS."""
+        import src.api_handler as api_handler
+
+        replies = iter(['{"wrong": 1}', '{"improved_template": "A [SUBJECT]"}'])
+        monkeypatch.setattr(api_handler, "_generate_response", lambda m, p, **kw: {"text": next(replies)})
+
+        result = api_handler._generate_json(MagicMock(), "prompt", "refined_template")
+        assert result["data"] == {"improved_template": "A [SUBJECT]"}
+
+    def test_structured_output_rejection_falls_back(self, monkeypatch):
+        """Models that reject the JSON mime type should be retried in plain mode."""
+        import src.api_handler as api_handler
+
+        modes = []
+
+        def respond(model, prompt, json_mode=False, response_schema=None, profile=None):
+            modes.append(json_mode)
+            if json_mode:
+                return {"error": "400 response_mime_type is not supported by this model"}
+            return {"text": '{"new_example": "A quiet harbor at dawn"}'}
+
+        monkeypatch.setattr(api_handler, "_generate_response", respond)
+        result = api_handler._generate_json(MagicMock(), "prompt", "new_example")
+
+        assert modes == [True, False]
+        assert result["data"]["new_example"] == "A quiet harbor at dawn"
@@ -0,0 +1,69 @@
+"""
+Test suite for thumbnails and contact sheets.
+
+Following @test-agent guidelines:
+- Use small generated images in temporary directories
+"""
+
+import json
+import os
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def thumb_dir(tmp_path, monkeypatch):
+    """Redirect the thumbnail cache to a temp directory."""
+    import src.thumbnails as thumbnails
+    path = tmp_path / "thumbs"
+    monkeypatch.setattr(thumbnails, "THUMB_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def packages(tmp_path):
+    """Two packages with previews, one JPEG source image."""
+    source = tmp_path / "source.jpg"
+    Image.new("RGB", (1200, 800), "green").save(source)
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.json").write_text(json.dumps({"topic": f"Topic {name}", "source_image_path": str(source)}))
+        for i in (1, 2):
+            Image.new("RGB", (1024, 1024), "red").save(tmp_path / f"{name}_preview_{i}.png")
+    return tmp_path
+
+
+class TestThumbnails:
+    """Test suite for cached thumbnails and contact sheets."""
+
+    def test_thumbnail_is_cached(self, packages, thumb_dir):
+        """Thumbnails should fit the size and be reused until the source changes."""
+        from src.thumbnails import make_thumbnail, THUMB_SIZE
+
+        first = make_thumbnail(str(packages / "source.jpg"))
+        with Image.open(first) as thumb:
+            assert thumb.width <= THUMB_SIZE[0] and thumb.height <= THUMB_SIZE[1]
+        mtime = os.path.getmtime(first)
+        assert make_thumbnail(str(packages / "source.jpg")) == first
+        assert os.path.getmtime(first) == mtime
+
+    def test_package_sheet(self, packages, thumb_dir):
+        """One sheet per package with the source image and previews, reused when fresh."""
+        from src.thumbnails import build_package_sheet, package_thumbnail
+
+        sheet = build_package_sheet(str(packages / "a.json"), str(packages / "source.jpg"))
+        assert sheet.endswith("a_contact_sheet.jpg")
+        with Image.open(sheet) as img:
+            assert img.width > 3 * 256
+        mtime = os.path.getmtime(sheet)
+        assert build_package_sheet(str(packages / "a.json"), str(packages / "source.jpg")) == sheet
+        assert os.path.getmtime(sheet) == mtime
+        assert package_thumbnail(str(packages / "a.json")).startswith(str(thumb_dir))
+
+    def test_batch_sheet(self, packages, thumb_dir, tmp_path):
+        """The batch sheet should build every package sheet and tile one image per package."""
+        from src.thumbnails import build_batch_sheet
+
+        output = str(tmp_path / "out" / "batch.jpg")
+        assert build_batch_sheet([str(packages / "a.json"), str(packages / "b.json")], output, workers=2) == output
+        assert os.path.exists(packages / "b_contact_sheet.jpg")